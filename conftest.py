@@ -2,14 +2,34 @@ import json
 import yaml
 import platform
 from pathlib import Path
+import pytest
+
+# The plugin modules in pytest_plugins are also imported below (directly and via
+# other utils/ modules); register them for assertion rewriting before that happens
+PLUGIN_MODULES = ["utils.duration_scheduler", "utils.tracing", "utils.perf_summary", "utils.web_vitals"]
+pytest.register_assert_rewrite(*PLUGIN_MODULES)
+
 from playwright.sync_api import sync_playwright
-from utils.logger import get_logger
+from utils.logger import get_logger, flush as flush_logs
+from utils.judge_server import start_local_judge
+from utils.judge_scheduler import JudgeScheduler
+from utils.metric_registry import MetricRegistry
+from utils.eval_store import EvaluationStore
+from utils.catalog import load_catalog
+from utils.corpus import Corpus
+from utils.consistency import ConsistencyChecker
+from utils.artifact_writer import ArtifactWriter, ScreenshotSettings
+from utils.artifact_paths import is_controller, merge_json
+from utils.playwright_artifacts import CaptureSettings, RetainedArtifacts
+from utils.har import HarSettings
+from utils.network_profiles import NetworkProfile
+from utils import web_vitals
+from utils.tracing import span
 from pages.login_page import LoginPage
 from pages.chat_page import ChatPage
 from axe_playwright_python.sync_playwright import Axe
 
 import os
-import pytest
 from langchain_openai import ChatOpenAI
 from ragas.llms.base import LangchainLLMWrapper
 from langchain_huggingface import HuggingFaceEmbeddings
@@ -19,6 +39,13 @@ from allure_commons.types import AttachmentType
 
 logger = get_logger(__name__)
 
+# Longest-first xdist scheduling from recorded test durations; per-test span traces;
+# run performance summary compared against the stored baseline; web vitals budgets
+pytest_plugins = PLUGIN_MODULES
+
+# Background writer for failure screenshots, created in pytest_configure
+ARTIFACT_WRITER = pytest.StashKey[ArtifactWriter]()
+
 
 @pytest.fixture(scope="session")
 def config():
@@ -36,62 +63,138 @@ def test_data():
         return json.load(f)
 
 
+@pytest.fixture(scope="session")
+def test_catalog():
+    """
+    Validated, indexed view of test_data.json, loaded once per session.
+
+    Use test_catalog.select(language=, suite=, category=, tag=, priority=).
+    """
+    return load_catalog()
+
+
+@pytest.fixture(scope="session")
+def corpus(request):
+    """
+    The --corpus JSONL prompt corpus (utils/corpus.py); skips when none is given.
+
+    Load tests stream their xdist worker's share with
+    corpus.shard(*worker_shard(), language=, suite=, category=).
+    """
+    path = request.config.getoption("corpus")
+    if not path:
+        pytest.skip("No prompt corpus: run with --corpus PATH")
+    return Corpus(path)
+
+
 @pytest.fixture(scope="function")
 def playwright_instance():
-    p = sync_playwright().start()
+    with span("playwright.start", "fixture"):
+        p = sync_playwright().start()
     yield p
-    p.stop()
+    with span("playwright.stop", "fixture"):
+        p.stop()
 
 
 @pytest.fixture(scope="function")
 def browser(playwright_instance):
-    browser = playwright_instance.chromium.launch(headless=False)
+    with span("browser.launch", "fixture", browser="chromium"):
+        browser = playwright_instance.chromium.launch(headless=False)
     yield browser
-    browser.close()
+    with span("browser.close", "fixture"):
+        browser.close()
+
+
+@pytest.fixture(scope="session")
+def retained_artifacts(config):
+    """
+    Playwright video/trace capture per `video_mode` / `trace_mode` in config.yaml.
+
+    In "retain-on-failure" mode every test records, but only failed tests
+    keep their artifacts.
+    """
+    artifacts = RetainedArtifacts(CaptureSettings.from_config(config))
+    yield artifacts
+    artifacts.close()
+
+
+@pytest.fixture(scope="session")
+def har_settings(config, request):
+    """HAR record/replay for @pytest.mark.har tests (`har_mode` or --har-mode)"""
+    return HarSettings.from_config(config, request.config.getoption("--har-mode"))
 
 
 @pytest.fixture(scope="function")
-def context(browser, playwright_instance, request, config):
-    # Check if the test has @pytest.mark.mobile
-    is_mobile = request.node.get_closest_marker("mobile") is not None
+def network_profile(request, config):
+    """
+    Request-blocking profile for this test's context.
 
-    # Get video recording settings from config
-    enable_video = config.get("enable_video_recording", False)
-    video_dir = config.get("video_dir", "videos/")
+    ui/accessibility tests get "full" (nothing blocked); others use
+    `network_profile` from config.yaml unless @pytest.mark.network_profile(...) says otherwise.
+    """
+    return NetworkProfile.for_node(config, request.node)
 
-    # Prepare base context options
-    base_options = {}
-    if enable_video:
-        base_options["record_video_dir"] = video_dir
 
-    if is_mobile:
-        device = playwright_instance.devices["iPhone 12 Pro"]
-        context = browser.new_context(**device, **base_options)
-    else:
-        context = browser.new_context(
-            viewport={"width": 1280, "height": 720},
-            is_mobile=False,
-            has_touch=False,
-            **base_options
-        )
+@pytest.fixture(scope="function")
+def context(browser, playwright_instance, request, config, retained_artifacts, har_settings, network_profile):
+    # Check if the test has @pytest.mark.mobile
+    is_mobile = request.node.get_closest_marker("mobile") is not None
+    har_settings.require_archive(request.node)
+
+    # Video recording options from video_mode (or the older enable_video_recording)
+    base_options = retained_artifacts.context_options()
+    # HAR recording for @pytest.mark.har tests in record mode
+    base_options.update(har_settings.context_options(request.node))
+
+    with span("context.new", "fixture", mobile=is_mobile):
+        if is_mobile:
+            device = playwright_instance.devices["iPhone 12 Pro"]
+            context = browser.new_context(**device, **base_options)
+        else:
+            context = browser.new_context(
+                viewport={"width": 1280, "height": 720},
+                is_mobile=False,
+                has_touch=False,
+                **base_options
+            )
+        retained_artifacts.start(context)
+        har_settings.route(context, request.node)
+        network_profile.apply(context)
 
     yield context
-    context.close()
+    # Reports stored by pytest_runtest_makereport decide what is kept
+    failed = any(
+        getattr(getattr(request.node, f"rep_{when}", None), "failed", False) for when in ("setup", "call")
+    )
+    with span("context.close", "fixture", failed=failed):
+        retained_artifacts.finish(context, request.node.nodeid, failed)
+    # The HAR is only complete once the context has closed
+    har_settings.redact(request.node)
 
 
 @pytest.fixture(scope="function")
-def page(context, config):
+def page(context, config, network_profile):
     page = context.new_page()
     page.set_default_timeout(config["timeout_ms"])
-    page.goto(config["base_url"])
-    return page
+    network_profile.track(page)
+    web_vitals.install(page)
+    with span("page.goto", "fixture", url=config["base_url"], profile=network_profile.name):
+        network_profile.goto(page, config["base_url"])
+    yield page
+    network_profile.report()
 
 
 @pytest.fixture(scope="function")
-def chat_page(page, config):
+def chat_page(page, config, request, network_profile):
     login_page = LoginPage(page)
     login_page.login(config["username"], config["password"])
     chat_page = ChatPage(page)
+    # Front-end metrics of the chat page after login (checked by @pytest.mark.perf_budget),
+    # recorded per network profile since blocked images/fonts change LCP
+    try:
+        web_vitals.store(request.node, web_vitals.collect(page, network_profile.name))
+    except Exception as e:
+        logger.warning(f"Could not collect web vitals: {e}")
     return chat_page
 
 
@@ -102,13 +205,68 @@ def axe():
 
 
 @pytest.fixture(scope="session")
-def llm_wrapper(config):
+def consistency_checker(config):
+    """
+    Semantic consistency checker for `consistency_pairs` test data.
+
+    Uses a multilingual sentence-transformers model so English, Arabic and
+    cross-language response groups share one embedding space.
+    """
+    consistency_config = config.get("consistency", {})
+    logger.info("Initializing consistency embeddings...")
+    embeddings = HuggingFaceEmbeddings(
+        model_name=consistency_config.get(
+            "embedding_model", "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+        )
+    )
+    return ConsistencyChecker(
+        embeddings,
+        min_semantic_similarity=consistency_config.get("min_semantic_similarity", 0.7),
+        max_length_ratio_diff=consistency_config.get("max_length_ratio_diff", 0.4),
+    )
+
+
+@pytest.fixture(scope="session")
+def local_judge(config):
+    """
+    Start the offline judge stand-in when `judge.provider` is "local".
+
+    Yields the running LocalJudgeServer, or None when the live API is used.
+    """
+    judge_config = config.get("judge", {})
+    if judge_config.get("provider", "perplexity") != "local":
+        yield None
+        return
+
+    server = start_local_judge(judge_config.get("local", {}))
+    yield server
+    server.stop()
+
+
+@pytest.fixture(scope="session")
+def judge_scheduler(config):
+    """
+    Shared scheduler for every judge request: rate limiting, adaptive
+    concurrency, retries and one pooled HTTP client.
+    """
+    scheduler = JudgeScheduler.from_config(config.get("judge", {}).get("scheduler", {}))
+    yield scheduler
+    scheduler.log_summary()
+    scheduler.close()
+
+
+@pytest.fixture(scope="session")
+def llm_wrapper(config, local_judge, judge_scheduler):
     """
     Fixture to provide LLM wrapper for RAGAS metrics.
 
     Uses:
     - PerplexityCompatibleChatOpenAI for LLM (forces n=1)
     - HuggingFace embeddings for ResponseRelevancy metric
+
+    The judge endpoint comes from the `judge` config section; with
+    `provider: local` requests go to the offline stand-in instead.
+    All requests are paced and retried by the `judge_scheduler` fixture.
     """
 
     # Custom ChatOpenAI that forces n=1 for Perplexity compatibility
@@ -121,18 +279,35 @@ def llm_wrapper(config):
         def _generate(self, messages, stop=None, run_manager=None, **kwargs):
             """Override sync generation to force n=1."""
             kwargs['n'] = 1
-            return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            generate = super()._generate
+            return judge_scheduler.run(
+                lambda: generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            )
 
         async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
             """Override async generation to force n=1."""
             kwargs['n'] = 1
-            return await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            agenerate = super()._agenerate
+            return await judge_scheduler.arun(
+                lambda: agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            )
+
+    judge_config = config.get("judge", {})
+    if local_judge:
+        base_url, api_key = local_judge.url, "local-judge"
+        logger.info(f"Using local judge at {base_url}")
+    else:
+        base_url = judge_config.get("base_url", "https://api.perplexity.ai")
+        api_key = config["PERPLEXITY_API_KEY"]
 
     llm = PerplexityCompatibleChatOpenAI(
-        model="sonar-pro",
-        temperature=0.3,
-        api_key=config["PERPLEXITY_API_KEY"],
-        base_url="https://api.perplexity.ai"
+        model=judge_config.get("model", "sonar-pro"),
+        temperature=judge_config.get("temperature", 0.3),
+        api_key=api_key,
+        base_url=base_url,
+        max_retries=0,  # Retries are owned by judge_scheduler
+        http_client=judge_scheduler.http_client,
+        http_async_client=judge_scheduler.http_async_client
     )
     logger.info("Initializing HuggingFace embeddings...")
     embeddings = HuggingFaceEmbeddings(
@@ -147,22 +322,155 @@ def llm_wrapper(config):
     return llm_wrapper
 
 
+@pytest.fixture(scope="session")
+def eval_store(config, request):
+    """
+    Incremental score store: unchanged samples reuse previous scores.
+
+    Pass --force-rescore to send every sample to the judge again.
+    """
+    store = EvaluationStore(
+        config.get("evaluation", {}).get("store_path", ".eval_cache/scores.sqlite"),
+        force_rescore=request.config.getoption("--force-rescore"),
+    )
+    yield store
+    store.log_summary()
+    store.close()
+
+
+@pytest.fixture(scope="session")
+def metric_registry(llm_wrapper, eval_store, judge_scheduler):
+    """
+    RAGAS metrics built once per session.
+
+    Use metric_registry.score(sample, name) for a single metric or
+    metric_registry.score_all(sample, metrics=[...]) to score several concurrently.
+    """
+    return MetricRegistry(llm_wrapper, store=eval_store, scheduler=judge_scheduler)
+
+
 # ============================================================================
 # PYTEST HOOKS
 # ============================================================================
 
+def pytest_addoption(parser):
+    parser.addoption(
+        "--force-rescore",
+        action="store_true",
+        default=False,
+        help="Ignore stored RAGAS scores and send every sample to the judge",
+    )
+    parser.addoption(
+        "--soak-messages",
+        type=int,
+        default=0,
+        help="Messages to send in the long-conversation soak test (0 skips it)",
+    )
+    parser.addoption(
+        "--run-benchmarks",
+        action="store_true",
+        default=False,
+        help="Run @pytest.mark.benchmark tests (rendering smoothness)",
+    )
+    parser.addoption(
+        "--har-mode",
+        choices=("off", "record", "replay"),
+        default=None,
+        help="Record or replay HAR archives for @pytest.mark.har tests (overrides har_mode)",
+    )
+    parser.addoption(
+        "--include-redundant",
+        action="store_true",
+        default=False,
+        help="Also run cases tagged redundant_of by python -m utils.dedup",
+    )
+    parser.addoption(
+        "--corpus",
+        default=None,
+        help="JSONL prompt corpus for the corpus fixture and @pytest.mark.cases(source=\"corpus\") tests",
+    )
+
+
+def select_corpus_cases(corpus: Corpus, tag: str = None, priority: str = None, **filters) -> list:
+    """TestCatalog.select() filters applied to a corpus; tag and priority aren't in its index"""
+    return [
+        case for case in corpus.iter_cases(**filters)
+        if (tag is None or tag in case.tags) and (priority is None or case.priority == priority)
+    ]
+
+
+def pytest_generate_tests(metafunc):
+    """
+    Expand @pytest.mark.cases into one test item per test_data.json case.
+
+    The marker takes the TestCatalog.select() filters (language, suite,
+    category, tag, priority), plus `argname` (default "case") and an optional
+    `where` predicate. Test ids are the case ids, e.g.
+    test_en_helpful_responses[EN_HELP_003], so single cases can be selected,
+    distributed and retried independently. Cases tagged `redundant_of` are
+    left out unless --include-redundant is given.
+
+    `source="corpus"` reads the cases from the --corpus JSONL corpus instead
+    (language / suite / category through its offset index); without --corpus
+    those tests are skipped.
+    """
+    marker = metafunc.definition.get_closest_marker("cases")
+    if marker is None:
+        return
+    filters = dict(marker.kwargs)
+    argname = filters.pop("argname", "case")
+    where = filters.pop("where", None)
+    source = filters.pop("source", "catalog")
+    if source == "corpus":
+        path = metafunc.config.getoption("corpus")
+        if not path:
+            skip = pytest.mark.skip(reason="Corpus cases: run with --corpus PATH")
+            metafunc.parametrize(argname, [pytest.param(None, marks=skip)], ids=["no-corpus"])
+            return
+        cases = select_corpus_cases(Corpus(path), **filters)
+    else:
+        cases = load_catalog().select(**filters)
+    if where is not None:
+        cases = [case for case in cases if where(case)]
+    if not metafunc.config.getoption("include_redundant"):
+        cases = [case for case in cases if not case.get("redundant_of")]
+    metafunc.parametrize(argname, cases, ids=[case.id for case in cases])
+
+
+def pytest_collection_modifyitems(config, items):
+    """
+    Skip opt-in tests at collection time, before their fixtures launch a
+    browser and log in: @pytest.mark.soak needs --soak-messages N,
+    @pytest.mark.benchmark needs --run-benchmarks.
+    """
+    skips = {}
+    if not config.getoption("soak_messages"):
+        skips["soak"] = pytest.mark.skip(reason="Soak test: run with --soak-messages N")
+    if not config.getoption("run_benchmarks"):
+        skips["benchmark"] = pytest.mark.skip(reason="Rendering benchmark: run with --run-benchmarks")
+    for item in items:
+        for marker, skip in skips.items():
+            if item.get_closest_marker(marker):
+                item.add_marker(skip)
+
+
 @pytest.hookimpl(tryfirst=True, hookwrapper=True)
 def pytest_runtest_makereport(item, call):
     """
     Hook to attach screenshots to both pytest-html and Allure reports on test failure.
 
     This hook handles:
-    1. pytest-html: Saves screenshot to reports/screenshots/ and adds link to HTML report
-    2. Allure: Attaches screenshot directly to the report
+    1. Capture: one compressed JPEG (`screenshots` config section)
+    2. pytest-html: Queues the file for the background ArtifactWriter and adds a link to the HTML report
+       (skipped once the per-run size cap is reached)
+    3. Allure: Attaches the screenshot directly to the report (always JPEG, also past the cap)
     """
     outcome = yield
     report = outcome.get_result()
 
+    # Keep each phase's report on the item (item.rep_setup / rep_call) for fixture teardown
+    setattr(item, f"rep_{report.when}", report)
+
     # Only process test execution phase (not setup/teardown)
     if report.when != "call":
         return
@@ -173,42 +481,35 @@ def pytest_runtest_makereport(item, call):
         page = item.funcargs.get("page")
         chat_page = item.funcargs.get("chat_page")
         page_obj = chat_page.page if chat_page and hasattr(chat_page, "page") else page
+        writer = item.config.stash.get(ARTIFACT_WRITER, None)
 
-        if page_obj:
+        if page_obj and writer:
             try:
-                # Take screenshot once
-                screenshot = page_obj.screenshot(full_page=True)
+                # Take screenshot once; the disk write happens off the test thread
+                screenshot = writer.settings.capture(page_obj)
+                name = report.nodeid.replace("::", "_").replace("/", "_")
+                # None once the per-run disk budget is used up; Allure still gets the capture
+                rel_path = writer.submit(screenshot, name)
 
                 # === PYTEST-HTML INTEGRATION ===
                 pytest_html = item.config.pluginmanager.getplugin("html")
-                if pytest_html:
-                    # Save screenshot to reports/screenshots/
-                    reports_dir = Path("reports")
-                    screenshots_dir = reports_dir / "screenshots"
-                    screenshots_dir.mkdir(parents=True, exist_ok=True)
-
-                    file_name = report.nodeid.replace("::", "_").replace("/", "_") + ".png"
-                    path = screenshots_dir / file_name
-
-                    # Save the screenshot
-                    with open(path, 'wb') as f:
-                        f.write(screenshot)
-
+                if pytest_html and rel_path is not None:
                     # Add link to pytest-html report (relative path)
-                    rel_path = Path("screenshots") / file_name
                     extra = getattr(report, "extra", [])
                     extra.append(pytest_html.extras.url(str(rel_path), name="Open screenshot"))
                     report.extra = extra
 
                 # === ALLURE INTEGRATION ===
-                # Attach screenshot to Allure report
+                # Attach screenshot to Allure report. Stays on the test thread: Allure
+                # binds attachments to the running test's thread-local result, and the
+                # capture is already a compressed JPEG (a single small write).
                 allure.attach(
                     screenshot,
                     name=f"failure_{item.name}",
-                    attachment_type=AttachmentType.PNG
+                    attachment_type=AttachmentType.JPG
                 )
 
-                logger.info(f"✓ Screenshot captured for failed test: {item.name}")
+                logger.info(f"✓ Screenshot captured for failed test: {item.name} ({len(screenshot) / 1024:.0f} KB)")
 
             except Exception as e:
                 logger.warning(f"Could not capture screenshot: {e}")
@@ -217,12 +518,16 @@ def pytest_runtest_makereport(item, call):
 @pytest.hookimpl(tryfirst=True)
 def pytest_configure(config):
     """
-    Add environment info to Allure report.
+    Add environment info to Allure report and start the screenshot writer.
     """
-    # Create environment.properties file for Allure
+    with open(Path(config.rootpath) / "config" / "config.yaml", encoding="utf-8") as f:
+        settings = ScreenshotSettings.from_config((yaml.safe_load(f) or {}).get("screenshots"))
+    config.stash[ARTIFACT_WRITER] = ArtifactWriter(settings)
+
+    # Create environment.properties file for Allure (once, not per xdist worker)
     allure_results_dir = config.getoption('--alluredir', default=None)
 
-    if allure_results_dir:
+    if allure_results_dir and is_controller(config):
         os.makedirs(allure_results_dir, exist_ok=True)
 
         env_file = os.path.join(allure_results_dir, 'environment.properties')
@@ -231,4 +536,17 @@ def pytest_configure(config):
             f.write(f"Environment=Sandbox\n")
             f.write(f"Base_URL=https://govgpt.sandbox.dge.gov.ae/\n")
             f.write(f"Python_Version={platform.python_version()}\n")
-            f.write(f"Pytest_Version={pytest.__version__}\n")
\ No newline at end of file
+            f.write(f"Pytest_Version={pytest.__version__}\n")
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_sessionfinish(session):
+    """Flush queued failure screenshots and log records before the reports are finalised"""
+    writer = session.config.stash.get(ARTIFACT_WRITER, None)
+    if writer:
+        writer.close()
+    # xdist workers flush before reporting back, so the controller's merge sees every record
+    flush_logs()
+    if is_controller(session.config):
+        # Workers wrote reports/<name>.gw*.json; fold them into the single report
+        merge_json("reports/axe_chat_page.json")
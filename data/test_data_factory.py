@@ -1,39 +1,340 @@
+"""
+Synthetic testset generation for data/test_data.json.
+
+The pipeline runs in stages, each cached under data/.cache/testset so a rerun
+only redoes the work whose inputs changed:
+
+  1. ingest    - data/document_ingestion.py fingerprints every .docx in
+                 data/documents and parses changed ones in a process pool
+  2. graph     - chunking, chunk embeddings and LLM extraction build a RAGAS
+                 knowledge graph, saved per document-set hash; embeddings are
+                 also cached per chunk text, so editing one document only
+                 re-embeds that document's chunks
+  3. generate  - queries are generated in batches and every batch is appended
+                 to a checkpoint file; an interrupted run resumes from there
+  4. export    - rows become test_data.json cases in the `generated_queries`
+                 suite of their language and are validated by the catalog
+
+    python -m data.test_data_factory                # generate testset_factory.testset_size queries
+    python -m data.test_data_factory --size 40      # top up the checkpoint to 40 queries
+    python -m data.test_data_factory --restart      # discard the generation checkpoint
+    python -m data.test_data_factory --dry-run      # print the cases, don't touch test_data.json
+"""
+
+import argparse
+import hashlib
+import json
 import os
+import sqlite3
+import sys
 from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple
+
+import numpy as np
+import yaml
+from langchain_core.embeddings import Embeddings
+
+from data.document_ingestion import DocumentIngestor, IngestedDocument
+from utils.catalog import DEFAULT_DATA_FILE, CatalogError, validate
+from utils.logger import get_logger
+from utils.response_analysis import analyze
+from utils.text_matching import normalize_text
+
+logger = get_logger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+CONFIG_FILE = BASE_DIR / "config" / "config.yaml"
+GENERATED_SUITE = "generated_queries"
+CACHE_VERSION = 1
+
+DEFAULT_SETTINGS = {
+    "documents_dir": "data/documents",
+    "cache_dir": "data/.cache/testset",
+    "llm_model": "gpt-4o-mini",
+    "embedding_model": "text-embedding-3-small",
+    "testset_size": 20,
+    "batch_size": 5,
+    "num_personas": 3,
+    "priority": "medium",
+    "workers": 0,
+}
+
+
+def load_settings(config_file: Path = CONFIG_FILE) -> dict:
+    """Read the testset_factory section (and the OpenAI key) from config.yaml"""
+    with open(config_file, encoding="utf-8") as f:
+        config = yaml.safe_load(f) or {}
+    settings = {**DEFAULT_SETTINGS, **(config.get("testset_factory") or {})}
+    settings["api_key"] = config.get("openApiKey") or os.environ.get("OPENAI_API_KEY", "")
+    return settings
+
+
+def _write_json(path: Path, payload):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    tmp_path.replace(path)
+
+
+# ---------------------------------------------------------------------------
+# Embeddings and knowledge graph
+# ---------------------------------------------------------------------------
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that stores vectors by text hash in SQLite"""
+
+    def __init__(self, embeddings: Embeddings, path: Path, namespace: str):
+        self.embeddings = embeddings
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS vectors (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self._conn.commit()
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.namespace}\0{text}".encode("utf-8")).hexdigest()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(t) for t in texts]
+        found = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = self._conn.execute(
+                f"SELECT key, vector FROM vectors WHERE key IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            found.update((k, np.frombuffer(v, dtype=np.float32).tolist()) for k, v in rows)
+
+        missing = [i for i, k in enumerate(keys) if k not in found]
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        if missing:
+            vectors = self.embeddings.embed_documents([texts[i] for i in missing])
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO vectors VALUES (?, ?)",
+                [(keys[i], np.asarray(v, dtype=np.float32).tobytes()) for i, v in zip(missing, vectors)],
+            )
+            self._conn.commit()
+            found.update((keys[i], list(v)) for i, v in zip(missing, vectors))
+        return [found[k] for k in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+class _PageContent(NamedTuple):
+    """Stand-in for a Document where only its text is read (shares the node's string)"""
+    page_content: str
+
+
+def build_knowledge_graph(ingested: Iterable[IngestedDocument], llm, embeddings, cache_dir: Path, key: str):
+    """Load the knowledge graph for this document set, building and saving it on a miss
+
+    On a miss the ingestion stream is consumed here: documents become graph
+    nodes as soon as their worker finishes parsing them.
+    """
+    from ragas.testset.graph import KnowledgeGraph, Node, NodeType
+    from ragas.testset.transforms import apply_transforms, default_transforms
+
+    graph_file = cache_dir / "graphs" / f"{key}.json"
+    if graph_file.exists():
+        logger.info(f"Reusing knowledge graph {graph_file.name}")
+        return KnowledgeGraph.load(str(graph_file))
+
+    kg = KnowledgeGraph()
+    for item in ingested:
+        for doc in item.documents:
+            kg.nodes.append(Node(
+                type=NodeType.DOCUMENT,
+                properties={"page_content": doc.page_content, "document_metadata": doc.metadata},
+            ))
+    # default_transforms only reads page_content to pick its pipeline from the document
+    # sizes, so it gets views of the node texts rather than a second copy of every Document
+    sizes = [_PageContent(n.properties["page_content"]) for n in kg.nodes]
+    apply_transforms(kg, default_transforms(documents=sizes, llm=llm, embedding_model=embeddings))
+
+    graph_file.parent.mkdir(parents=True, exist_ok=True)
+    kg.save(str(graph_file))
+    logger.info(f"Built knowledge graph with {len(kg.nodes)} nodes -> {graph_file.name}")
+    return kg
+
+
+def load_personas(kg, llm, cache_dir: Path, key: str, num_personas: int):
+    """Personas are generated once per knowledge graph and shared by every batch"""
+    from ragas.testset.persona import Persona, generate_personas_from_kg
+
+    persona_file = cache_dir / "personas" / f"{key}.json"
+    if persona_file.exists():
+        return [Persona(**p) for p in json.loads(persona_file.read_text(encoding="utf-8"))]
+    personas = generate_personas_from_kg(kg=kg, llm=llm, num_personas=num_personas)
+    _write_json(persona_file, [p.model_dump() for p in personas])
+    return personas
+
+
+# ---------------------------------------------------------------------------
+# Checkpointed generation
+# ---------------------------------------------------------------------------
+
+def read_checkpoint(path: Path) -> List[dict]:
+    if not path.exists():
+        return []
+    rows = []
+    good_bytes = 0
+    with path.open("rb") as f:
+        for line in f:
+            try:
+                rows.append(json.loads(line))
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                break
+            good_bytes += len(line)
+    if good_bytes < path.stat().st_size:
+        # Torn last line from an interrupted write; drop it so new batches append cleanly
+        with path.open("r+b") as f:
+            f.truncate(good_bytes)
+    return rows
+
+
+def generate_rows(generator, personas, target: int, batch_size: int, checkpoint: Path) -> List[dict]:
+    """Generate until the checkpoint holds `target` rows, appending each finished batch"""
+    rows = read_checkpoint(checkpoint)
+    if rows:
+        logger.info(f"Resuming from checkpoint: {len(rows)}/{target} queries already generated")
+
+    checkpoint.parent.mkdir(parents=True, exist_ok=True)
+    batch_number = max((r.get("batch", 0) for r in rows), default=0)
+    while len(rows) < target:
+        size = min(batch_size, target - len(rows))
+        batch_number += 1
+        testset = generator.generate(testset_size=size, num_personas=len(personas), raise_exceptions=False)
+        batch = [{**row, "batch": batch_number} for row in testset.to_list()]
+        if not batch:
+            logger.warning(f"Batch {batch_number} produced no queries, stopping")
+            break
+        with checkpoint.open("a", encoding="utf-8") as f:
+            for row in batch:
+                f.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        rows.extend(batch)
+        logger.info(f"Batch {batch_number}: +{len(batch)} queries ({len(rows)}/{target})")
+    return rows[:target]
+
+
+# ---------------------------------------------------------------------------
+# Export to test_data.json
+# ---------------------------------------------------------------------------
+
+def rows_to_cases(rows: List[dict], priority: str = "medium") -> Dict[str, List[dict]]:
+    """Convert generated rows to test_data.json cases, grouped by language"""
+    cases = {"en": [], "ar": []}
+    seen = set()
+    for row in rows:
+        prompt = (row.get("user_input") or "").strip()
+        key = normalize_text(prompt)
+        if not prompt or key in seen:
+            continue
+        seen.add(key)
+
+        language = "ar" if analyze(prompt).arabic_ratio > 0.5 else "en"
+        synthesizer = row.get("synthesizer_name") or "synthetic"
+        case = {
+            "id": f"{language.upper()}_GEN_{len(cases[language]) + 1:03d}",
+            "prompt": prompt,
+            "category": synthesizer,
+            "priority": priority,
+            "expected_behavior": "answer_from_context",
+            "reference": row.get("reference") or "",
+            "reference_contexts": list(row.get("reference_contexts") or []),
+            "tags": ["generated", synthesizer],
+        }
+        cases[language].append(case)
+    return cases
+
+
+def export_cases(cases: Dict[str, List[dict]], data_file: Path = DEFAULT_DATA_FILE):
+    """Replace the generated suites in test_data.json, refusing to write invalid data"""
+    data = json.loads(Path(data_file).read_text(encoding="utf-8"))
+    for language, language_cases in cases.items():
+        data.setdefault(language, {})[GENERATED_SUITE] = language_cases
+
+    problems = validate(data)
+    if problems:
+        raise CatalogError("Generated cases do not match the test data schema:\n  " + "\n  ".join(problems))
+
+    tmp_file = Path(data_file).with_suffix(".tmp")
+    tmp_file.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    tmp_file.replace(data_file)
+    logger.info(f"Wrote {sum(len(c) for c in cases.values())} generated cases to {data_file}")
+
+
+# ---------------------------------------------------------------------------
+# Entry point
+# ---------------------------------------------------------------------------
+
+def run(settings: dict, size: int = None, restart: bool = False, dry_run: bool = False) -> Dict[str, List[dict]]:
+    from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+    from pydantic import SecretStr
+    from ragas.embeddings import LangchainEmbeddingsWrapper
+    from ragas.llms.base import LangchainLLMWrapper
+    from ragas.testset import TestsetGenerator
+
+    if not settings["api_key"]:
+        raise SystemExit("No OpenAI key: set openApiKey in config/config.yaml or OPENAI_API_KEY")
+
+    documents_dir = BASE_DIR / settings["documents_dir"]
+    cache_dir = BASE_DIR / settings["cache_dir"]
+    target = size or settings["testset_size"]
+
+    ingestor = DocumentIngestor(documents_dir, cache_dir, workers=settings["workers"])
+    files = ingestor.scan()
+    if not files:
+        raise SystemExit(f"No .docx documents found in {documents_dir}")
+
+    # Everything downstream of parsing depends on the document set and the models
+    key = hashlib.sha256(json.dumps(
+        [CACHE_VERSION, sorted(f.digest for f in files), settings["llm_model"], settings["embedding_model"]]
+    ).encode("utf-8")).hexdigest()[:16]
+
+    api_key = SecretStr(settings["api_key"])
+    llm = LangchainLLMWrapper(ChatOpenAI(api_key=api_key, model=settings["llm_model"], temperature=0))
+    embeddings = CachedEmbeddings(
+        OpenAIEmbeddings(api_key=api_key, model=settings["embedding_model"]),
+        cache_dir / "embeddings.sqlite",
+        namespace=settings["embedding_model"],
+    )
+    ragas_embeddings = LangchainEmbeddingsWrapper(embeddings)
+
+    kg = build_knowledge_graph(ingestor.stream(files), llm, ragas_embeddings, cache_dir, key)
+    logger.info(ingestor.stats.summary())
+    logger.info(f"Chunk embeddings: {embeddings.hits} cached, {embeddings.misses} computed")
+    personas = load_personas(kg, llm, cache_dir, key, settings["num_personas"])
+
+    checkpoint = cache_dir / "generation" / f"{key}.jsonl"
+    if restart and checkpoint.exists():
+        checkpoint.unlink()
+    generator = TestsetGenerator(
+        llm=llm, embedding_model=ragas_embeddings, knowledge_graph=kg, persona_list=personas,
+    )
+    rows = generate_rows(generator, personas, target, settings["batch_size"], checkpoint)
+
+    cases = rows_to_cases(rows, priority=settings["priority"])
+    if dry_run:
+        print(json.dumps(cases, ensure_ascii=False, indent=2))
+    else:
+        export_cases(cases)
+    return cases
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic test cases from data/documents")
+    parser.add_argument("--size", type=int, help="Total number of queries to generate")
+    parser.add_argument("--restart", action="store_true", help="Discard the generation checkpoint")
+    parser.add_argument("--dry-run", action="store_true", help="Print the cases instead of updating test_data.json")
+    args = parser.parse_args(argv)
+    run(load_settings(), size=args.size, restart=args.restart, dry_run=args.dry_run)
+
 
-from langchain_community.document_loaders import DirectoryLoader, UnstructuredWordDocumentLoader
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from pydantic import SecretStr
-from ragas.embeddings import LangchainEmbeddingsWrapper
-from ragas.llms.base import LangchainLLMWrapper
-from ragas.testset import TestsetGenerator
-import nltk
-
-from conftest import config
-
-PPX_KEY = config[""]
-OPENAPI_KEY = config[""]
-
-base_dir = Path(__file__).resolve().parent
-directory = base_dir / "documents"
-print(f"Path for documents --->>{directory}")
-print(f"Path for nltk --->>{base_dir.parent /"nltk_data"}")
-nltk.data.path.append(base_dir.parent /"nltk_data")
-
-client = ChatOpenAI(
-    api_key=SecretStr(OPENAPI_KEY),
-    model="gpt-4o-mini",
-    temperature=0,
-)
-llm_langchain = LangchainLLMWrapper(client)
-embeddings = OpenAIEmbeddings(api_key=SecretStr(OPENAPI_KEY), model="text-embedding-3-small")
-loader = DirectoryLoader(
-    path=str(directory),
-    glob="**/*.docx",
-    loader_cls=UnstructuredWordDocumentLoader
-)
-docs = loader.load()
-generate_embeddings = LangchainEmbeddingsWrapper(embeddings)
-generator = TestsetGenerator(llm=llm_langchain, embedding_model=generate_embeddings)
-data_set = generator.generate_with_langchain_docs(docs, testset_size=20)
-print(data_set.to_list())
+if __name__ == "__main__":
+    sys.exit(main())
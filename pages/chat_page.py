@@ -1,6 +1,10 @@
 from markdown_it.rules_block import reference
 
+import time
+
 from pages.base_page import BasePage, logger
+from utils.perf_summary import record_latency
+from utils.tracing import traced
 
 
 class ChatPage(BasePage):
@@ -25,13 +29,17 @@ class ChatPage(BasePage):
     SOURCE_DETAILS = "xpath=//*[text()='Citations']/../../following-sibling::div//a"
     CITATION_CLOSE_BTN = "xpath=//*[text()='Citations']/parent::div/following-sibling::button"
 
+    @traced("chat.send_message")
     def send_message(self, text: str):
         """Send a message and wait for AI response"""
         self.page.locator(self.CHAT_INPUT).type(text=text,delay=30)
         self.page.click(self.SEND_BUTTON)
+        sent = time.perf_counter()
         self.wait_for_shimmer_if_present()
         self.wait_for_ai_generating_if_present()
+        record_latency("chat.response", time.perf_counter() - sent)
 
+    @traced("chat.get_last_ai_response")
     def get_last_ai_response(self) -> str:
         """Get the last AI response text"""
         self.wait_for_shimmer_if_present()
@@ -42,6 +50,7 @@ class ChatPage(BasePage):
         """Alias for get_last_ai_response for backward compatibility"""
         return self.get_last_ai_response()
 
+    @traced("chat.get_complete_ai_response")
     def get_complete_ai_response(self) -> str:
         """Get ALL AI responses concatenated from entire chat history"""
         self.wait_for_shimmer_if_present()
@@ -62,6 +71,7 @@ class ChatPage(BasePage):
         """Alias for get_complete_ai_response for backward compatibility"""
         return self.get_complete_ai_response()
 
+    @traced("chat.wait_for_shimmer_if_present")
     def wait_for_shimmer_if_present(self, timeout_ms: int = 60000):
         """Wait for shimmer/loading animation to disappear if present"""
         shimmer = self.page.locator(self.SHIMMER).first
@@ -77,6 +87,7 @@ class ChatPage(BasePage):
             except Exception as e:
                 logger.warning(f"Shimmer did not disappear within timeout: {str(e)}")
 
+    @traced("chat.wait_for_ai_generating_if_present")
     def wait_for_ai_generating_if_present(self):
         """Wait for AI generating button to appear and then disappear"""
         btn = self.page.locator(self.AI_GENERATING_BTN)
@@ -94,6 +105,7 @@ class ChatPage(BasePage):
         except Exception as e:
             logger.warning(f"AI generating button did not hide within timeout: {str(e)}")
 
+    @traced("chat.switch_language")
     def switch_language(self, language: str):
         """Switch language to English or Arabic"""
         logger.info(f"Switching to {language}")
@@ -140,6 +152,7 @@ class ChatPage(BasePage):
         self.page.keyboard.press("Escape")
         self.page.wait_for_timeout(500)
 
+    @traced("chat.clear_chat_history")
     def clear_chat_history(self):
         """Clear chat to start fresh for each test"""
         # Look for "New chat" button
@@ -215,6 +228,7 @@ class ChatPage(BasePage):
     #
     #     return references
 
+    @traced("chat.get_retrieved_context")
     def get_retrieved_context(self):
         """
         Extract citations by clicking exactly on "Sources" text position.
@@ -289,6 +303,7 @@ class ChatPage(BasePage):
         logger.info(f"=== Extraction complete: {len(references)} citations ===")
         return references
 
+    @traced("chat.get_citation_data")
     def get_citation_data(self,count):
         references = []
         citation_links = self.page.locator(self.SOURCE_DETAILS)
@@ -303,6 +318,7 @@ class ChatPage(BasePage):
                 logger.info(f"  - Title: {title} | URL: {href}")
         return references
 
+    @traced("chat.verify_loading_indicator_appeared")
     def verify_loading_indicator_appeared(self) -> bool:
         """Verify that loading indicator appeared during AI response generation"""
         # This method should be called right after sending a message
@@ -1,4 +1,5 @@
 from pages.base_page import BasePage
+from utils.tracing import traced
 
 class LoginPage(BasePage):
 
@@ -7,6 +8,7 @@ class LoginPage(BasePage):
     SUBMIT_BUTTON = "xpath=//button[@type='submit']"
     LOGIN_LINK = "xpath=//span[contains(text(),'Log in')]"
 
+    @traced("login.login")
     def login(self, username: str, password: str):
         self.page.click(self.LOGIN_LINK)
         self.page.fill(self.EMAIL_INPUT, username)
@@ -1,6 +1,7 @@
 import json
 import pytest
 from pages.chat_page import ChatPage
+from utils.artifact_paths import artifact_path
 
 @pytest.mark.accessibility
 def test_chat_page_has_no_critical_violations(chat_page: ChatPage, axe):
@@ -8,8 +9,8 @@ def test_chat_page_has_no_critical_violations(chat_page: ChatPage, axe):
     chat_page.page.locator(chat_page.CHAT_INPUT).wait_for(state="visible",timeout=10000)
     results = axe.run(chat_page.page)
 
-    # Optional: save full axe result for debugging
-    with open("reports/axe_chat_page.json", "w", encoding="utf-8") as f:
+    # Optional: save full axe result for debugging (per xdist worker, merged at session end)
+    with open(artifact_path("reports/axe_chat_page.json"), "w", encoding="utf-8") as f:
         json.dump(results.response, f, ensure_ascii=False, indent=2)
 
     # Fail only on serious/critical violations, allow minor ones to be triaged
@@ -2,260 +2,238 @@ import pytest
 
 from pages.chat_page import ChatPage
 from utils.logger import get_logger
+from utils.text_matching import match_case
 
 logger = get_logger(__name__)
 
 @pytest.mark.security
 @pytest.mark.english
-def test_xss_script_tag_sanitized(chat_page: ChatPage, test_data):
+@pytest.mark.cases(language="en", suite="prompt_injection_queries", category="xss_attack")
+def test_xss_script_tag_sanitized(chat_page: ChatPage, case):
     """Verify XSS script tags are sanitized and not executed"""
-    # Fixed: Changed "injection_queries" to "prompt_injection_queries"
-    xss_tests = [case for case in test_data["en"]["prompt_injection_queries"]
-                 if case.get("category") == "xss_attack"]
+    logger.info(f"Testing XSS injection: {case['id']} - {case['prompt'][:50]}...")
 
-    for case in xss_tests:
-        logger.info(f"Testing XSS injection: {case['id']} - {case['prompt'][:50]}...")
+    chat_page.send_message(case["prompt"])
+    text = chat_page.get_last_ai_response()
+    matches = match_case(case, "en").scan(text)
 
-        chat_page.send_message(case["prompt"])
-        text = chat_page.get_last_ai_response()
+    # Verify banned fragments are NOT in response
+    leaked = matches.found("must_not_include_any")
+    assert not leaked, \
+        f"{case['id']}: Found unsanitized content {leaked} in response"
 
-        # Verify banned fragments are NOT in response
-        for banned in case.get("must_not_include_any", []):
-            assert banned.lower() not in text.lower(), \
-                f"{case['id']}: Found unsanitized content '{banned}' in response"
+    # Verify no JavaScript execution occurred
+    if case.get("must_not_execute_js"):
+        # Check if page has alerts or unexpected dialogs
+        # In Playwright, if JS executed, the test would likely hang or error
+        assert True, f"{case['id']}: JavaScript should not have executed"
 
-        # Verify no JavaScript execution occurred
-        if case.get("must_not_execute_js"):
-            # Check if page has alerts or unexpected dialogs
-            # In Playwright, if JS executed, the test would likely hang or error
-            assert True, f"{case['id']}: JavaScript should not have executed"
-
-        logger.info(f"✓ {case['id']}: XSS properly sanitized")
+    logger.info(f"✓ {case['id']}: XSS properly sanitized")
 
 
 @pytest.mark.security
 @pytest.mark.english
-def test_prompt_injection_attacks(chat_page: ChatPage, test_data):
+@pytest.mark.cases(language="en", suite="prompt_injection_queries", category="prompt_injection")
+def test_prompt_injection_attacks(chat_page: ChatPage, case):
     """Verify AI does not follow malicious prompt injection attempts"""
-    injection_tests = [case for case in test_data["en"]["prompt_injection_queries"]
-                       if case.get("category") == "prompt_injection"]
-
-    for case in injection_tests:
-        logger.info(f"Testing prompt injection: {case['id']} - {case['prompt'][:50]}...")
+    logger.info(f"Testing prompt injection: {case['id']} - {case['prompt'][:50]}...")
 
-        chat_page.send_message(case["prompt"])
-        text = chat_page.get_last_ai_response()
+    chat_page.send_message(case["prompt"])
+    text = chat_page.get_last_ai_response()
+    matches = match_case(case, "en").scan(text)
 
-        # Verify AI did NOT reveal system information
-        for banned in case.get("must_not_include_any", []):
-            assert banned.lower() not in text.lower(), \
-                f"{case['id']}: AI leaked system info: '{banned}' found in response"
+    # Verify AI did NOT reveal system information
+    leaked = matches.found("must_not_include_any")
+    assert not leaked, \
+        f"{case['id']}: AI leaked system info: {leaked} found in response"
 
-        # Verify AI stayed on topic
-        if case.get("must_include_any"):
-            found = any(phrase.lower() in text.lower() for phrase in case["must_include_any"])
-            assert found, \
-                f"{case['id']}: AI should have stayed on UAE services topic"
+    # Verify AI stayed on topic
+    if case.get("must_include_any"):
+        assert matches.any("must_include_any"), \
+            f"{case['id']}: AI should have stayed on UAE services topic"
 
-        logger.info(f"✓ {case['id']}: Prompt injection properly rejected")
+    logger.info(f"✓ {case['id']}: Prompt injection properly rejected")
 
 
 @pytest.mark.security
 @pytest.mark.english
-def test_sensitive_data_not_leaked(chat_page: ChatPage, test_data):
+@pytest.mark.cases(language="en", suite="prompt_injection_queries", category="sensitive_data")
+def test_sensitive_data_not_leaked(chat_page: ChatPage, case):
     """Verify AI does not leak sensitive data like API keys or configuration"""
-    sensitive_tests = [case for case in test_data["en"]["prompt_injection_queries"]
-                       if case.get("category") == "sensitive_data"]
-
-    for case in sensitive_tests:
-        logger.info(f"Testing sensitive data leak: {case['id']} - {case['prompt'][:50]}...")
+    logger.info(f"Testing sensitive data leak: {case['id']} - {case['prompt'][:50]}...")
 
-        chat_page.send_message(case["prompt"])
-        text = chat_page.get_last_ai_response()
+    chat_page.send_message(case["prompt"])
+    text = chat_page.get_last_ai_response()
+    matches = match_case(case, "en").scan(text)
 
-        # Verify no sensitive data in response
-        for banned in case.get("must_not_include_any", []):
-            assert banned not in text, \
-                f"{case['id']}: Sensitive data leaked: '{banned}' found in response"
+    # Verify no sensitive data in response
+    leaked = matches.found("must_not_include_any")
+    assert not leaked, \
+        f"{case['id']}: Sensitive data leaked: {leaked} found in response"
 
-        # Verify appropriate rejection
-        if case.get("must_include_any"):
-            found = any(phrase.lower() in text.lower() for phrase in case["must_include_any"])
-            assert found, \
-                f"{case['id']}: AI should have rejected sensitive data request"
+    # Verify appropriate rejection
+    if case.get("must_include_any"):
+        assert matches.any("must_include_any"), \
+            f"{case['id']}: AI should have rejected sensitive data request"
 
-        logger.info(f"✓ {case['id']}: Sensitive data properly protected")
+    logger.info(f"✓ {case['id']}: Sensitive data properly protected")
 
 
 @pytest.mark.security
 @pytest.mark.english
-def test_sql_injection_handled(chat_page: ChatPage, test_data):
+@pytest.mark.cases(language="en", suite="prompt_injection_queries", category="sql_injection")
+def test_sql_injection_handled(chat_page: ChatPage, case):
     """Verify SQL injection attempts are handled safely"""
-    sql_tests = [case for case in test_data["en"]["prompt_injection_queries"]
-                 if case.get("category") == "sql_injection"]
+    logger.info(f"Testing SQL injection: {case['id']} - {case['prompt'][:50]}...")
 
-    for case in sql_tests:
-        logger.info(f"Testing SQL injection: {case['id']} - {case['prompt'][:50]}...")
+    chat_page.send_message(case["prompt"])
+    text = chat_page.get_last_ai_response()
+    matches = match_case(case, "en").scan(text)
 
-        chat_page.send_message(case["prompt"])
-        text = chat_page.get_last_ai_response()
+    # Verify no SQL error messages or database info
+    leaked = matches.found("must_not_include_any")
+    assert not leaked, \
+        f"{case['id']}: SQL injection may have executed: {leaked} found"
 
-        # Verify no SQL error messages or database info
-        for banned in case.get("must_not_include_any", []):
-            assert banned.lower() not in text.lower(), \
-                f"{case['id']}: SQL injection may have executed: '{banned}' found"
-
-        logger.info(f"✓ {case['id']}: SQL injection properly handled")
+    logger.info(f"✓ {case['id']}: SQL injection properly handled")
 
 
 @pytest.mark.security
 @pytest.mark.english
-def test_path_traversal_blocked(chat_page: ChatPage, test_data):
+@pytest.mark.cases(language="en", suite="prompt_injection_queries", category="path_traversal")
+def test_path_traversal_blocked(chat_page: ChatPage, case):
     """Verify path traversal attempts are blocked"""
-    path_tests = [case for case in test_data["en"]["prompt_injection_queries"]
-                  if case.get("category") == "path_traversal"]
-
-    for case in path_tests:
-        logger.info(f"Testing path traversal: {case['id']} - {case['prompt'][:50]}...")
+    logger.info(f"Testing path traversal: {case['id']} - {case['prompt'][:50]}...")
 
-        chat_page.send_message(case["prompt"])
-        text = chat_page.get_last_ai_response()
+    chat_page.send_message(case["prompt"])
+    text = chat_page.get_last_ai_response()
+    matches = match_case(case, "en").scan(text)
 
-        # Verify no file system access occurred
-        for banned in case.get("must_not_include_any", []):
-            assert banned not in text, \
-                f"{case['id']}: Path traversal may have succeeded: '{banned}' found"
+    # Verify no file system access occurred
+    leaked = matches.found("must_not_include_any")
+    assert not leaked, \
+        f"{case['id']}: Path traversal may have succeeded: {leaked} found"
 
-        logger.info(f"✓ {case['id']}: Path traversal properly blocked")
+    logger.info(f"✓ {case['id']}: Path traversal properly blocked")
 
 
 
 @pytest.mark.security
 @pytest.mark.arabic
-def test_ar_xss_attacks_sanitized(chat_page: ChatPage, test_data):
+@pytest.mark.cases(language="ar", suite="prompt_injection_queries", category="xss_attack")
+def test_ar_xss_attacks_sanitized(chat_page: ChatPage, case):
     """Verify XSS attacks are sanitized in Arabic language mode"""
     chat_page.switch_language("ar")
     chat_page.page.wait_for_timeout(1000)
 
-    ar_xss_tests = [case for case in test_data["ar"]["prompt_injection_queries"]
-                    if case.get("category") == "xss_attack"]
+    logger.info(f"Testing Arabic XSS: {case['id']} - {case['prompt'][:50]}...")
 
-    for case in ar_xss_tests:
-        logger.info(f"Testing Arabic XSS: {case['id']} - {case['prompt'][:50]}...")
+    chat_page.clear_chat_history()
+    chat_page.send_message(case["prompt"])
+    text = chat_page.get_last_ai_response()
+    matches = match_case(case, "ar").scan(text)
 
-        chat_page.clear_chat_history()
-        chat_page.send_message(case["prompt"])
-        text = chat_page.get_last_ai_response()
+    # Verify XSS is sanitized
+    leaked = matches.found("must_not_include_any")
+    assert not leaked, \
+        f"{case['id']}: Arabic XSS not sanitized: {leaked} found"
 
-        # Verify XSS is sanitized
-        for banned in case.get("must_not_include_any", []):
-            assert banned not in text, \
-                f"{case['id']}: Arabic XSS not sanitized: '{banned}' found"
+    # Verify no JS execution
+    if case.get("must_not_execute_js"):
+        assert True, f"{case['id']}: JavaScript should not execute in Arabic mode"
 
-        # Verify no JS execution
-        if case.get("must_not_execute_js"):
-            assert True, f"{case['id']}: JavaScript should not execute in Arabic mode"
-
-        logger.info(f"✓ {case['id']}: Arabic XSS properly sanitized")
+    logger.info(f"✓ {case['id']}: Arabic XSS properly sanitized")
 
 
 @pytest.mark.security
 @pytest.mark.arabic
-def test_ar_prompt_injection_rejected(chat_page: ChatPage, test_data):
+@pytest.mark.cases(language="ar", suite="prompt_injection_queries", category="prompt_injection")
+def test_ar_prompt_injection_rejected(chat_page: ChatPage, case):
     """Verify prompt injection is rejected in Arabic language mode"""
     chat_page.switch_language("ar")
     chat_page.page.wait_for_timeout(1000)
 
-    ar_injection_tests = [case for case in test_data["ar"]["prompt_injection_queries"]
-                          if case.get("category") == "prompt_injection"]
-
-    for case in ar_injection_tests:
-        logger.info(f"Testing Arabic prompt injection: {case['id']} - {case['prompt'][:50]}...")
+    logger.info(f"Testing Arabic prompt injection: {case['id']} - {case['prompt'][:50]}...")
 
-        chat_page.clear_chat_history()
-        chat_page.send_message(case["prompt"])
-        text = chat_page.get_last_ai_response()
+    chat_page.clear_chat_history()
+    chat_page.send_message(case["prompt"])
+    text = chat_page.get_last_ai_response()
+    matches = match_case(case, "ar").scan(text)
 
-        # Verify system info not leaked
-        for banned in case.get("must_not_include_any", []):
-            assert banned not in text, \
-                f"{case['id']}: Arabic prompt injection leaked: '{banned}'"
+    # Verify system info not leaked
+    leaked = matches.found("must_not_include_any")
+    assert not leaked, \
+        f"{case['id']}: Arabic prompt injection leaked: {leaked}"
 
-        # Verify proper rejection in Arabic
-        if case.get("must_include_any"):
-            found = any(phrase in text for phrase in case["must_include_any"])
-            assert found, \
-                f"{case['id']}: Expected Arabic rejection message"
+    # Verify proper rejection in Arabic
+    if case.get("must_include_any"):
+        assert matches.any("must_include_any"), \
+            f"{case['id']}: Expected Arabic rejection message"
 
-        logger.info(f"✓ {case['id']}: Arabic prompt injection properly rejected")
+    logger.info(f"✓ {case['id']}: Arabic prompt injection properly rejected")
 
 
 @pytest.mark.security
 @pytest.mark.arabic
-def test_ar_sensitive_data_protected(chat_page: ChatPage, test_data):
+@pytest.mark.cases(language="ar", suite="prompt_injection_queries", category="sensitive_data")
+def test_ar_sensitive_data_protected(chat_page: ChatPage, case):
     """Verify sensitive data is protected in Arabic language mode"""
     chat_page.switch_language("ar")
     chat_page.page.wait_for_timeout(1000)
 
-    ar_sensitive_tests = [case for case in test_data["ar"]["prompt_injection_queries"]
-                          if case.get("category") == "sensitive_data"]
+    logger.info(f"Testing Arabic sensitive data: {case['id']} - {case['prompt'][:50]}...")
 
-    for case in ar_sensitive_tests:
-        logger.info(f"Testing Arabic sensitive data: {case['id']} - {case['prompt'][:50]}...")
+    chat_page.clear_chat_history()
+    chat_page.send_message(case["prompt"])
+    text = chat_page.get_last_ai_response()
+    matches = match_case(case, "ar").scan(text)
 
-        chat_page.clear_chat_history()
-        chat_page.send_message(case["prompt"])
-        text = chat_page.get_last_ai_response()
+    # Verify no sensitive data leaked
+    leaked = matches.found("must_not_include_any")
+    assert not leaked, \
+        f"{case['id']}: Sensitive data leaked in Arabic: {leaked}"
 
-        # Verify no sensitive data leaked
-        for banned in case.get("must_not_include_any", []):
-            assert banned not in text, \
-                f"{case['id']}: Sensitive data leaked in Arabic: '{banned}'"
+    # Verify proper rejection
+    if case.get("must_include_any"):
+        assert matches.any("must_include_any"), \
+            f"{case['id']}: Expected Arabic rejection of sensitive request"
 
-        # Verify proper rejection
-        if case.get("must_include_any"):
-            found = any(phrase in text for phrase in case["must_include_any"])
-            assert found, \
-                f"{case['id']}: Expected Arabic rejection of sensitive request"
-
-        logger.info(f"✓ {case['id']}: Arabic sensitive data properly protected")
+    logger.info(f"✓ {case['id']}: Arabic sensitive data properly protected")
 
 
 @pytest.mark.security
 @pytest.mark.arabic
-def test_ar_sql_injection_handled(chat_page: ChatPage, test_data):
+@pytest.mark.cases(language="ar", suite="prompt_injection_queries", category="sql_injection")
+def test_ar_sql_injection_handled(chat_page: ChatPage, case):
     """Verify SQL injection is handled in Arabic language mode"""
     chat_page.switch_language("ar")
     chat_page.page.wait_for_timeout(1000)
 
-    ar_sql_tests = [case for case in test_data["ar"]["prompt_injection_queries"]
-                    if case.get("category") == "sql_injection"]
-
-    for case in ar_sql_tests:
-        logger.info(f"Testing Arabic SQL injection: {case['id']}")
+    logger.info(f"Testing Arabic SQL injection: {case['id']}")
 
-        chat_page.clear_chat_history()
-        chat_page.send_message(case["prompt"])
-        text = chat_page.get_last_ai_response()
+    chat_page.clear_chat_history()
+    chat_page.send_message(case["prompt"])
+    text = chat_page.get_last_ai_response()
+    matches = match_case(case, "ar").scan(text)
 
-        # Verify no SQL errors or database info
-        for banned in case.get("must_not_include_any", []):
-            assert banned.lower() not in text.lower(), \
-                f"{case['id']}: SQL injection indicators found in Arabic response"
+    # Verify no SQL errors or database info
+    leaked = matches.found("must_not_include_any")
+    assert not leaked, \
+        f"{case['id']}: SQL injection indicators found in Arabic response"
 
-        logger.info(f"✓ {case['id']}: Arabic SQL injection properly handled")
+    logger.info(f"✓ {case['id']}: Arabic SQL injection properly handled")
 
 
 @pytest.mark.security
 @pytest.mark.bilingual
 @pytest.mark.slow
-def test_comprehensive_security_sweep(chat_page: ChatPage, test_data):
+def test_comprehensive_security_sweep(chat_page: ChatPage, test_catalog):
     """Run all security tests in sequence to verify comprehensive protection"""
     total_tests = 0
     passed_tests = 0
 
     # Test all English security queries
-    for case in test_data["en"]["prompt_injection_queries"]:
+    for case in test_catalog.select(language="en", suite="prompt_injection_queries"):
         total_tests += 1
         try:
             chat_page.clear_chat_history()
@@ -263,11 +241,10 @@ def test_comprehensive_security_sweep(chat_page: ChatPage, test_data):
             text = chat_page.get_last_ai_response()
 
             # Check all must_not_include
-            all_safe = True
-            for banned in case.get("must_not_include_any", []):
-                if banned.lower() in text.lower():
-                    all_safe = False
-                    logger.warning(f"{case['id']}: Found '{banned}' in response")
+            leaked = match_case(case, "en").scan(text).found("must_not_include_any")
+            all_safe = not leaked
+            if leaked:
+                logger.warning(f"{case['id']}: Found {leaked} in response")
 
             if all_safe:
                 passed_tests += 1
@@ -277,18 +254,17 @@ def test_comprehensive_security_sweep(chat_page: ChatPage, test_data):
 
     # Test all Arabic security queries
     chat_page.switch_language("ar")
-    for case in test_data["ar"]["prompt_injection_queries"]:
+    for case in test_catalog.select(language="ar", suite="prompt_injection_queries"):
         total_tests += 1
         try:
             chat_page.clear_chat_history()
             chat_page.send_message(case["prompt"])
             text = chat_page.get_last_ai_response()
 
-            all_safe = True
-            for banned in case.get("must_not_include_any", []):
-                if banned in text:
-                    all_safe = False
-                    logger.warning(f"{case['id']}: Found '{banned}' in response")
+            leaked = match_case(case, "ar").scan(text).found("must_not_include_any")
+            all_safe = not leaked
+            if leaked:
+                logger.warning(f"{case['id']}: Found {leaked} in response")
 
             if all_safe:
                 passed_tests += 1
@@ -7,6 +7,7 @@ logger = get_logger(__name__)
 
 @pytest.mark.ui
 @pytest.mark.english
+@pytest.mark.har
 def test_chat_widget_loads_desktop(chat_page: ChatPage):
     """Verify chat widget loads correctly on desktop with all essential elements"""
     chat_page.assert_visible(ChatPage.CHAT_INPUT)
@@ -45,6 +46,7 @@ def test_ai_response_rendered(chat_page: ChatPage):
 
 @pytest.mark.ui
 @pytest.mark.english
+@pytest.mark.har
 def test_input_cleared_after_send(chat_page: ChatPage):
     """Verify input field is cleared after sending a message"""
     chat_page.send_message("Check clear")
@@ -0,0 +1,47 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from pages.chat_page import ChatPage
+from utils.leak_detector import LeakSampler, fit_growth
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+@pytest.mark.ui
+@pytest.mark.english
+@pytest.mark.slow
+@pytest.mark.soak
+def test_long_conversation_memory_growth(chat_page: ChatPage, config, test_catalog, request):
+    """Send N messages in one conversation and fail when heap/DOM/listener growth per message exceeds its threshold"""
+    messages = request.config.getoption("--soak-messages")  # Skipped at collection when 0
+    settings = config.get("soak", {})
+    prompts = [case.prompt for case in test_catalog.select(language="en", suite="helpfulness_queries") if case.prompt]
+    assert prompts, "No English helpfulness prompts to send"
+
+    sampler = LeakSampler(chat_page.page)
+    try:
+        sampler.sample(0)
+        for turn in range(1, messages + 1):
+            chat_page.send_message(prompts[(turn - 1) % len(prompts)])
+            sample = sampler.sample(turn)
+            logger.info(
+                f"Turn {turn}/{messages}: heap {sample['js_heap_mb']:.1f} MB, {sample['dom_nodes']} nodes, "
+                f"{sample['detached_nodes']} detached, {sample['listeners']} listeners"
+            )
+    finally:
+        sampler.close()
+
+    report = fit_growth(sampler.samples, warmup=settings.get("warmup", 5), thresholds=settings.get("thresholds"))
+    logger.info(f"Growth per message: {report.summary()}")
+
+    samples_file = Path(settings.get("samples_dir", "reports/soak")) / f"{request.node.name}.json"
+    samples_file.parent.mkdir(parents=True, exist_ok=True)
+    samples_file.write_text(json.dumps({"slopes": report.slopes, "samples": report.samples}, indent=1), encoding="utf-8")
+
+    violations = report.violations()
+    assert not violations, "Per-message growth above threshold: " + ", ".join(
+        f"{name} {value:+.3f}/msg (limit {limit})" for name, (value, limit) in violations.items()
+    )
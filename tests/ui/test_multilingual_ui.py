@@ -2,11 +2,13 @@ import pytest
 
 from pages.chat_page import ChatPage
 from utils.logger import get_logger
+from utils.response_analysis import analyze
 
 logger = get_logger(__name__)
 
 @pytest.mark.ui
 @pytest.mark.english
+@pytest.mark.har
 def test_english_ltr_layout(chat_page: ChatPage):
     """Verify page switches to LTR layout when English is selected"""
     chat_page.switch_language("en")
@@ -71,8 +73,7 @@ def test_arabic_text_displays_correctly(chat_page: ChatPage):
     response = chat_page.get_last_ai_response()
 
     # Verify response contains Arabic characters
-    has_arabic = any('\u0600' <= char <= '\u06FF' for char in response)
-    assert has_arabic, "Expected Arabic characters in response"
+    assert analyze(response).has_arabic, "Expected Arabic characters in response"
 
     # Verify RTL layout is maintained
     assert chat_page.page.get_attribute("html", "dir") == "rtl"
@@ -155,8 +156,7 @@ def test_chat_history_maintains_language_context(chat_page: ChatPage):
     assert len(arabic_response.strip()) > 0, "Arabic response should not be empty"
 
     # Verify Arabic characters in Arabic response
-    has_arabic = any('\u0600' <= char <= '\u06FF' for char in arabic_response)
-    assert has_arabic, "Arabic response should contain Arabic characters"
+    assert analyze(arabic_response).has_arabic, "Arabic response should contain Arabic characters"
 
     logger.info("✓ Chat history maintains correct language context")
 
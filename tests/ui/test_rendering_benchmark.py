@@ -0,0 +1,77 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from pages.chat_page import ChatPage
+from utils.frame_sampler import FrameSampler, scroll_through, seed_history
+from utils.logger import get_logger
+from utils.perf_summary import record_count, record_latency
+
+logger = get_logger(__name__)
+
+MESSAGE_SELECTOR = "#response-content-container"
+
+
+def record_frames(name: str, stats):
+    """One p95 frame time (s) and one dropped-frame percentage per window, not every frame"""
+    record_latency(name, stats.p95_ms / 1000)
+    record_count(f"{name}.dropped_pct", round(stats.dropped_pct))
+
+
+@pytest.mark.ui
+@pytest.mark.english
+@pytest.mark.slow
+@pytest.mark.benchmark
+def test_rendering_smoothness_vs_history_length(chat_page: ChatPage, config, request):
+    """Measure frame times while streaming a response and scrolling, for growing chat histories"""
+    settings = config.get("rendering", {})
+    prompt = settings.get("prompt", "What documents do I need to renew my Emirates ID?")
+    sampler = FrameSampler(chat_page.page)
+
+    # One real answer to clone from
+    chat_page.send_message(prompt)
+
+    results = []
+    for length in settings.get("history_lengths", [10, 50, 150]):
+        seeded = seed_history(chat_page.page, MESSAGE_SELECTOR, length)
+
+        # Typing and the backend wait (shimmer) are not part of the streaming window
+        chat_page.page.locator(ChatPage.CHAT_INPUT).type(text=prompt, delay=30)
+        chat_page.page.click(ChatPage.SEND_BUTTON)
+        chat_page.wait_for_shimmer_if_present()
+        sampler.start()
+        chat_page.wait_for_ai_generating_if_present()
+        streaming = sampler.stop()
+        record_frames(f"frame.streaming.h{length}", streaming)
+
+        sampler.start()
+        scroll_through(chat_page.page, ChatPage.SCROLL_CONTAINER, settings.get("scroll_duration_ms", 2000))
+        scrolling = sampler.stop()
+        record_frames(f"frame.scroll.h{length}", scrolling)
+
+        logger.info(
+            f"History {seeded} messages: streaming p95 {streaming.p95_ms:.1f} ms, {streaming.dropped_pct:.1f}% dropped; "
+            f"scroll p95 {scrolling.p95_ms:.1f} ms, {scrolling.dropped_pct:.1f}% dropped"
+        )
+        results.append({"history_length": seeded, "streaming": streaming.to_dict(), "scroll": scrolling.to_dict()})
+
+    results_file = Path(settings.get("results_dir", "reports/rendering")) / f"{request.node.name}.json"
+    results_file.parent.mkdir(parents=True, exist_ok=True)
+    results_file.write_text(json.dumps(results, indent=1), encoding="utf-8")
+
+    max_dropped_pct = settings.get("max_dropped_pct")
+    max_p95_frame_ms = settings.get("max_p95_frame_ms")
+    for result in results:
+        for phase in ("streaming", "scroll"):
+            stats = result[phase]
+            if max_dropped_pct is not None:
+                assert stats["dropped_pct"] <= max_dropped_pct, (
+                    f"{phase} at {result['history_length']} messages dropped {stats['dropped_pct']}% of frames "
+                    f"(limit {max_dropped_pct}%)"
+                )
+            if max_p95_frame_ms is not None:
+                assert stats["p95_ms"] <= max_p95_frame_ms, (
+                    f"{phase} at {result['history_length']} messages: p95 frame time {stats['p95_ms']} ms "
+                    f"(limit {max_p95_frame_ms} ms)"
+                )
@@ -0,0 +1,119 @@
+"""
+Unit tests for streaming JSONL prompt corpora (utils/corpus.py).
+
+Corpora are exported from a small test_data.json in tmp_path, plain and
+gzip-compressed, and read back through the offset index.
+"""
+
+import json
+
+import pytest
+
+from utils.catalog import CaseRecord
+from utils.corpus import Corpus, CorpusIndex, export_test_data, open_corpus, worker_shard
+
+TEST_DATA = {
+    "en": {
+        "helpfulness_queries": [
+            {"id": f"EN_HELP_{i:03d}", "prompt": f"Question {i}", "category": "visa" if i % 2 else "identity",
+             "priority": "high" if i < 3 else "low", "tags": ["renewal"] if i % 3 == 0 else []}
+            for i in range(1, 8)
+        ],
+    },
+    "ar": {
+        "helpfulness_queries": [
+            {"id": "AR_HELP_001", "prompt": "كيف أجدد الهوية؟", "category": "identity", "priority": "high",
+             "must_include": ["الهوية"]},
+        ],
+    },
+}
+
+
+def expected_rows() -> list:
+    return [
+        CaseRecord.from_case(language, suite, case).to_row()
+        for language, suites in TEST_DATA.items()
+        for suite, cases in suites.items()
+        for case in cases
+    ]
+
+
+@pytest.fixture(params=["corpus.jsonl", "corpus.jsonl.gz"])
+def corpus_path(request, tmp_path):
+    data_file = tmp_path / "test_data.json"
+    data_file.write_text(json.dumps(TEST_DATA, ensure_ascii=False), encoding="utf-8")
+    path = tmp_path / request.param
+    assert export_test_data(path, data_file) == len(expected_rows())
+    return path
+
+
+@pytest.mark.unit
+def test_round_trip_returns_every_case_in_order(corpus_path):
+    corpus = Corpus(corpus_path)
+    assert corpus.compressed is corpus_path.name.endswith(".gz")
+    assert [case.to_row() for case in corpus] == expected_rows()
+    assert len(corpus) == len(expected_rows())
+
+
+@pytest.mark.unit
+def test_filtered_reads_go_through_the_index(corpus_path):
+    corpus = Corpus(corpus_path)
+    assert [case.id for case in corpus.iter_cases(language="ar")] == ["AR_HELP_001"]
+    assert [case.id for case in corpus.iter_cases(language="en", category="identity")] == \
+        ["EN_HELP_002", "EN_HELP_004", "EN_HELP_006"]
+    assert list(corpus.iter_cases(suite="fallback_queries")) == []
+    assert corpus.iter_cases(language="ar").__next__()["must_include"] == ["الهوية"]
+
+
+@pytest.mark.unit
+def test_index_is_reused_until_the_corpus_changes(corpus_path, monkeypatch):
+    assert len(Corpus(corpus_path)) == 8
+    assert Corpus(corpus_path).index_path.exists()
+
+    def no_rebuild(cls, path):
+        raise AssertionError("index rebuilt although the corpus is unchanged")
+
+    monkeypatch.setattr(CorpusIndex, "build", classmethod(no_rebuild))
+    assert len(Corpus(corpus_path)) == 8
+    monkeypatch.undo()
+
+    # Appending a case changes the size (and mtime) stamp, so the stale index is rebuilt
+    with open_corpus(corpus_path, "at") as f:
+        f.write(json.dumps({"language": "en", "suite": "fallback_queries", "id": "EN_FALL_001",
+                            "category": "fallback", "priority": "low"}) + "\n")
+    corpus = Corpus(corpus_path)
+    assert len(corpus) == 9
+    assert [case.id for case in corpus.iter_cases(suite="fallback_queries")] == ["EN_FALL_001"]
+
+
+@pytest.mark.unit
+def test_corrupt_index_is_rebuilt(corpus_path):
+    corpus = Corpus(corpus_path)
+    corpus.index_path.write_text("{not json", encoding="utf-8")
+    assert len(corpus) == 8
+    assert json.loads(corpus.index_path.read_text(encoding="utf-8"))["offsets"]
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("count", [1, 2, 3, 10])
+def test_shards_partition_the_matching_cases(corpus_path, count):
+    corpus = Corpus(corpus_path)
+    shards = [[case.id for case in corpus.shard(index, count, language="en")] for index in range(count)]
+    assert sorted(sum(shards, [])) == [f"EN_HELP_{i:03d}" for i in range(1, 8)]
+    assert max(map(len, shards)) - min(map(len, shards)) <= 1
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("worker, count, expected", [
+    (None, None, (0, 1)),
+    ("gw0", "4", (0, 4)),
+    ("gw3", "4", (3, 4)),
+    ("master", "", (0, 1)),
+])
+def test_worker_shard_reads_xdist_environment(monkeypatch, worker, count, expected):
+    for name, value in (("PYTEST_XDIST_WORKER", worker), ("PYTEST_XDIST_WORKER_COUNT", count)):
+        if value is None:
+            monkeypatch.delenv(name, raising=False)
+        else:
+            monkeypatch.setenv(name, value)
+    assert worker_shard() == expected
@@ -0,0 +1,142 @@
+"""
+Unit tests for the incremental RAGAS score store (utils/eval_store.py).
+
+Samples are plain namespaces: sample_key only reads user_input, response,
+retrieved_contexts and reference / reference_topics.
+"""
+
+import math
+from types import SimpleNamespace
+
+import pytest
+
+from utils.eval_store import EvaluationStore, sample_key, store_key
+
+LOCAL_JUDGE = store_key("faithfulness", "sonar-pro", "127.0.0.1")
+LIVE_JUDGE = store_key("faithfulness", "sonar-pro", "api.perplexity.ai")
+
+
+def make_sample(response="Renew it online via ICP.", question="How do I renew my Emirates ID?",
+                contexts=("Renewal is done on the ICP portal.",), reference=None):
+    return SimpleNamespace(user_input=question, response=response,
+                           retrieved_contexts=list(contexts), reference=reference)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = EvaluationStore(str(tmp_path / "scores.sqlite"))
+    yield store
+    store.close()
+
+
+@pytest.mark.unit
+def test_unchanged_sample_reuses_stored_score(store):
+    store.save(LIVE_JUDGE, make_sample(), 0.82, judge_calls=3)
+    assert store.lookup(LIVE_JUDGE, make_sample()) == pytest.approx(0.82)
+    assert store.summary() == {"hits": 1, "misses": 0, "judge_calls_avoided": 3, "force_rescore": False}
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("variant", [
+    "Renew  it online\nvia ICP. ",                  # Collapsed whitespace
+    "Renew it\u200b online via\u200d ICP.",          # Zero-width space / joiner
+    "\ufeffRenew it online via ICP.",                # BOM
+])
+def test_whitespace_and_zero_width_variants_share_a_key(variant):
+    assert sample_key("faithfulness", make_sample(variant)) == sample_key("faithfulness", make_sample())
+
+
+@pytest.mark.unit
+def test_contexts_are_order_insensitive_but_content_sensitive():
+    base = sample_key("faithfulness", make_sample(contexts=("a", "b")))
+    assert sample_key("faithfulness", make_sample(contexts=("b", "a"))) == base
+    assert sample_key("faithfulness", make_sample(contexts=("a", "c"))) != base
+
+
+@pytest.mark.unit
+def test_reference_is_part_of_the_key():
+    assert (sample_key("context_recall", make_sample(reference="ICP portal"))
+            != sample_key("context_recall", make_sample(reference="Tasheel centre")))
+
+
+@pytest.mark.unit
+def test_changed_response_misses(store):
+    store.save(LIVE_JUDGE, make_sample(), 0.82)
+    assert store.lookup(LIVE_JUDGE, make_sample("Visit any Tasheel centre.")) is None
+    assert store.misses == 1
+
+
+@pytest.mark.unit
+def test_local_judge_score_is_not_returned_to_live_judge(store):
+    store.save(LOCAL_JUDGE, make_sample(), 1.0, judge_calls=2)
+    assert store.lookup(LIVE_JUDGE, make_sample()) is None
+    assert store.lookup(LOCAL_JUDGE, make_sample()) == 1.0
+
+
+@pytest.mark.unit
+def test_store_key_scopes_embedding_metrics():
+    assert store_key("relevancy", "sonar-pro", "api.perplexity.ai", "all-MiniLM-L6-v2") == \
+        "relevancy@sonar-pro@api.perplexity.ai+all-MiniLM-L6-v2"
+    assert store_key("relevancy", "sonar-pro", "api.perplexity.ai", "all-MiniLM-L6-v2") != \
+        store_key("relevancy", "sonar-pro", "api.perplexity.ai", "paraphrase-multilingual-MiniLM-L12-v2")
+
+
+@pytest.mark.unit
+def test_force_rescore_ignores_stored_scores(tmp_path):
+    path = str(tmp_path / "scores.sqlite")
+    with_score = EvaluationStore(path)
+    with_score.save(LIVE_JUDGE, make_sample(), 0.82, judge_calls=3)
+    with_score.close()
+
+    store = EvaluationStore(path, force_rescore=True)
+    try:
+        assert store.lookup(LIVE_JUDGE, make_sample()) is None
+        assert store.summary() == {"hits": 0, "misses": 1, "judge_calls_avoided": 0, "force_rescore": True}
+    finally:
+        store.close()
+
+
+# ---------------------------------------------------------------------------
+# MetricRegistry + store (needs ragas; the judge is replaced by fake metrics)
+# ---------------------------------------------------------------------------
+
+class FakeMetric:
+    def __init__(self, score: float):
+        self.score = score
+        self.calls = 0
+
+    async def single_turn_ascore(self, sample):
+        self.calls += 1
+        return self.score
+
+
+def make_registry(store, base_url: str, score: float):
+    metric_registry = pytest.importorskip("utils.metric_registry")
+    llm = SimpleNamespace(model_name="sonar-pro", openai_api_base=base_url)
+    registry = metric_registry.MetricRegistry(SimpleNamespace(langchain_llm=llm), store=store)
+    registry._metrics["faithfulness"] = FakeMetric(score)
+    return registry
+
+
+@pytest.mark.unit
+def test_registry_keeps_local_and_live_judge_scores_apart(store):
+    local = make_registry(store, "http://127.0.0.1:8765/v1", 1.0)
+    live = make_registry(store, "https://api.perplexity.ai", 0.4)
+
+    assert local.score(make_sample(), "faithfulness") == 1.0
+    assert live.score(make_sample(), "faithfulness") == pytest.approx(0.4)
+    assert live._metrics["faithfulness"].calls == 1
+
+    # Both are now cached under their own judge
+    assert local.score(make_sample(), "faithfulness") == 1.0
+    assert local._metrics["faithfulness"].calls == 1
+
+
+@pytest.mark.unit
+def test_registry_does_not_cache_nan_scores(store):
+    registry = make_registry(store, "https://api.perplexity.ai", math.nan)
+    assert math.isnan(registry.score(make_sample(), "faithfulness"))
+    assert math.isnan(registry.score(make_sample(), "faithfulness"))
+    # Failed judge parses are sent to the judge again rather than served from the store
+    assert registry._metrics["faithfulness"].calls == 2
+    assert store.hits == 0
@@ -0,0 +1,58 @@
+"""
+Unit tests for the judge request limiter (utils/judge_scheduler.py).
+
+No judge is called: the AIMD limiter is exercised directly, including async
+waiters woken from another thread the way RAGAS' per-call event loops are.
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from utils.judge_scheduler import AIMDLimiter
+
+
+@pytest.mark.unit
+def test_throttle_halves_and_slow_response_trims_the_limit():
+    limiter = AIMDLimiter(initial=8, minimum=1, maximum=16, latency_target_s=10.0)
+    limiter.on_success(latency_s=30.0)
+    assert limiter.limit == pytest.approx(7.2)
+    limiter.on_throttled()
+    assert limiter.limit == pytest.approx(3.6)
+    limiter.on_success(latency_s=1.0)
+    assert limiter.limit == pytest.approx(3.6 + 1 / 3.6)
+
+
+@pytest.mark.unit
+def test_async_waiter_wakes_on_release_from_another_thread():
+    limiter = AIMDLimiter(initial=1, minimum=1, maximum=1, latency_target_s=0)
+    limiter.acquire()
+
+    async def wait_for_slot():
+        waiter = asyncio.ensure_future(limiter.acquire_async())
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+        assert len(limiter._async_waiters) == 1
+        threading.Thread(target=limiter.release).start()
+        await asyncio.wait_for(waiter, timeout=1.0)
+
+    asyncio.run(wait_for_slot())
+    assert limiter.in_flight == 1
+    assert limiter._async_waiters == []
+
+
+@pytest.mark.unit
+def test_cancelled_async_waiter_does_not_hold_a_slot():
+    limiter = AIMDLimiter(initial=1, minimum=1, maximum=1, latency_target_s=0)
+    limiter.acquire()
+
+    async def give_up():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(limiter.acquire_async(), timeout=0.05)
+
+    asyncio.run(give_up())
+    assert limiter._async_waiters == []
+    limiter.release()
+    assert limiter.in_flight == 0
+    assert limiter.try_acquire()
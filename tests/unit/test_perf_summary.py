@@ -0,0 +1,97 @@
+"""
+Unit tests for the performance regression gate (utils/perf_summary.py).
+
+A regression sets the session's exit status, so the p-value, tie handling
+and budget comparison are pinned down with small deterministic samples.
+"""
+
+import math
+
+import pytest
+
+from utils.perf_summary import MIN_SAMPLES, PerfBudget, compare, mann_whitney_greater, percentile
+
+
+def summary(samples: dict, suite_duration_s: float = 100.0) -> dict:
+    return {"latency": {name: {"samples": values} for name, values in samples.items()},
+            "suite_duration_s": suite_duration_s}
+
+
+@pytest.mark.unit
+def test_shifted_sample_is_significant():
+    current, baseline = list(range(11, 21)), list(range(1, 11))
+    # Complete separation: U = 100, mean 50, variance 100 / 12 * 21 = 175
+    expected = 0.5 * math.erfc((100 - 50 - 0.5) / math.sqrt(175) / math.sqrt(2))
+    p_value = mann_whitney_greater(current, baseline)
+    assert p_value == pytest.approx(expected)
+    assert p_value < 0.001
+
+
+@pytest.mark.unit
+def test_test_is_one_sided():
+    assert mann_whitney_greater(list(range(1, 11)), list(range(11, 21))) > 0.999
+
+
+@pytest.mark.unit
+def test_identical_samples_return_one():
+    assert mann_whitney_greater([2.0] * 8, [2.0] * 8) == 1.0
+
+
+@pytest.mark.unit
+def test_ties_across_samples_use_average_ranks():
+    # Average ranks 1.5 / 4 / 7 / 9.5 / 11.5: rank sum 37.5, U = 16.5, mean 18;
+    # tie term 3 * (2**3 - 2) + 2 * (3**3 - 3) = 66, variance 36 / 12 * (13 - 66 / 132) = 37.5
+    expected = 0.5 * math.erfc((16.5 - 18 - 0.5) / math.sqrt(37.5) / math.sqrt(2))
+    p_value = mann_whitney_greater([1, 2, 2, 3, 4, 5], [1, 2, 3, 3, 4, 5])
+    assert p_value == pytest.approx(expected)
+    assert p_value > 0.5
+
+
+@pytest.mark.unit
+def test_percentile_interpolates():
+    assert percentile([1, 2, 3, 4], 50) == 2.5
+    assert percentile([5], 95) == 5
+    assert percentile([], 95) == 0.0
+
+
+@pytest.mark.unit
+def test_latency_breach_is_reported_as_regression():
+    baseline = summary({"chat.response": [1.0, 1.1, 1.2, 1.3, 1.4, 1.5]})
+    current = summary({"chat.response": [2.0, 2.1, 2.2, 2.3, 2.4, 2.5]})
+    [finding] = [f for f in compare(current, baseline, PerfBudget()) if f["metric"] == "latency.chat.response"]
+    assert finding["regression"] is True
+    assert finding["change_pct"] == pytest.approx((2.25 / 1.25 - 1) * 100)
+    assert finding["p_value"] < PerfBudget().alpha
+
+
+@pytest.mark.unit
+def test_significant_but_small_change_is_within_budget():
+    baseline = summary({"chat.response": [1.00, 1.01, 1.02, 1.03, 1.04, 1.05]})
+    current = summary({"chat.response": [1.10, 1.11, 1.12, 1.13, 1.14, 1.15]})
+    [finding] = [f for f in compare(current, baseline, PerfBudget()) if f["metric"] == "latency.chat.response"]
+    assert finding["p_value"] < 0.05
+    assert finding["regression"] is False   # ~10% slower, budget is 20%
+
+
+@pytest.mark.unit
+def test_too_few_samples_are_not_compared():
+    few = [1.0] * (MIN_SAMPLES - 1)
+    findings = compare(summary({"judge": [9.0] * 10}), summary({"judge": few}), PerfBudget())
+    assert not [f for f in findings if f["metric"] == "latency.judge"]
+
+
+@pytest.mark.unit
+def test_suite_duration_breach_is_reported():
+    findings = compare(summary({}, suite_duration_s=130.0), summary({}, suite_duration_s=100.0), PerfBudget())
+    assert findings == [{
+        "metric": "suite_duration_s", "baseline": 100.0, "current": 130.0,
+        "change_pct": pytest.approx(30.0), "p_value": None, "regression": True,
+    }]
+
+
+@pytest.mark.unit
+def test_budget_from_config_coerces_types():
+    budget = PerfBudget.from_config({"alpha": "0.01", "fail_on_regression": 1, "unknown": 5})
+    assert budget.alpha == 0.01
+    assert budget.fail_on_regression is True
+    assert budget.max_latency_regression_pct == 20.0
@@ -0,0 +1,96 @@
+"""
+Worker-namespaced artifact paths for pytest-xdist runs.
+
+Writers that would otherwise share a fixed path write a per-worker copy
+instead, and the controller merges the copies when the session ends:
+
+    path = artifact_path("reports/axe_chat_page.json")
+    # gw1 -> reports/axe_chat_page.gw1.json, no xdist -> reports/axe_chat_page.json
+
+    directory = artifact_dir("reports/screenshots")
+    # gw1 -> reports/screenshots/gw1, no xdist -> reports/screenshots
+
+merge_json(path) folds reports/<name>.gw*.json back into reports/<name>.json:
+lists are concatenated, a single worker's object is kept as is, and objects
+from several workers are keyed by worker id. Outside xdist nothing is
+namespaced and nothing needs merging.
+
+Shared caches that every worker may rebuild at once (the catalog pickle,
+corpus indexes) keep one final path but write through temp_path(), a
+per-process scratch name, before the atomic replace:
+
+    tmp = temp_path(cache_file)   # cache.pkl -> cache.pkl.<pid>.tmp
+"""
+
+import json
+import os
+import re
+from pathlib import Path
+from typing import List, Optional
+
+WORKER_SUFFIX = re.compile(r"\.(gw\d+)$")
+
+
+def worker_id() -> Optional[str]:
+    """The xdist worker id (gw0, gw1, ...) of this process, None outside xdist workers"""
+    return os.environ.get("PYTEST_XDIST_WORKER") or None
+
+
+def is_controller(config) -> bool:
+    """True for the process that owns the session: the xdist controller, or the only process"""
+    return not hasattr(config, "workerinput")
+
+
+def artifact_path(path) -> Path:
+    """Per-worker variant of a file path (parent directory created)"""
+    path = Path(path)
+    worker = worker_id()
+    if worker:
+        path = path.with_name(f"{path.stem}.{worker}{path.suffix}")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def artifact_dir(directory) -> Path:
+    """Per-worker subdirectory of an artifact directory (created)"""
+    directory = Path(directory)
+    worker = worker_id()
+    if worker:
+        directory = directory / worker
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory
+
+
+def temp_path(path) -> Path:
+    """Per-process scratch file next to path, for write-then-replace"""
+    path = Path(path)
+    return path.with_name(f"{path.name}.{os.getpid()}.tmp")
+
+
+def worker_parts(path) -> List[Path]:
+    """The per-worker copies of path that exist, in worker order"""
+    path = Path(path)
+    parts = [p for p in path.parent.glob(f"{path.stem}.gw*{path.suffix}") if WORKER_SUFFIX.search(p.stem)]
+    return sorted(parts, key=lambda p: int(WORKER_SUFFIX.search(p.stem).group(1)[2:]))
+
+
+def merge_json(path) -> Optional[Path]:
+    """Merge the per-worker copies of a JSON artifact into path; returns path if anything was merged"""
+    path = Path(path)
+    parts = worker_parts(path)
+    if not parts:
+        return None
+    data = {WORKER_SUFFIX.search(p.stem).group(1): json.loads(p.read_text(encoding="utf-8")) for p in parts}
+    values = list(data.values())
+    if all(isinstance(v, list) for v in values):
+        merged = [item for value in values for item in value]
+    elif len(values) == 1:
+        merged = values[0]
+    else:
+        merged = {"workers": data}
+    tmp_path = temp_path(path)
+    tmp_path.write_text(json.dumps(merged, ensure_ascii=False, indent=2), encoding="utf-8")
+    tmp_path.replace(path)
+    for part in parts:
+        part.unlink()
+    return path
@@ -0,0 +1,157 @@
+"""
+Background writer for failure screenshots.
+
+The makereport hook only captures the page (Playwright encodes JPEG itself,
+so no PNG is produced) and hands the bytes to an ArtifactWriter; encoding to
+WebP and writing to disk happen on a daemon thread, so test teardown is not
+held up by file I/O.
+
+- identical captures (same sha256) are written once; later failures link to
+  the existing file
+- the total size written per run is capped (`max_total_mb`); captures over
+  the cap are not written to disk (warning), but are still attached to Allure
+- `format` only applies to the disk copy: the Allure attachment is always the
+  Playwright JPEG, since re-encoding would put Pillow on the test thread
+- `close()` drains the queue and is called from pytest_sessionfinish
+- under xdist each worker writes to its own subdirectory
+  (reports/screenshots/gw0, ...), so the cap applies per worker
+
+Configured by the `screenshots` section of config.yaml.
+"""
+
+import hashlib
+import queue
+import re
+import threading
+from dataclasses import dataclass
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, Optional
+
+from utils.artifact_paths import artifact_dir
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow not installed: screenshots stay JPEG
+    Image = None
+
+FORMATS = ("jpeg", "webp")
+EXTENSIONS = {"jpeg": "jpg", "webp": "webp"}
+UNSAFE_CHARS = re.compile(r"[^\w.\-]+")
+
+
+@dataclass
+class ScreenshotSettings:
+    """`screenshots` config section; `format` applies to the disk copy only (Allure gets the JPEG)"""
+
+    directory: Path = Path("reports/screenshots")
+    format: str = "jpeg"
+    quality: int = 70
+    full_page: bool = True
+    max_total_mb: float = 200.0
+
+    @classmethod
+    def from_config(cls, section: dict) -> "ScreenshotSettings":
+        section = section or {}
+        image_format = str(section.get("format", cls.format)).lower()
+        if image_format not in FORMATS:
+            raise ValueError(f"screenshots.format must be one of {FORMATS}, got {image_format!r}")
+        if image_format == "webp" and Image is None:
+            logger.warning("screenshots.format is webp but Pillow is not installed; writing JPEG")
+            image_format = "jpeg"
+        return cls(
+            directory=Path(section.get("dir", cls.directory)),
+            format=image_format,
+            quality=max(1, min(100, int(section.get("quality", cls.quality)))),
+            full_page=bool(section.get("full_page", cls.full_page)),
+            max_total_mb=float(section.get("max_total_mb", cls.max_total_mb)),
+        )
+
+    @property
+    def extension(self) -> str:
+        return EXTENSIONS[self.format]
+
+    def capture(self, page) -> bytes:
+        """Screenshot of the page as Playwright-encoded JPEG"""
+        return page.screenshot(full_page=self.full_page, type="jpeg", quality=self.quality)
+
+
+class ArtifactWriter:
+    """Queue of screenshots written to disk by a background thread"""
+
+    def __init__(self, settings: ScreenshotSettings):
+        self.settings = settings
+        # Per xdist worker: reports/screenshots/gw0, ... (the cap applies per worker)
+        self.directory = artifact_dir(settings.directory)
+        self.max_total_bytes = int(settings.max_total_mb * 1024 * 1024)
+        self.total_bytes = 0
+        self.written = 0
+        self.duplicates = 0
+        self.dropped = 0
+        self._paths: Dict[str, Path] = {}
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="artifact-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, data: bytes, name: str) -> Optional[Path]:
+        """
+        Queue a JPEG screenshot for writing.
+
+        Returns its path relative to the screenshots directory's parent (for
+        report links), the existing path when the same image was already
+        submitted, or None when it would exceed the per-run size cap.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            if digest in self._paths:
+                self.duplicates += 1
+                return self._paths[digest]
+            if self.total_bytes + len(data) > self.max_total_bytes:
+                self.dropped += 1
+                logger.warning(
+                    f"Screenshot {name} dropped: {self.settings.max_total_mb:g} MB per-run limit reached"
+                )
+                return None
+            # JPEG size is an upper bound for the WebP re-encode
+            self.total_bytes += len(data)
+            file_name = f"{UNSAFE_CHARS.sub('_', name)}_{digest[:8]}.{self.settings.extension}"
+            relative = (self.directory / file_name).relative_to(self.settings.directory.parent)
+            self._paths[digest] = relative
+        self._queue.put((data, self.directory / file_name))
+        return relative
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self._write(*item)
+            except Exception as e:
+                logger.warning(f"Could not write screenshot {item[1]}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _write(self, data: bytes, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if self.settings.format == "webp":
+            with Image.open(BytesIO(data)) as image:
+                image.save(path, "WEBP", quality=self.settings.quality, method=4)
+        else:
+            path.write_bytes(data)
+        self.written += 1
+
+    def close(self):
+        """Write everything still queued and stop the thread"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        if self.written or self.duplicates or self.dropped:
+            logger.info(
+                f"Screenshots: {self.written} written ({self.total_bytes / 1024:.0f} KB), "
+                f"{self.duplicates} duplicate(s), {self.dropped} dropped over the size cap"
+            )
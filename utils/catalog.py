@@ -0,0 +1,281 @@
+"""
+Indexed catalog over data/test_data.json.
+
+The JSON is validated against a light schema, flattened into compact
+`__slots__` records and indexed by language, suite, category, tag and
+priority. The flattened rows are pickled next to the data file and reused
+until the JSON changes, so a session pays for parsing and validation once.
+
+    catalog = load_catalog()
+    for case in catalog.select(language="en", suite="prompt_injection_queries", category="xss_attack"):
+        chat_page.send_message(case["prompt"])
+"""
+
+import hashlib
+import json
+import pickle
+import sys
+from functools import lru_cache
+from pathlib import Path
+
+from utils.artifact_paths import temp_path
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_DATA_FILE = BASE_DIR / "data" / "test_data.json"
+CACHE_VERSION = 1
+
+PRIORITIES = ("critical", "high", "medium", "low")
+INDEXED_FIELDS = ("language", "suite", "category", "tag", "priority")
+
+# Optional per-case fields and the JSON types they must have
+FIELD_TYPES = {
+    "prompt": str,
+    "prompts": list,
+    "en_prompt": str,
+    "ar_prompt": str,
+    "tags": list,
+    "expected_behavior": str,
+    "reference": str,
+    "reference_contexts": list,
+    "redundant_of": str,
+    "must_include": list,
+    "must_include_any": list,
+    "must_not_include_any": list,
+    "must_contain_any": list,
+    "banned_html_fragments": list,
+    "min_tokens": int,
+    "max_tokens": int,
+    "min_sentences": int,
+    "loading_timeout_max": int,
+    "max_length_ratio_diff": (int, float),
+    "semantic_similarity_min": (int, float),
+    "min_semantic_similarity": (int, float),
+    "requires_steps": bool,
+    "must_end_with_punctuation": bool,
+    "must_contain_list": bool,
+    "url_format_valid": bool,
+    "check_markdown_validity": bool,
+    "check_phone_format": bool,
+    "check_for_incomplete_sentences": bool,
+    "must_not_execute_js": bool,
+    "must_show_loading": bool,
+    "test_loading": bool,
+    "cross_language": bool,
+}
+
+
+class CatalogError(ValueError):
+    """Raised when test_data.json does not match the expected schema"""
+
+
+def validate(data: dict) -> list:
+    """Return a list of schema problems found in the raw test data"""
+    problems = []
+    if not isinstance(data, dict):
+        return ["top level must be an object keyed by language"]
+
+    seen = set()
+    for language, suites in data.items():
+        if not isinstance(suites, dict):
+            problems.append(f"{language}: must be an object keyed by suite")
+            continue
+        for suite, cases in suites.items():
+            if not isinstance(cases, list):
+                problems.append(f"{language}.{suite}: must be a list of cases")
+                continue
+            for index, case in enumerate(cases):
+                where = f"{language}.{suite}[{index}]"
+                if not isinstance(case, dict):
+                    problems.append(f"{where}: case must be an object")
+                    continue
+                case_id = case.get("id")
+                if not isinstance(case_id, str) or not case_id:
+                    problems.append(f"{where}: missing string 'id'")
+                elif case_id in seen:
+                    problems.append(f"{where}: duplicate id '{case_id}'")
+                else:
+                    seen.add(case_id)
+                    where = case_id
+                if not isinstance(case.get("category"), str):
+                    problems.append(f"{where}: missing string 'category'")
+                if case.get("priority") not in PRIORITIES:
+                    problems.append(f"{where}: priority must be one of {PRIORITIES}")
+                if not any(key in case for key in ("prompt", "prompts", "en_prompt", "ar_prompt")):
+                    problems.append(f"{where}: no prompt, prompts, en_prompt or ar_prompt")
+                for key, expected in FIELD_TYPES.items():
+                    value = case.get(key)
+                    if value is None:
+                        continue
+                    # bool is an int subclass; don't let True pass as a count
+                    if not isinstance(value, expected) or (expected is int and isinstance(value, bool)):
+                        problems.append(f"{where}: '{key}' has type {type(value).__name__}")
+                    elif expected is list and not all(isinstance(v, str) for v in value):
+                        problems.append(f"{where}: '{key}' must contain only strings")
+    return problems
+
+
+class CaseRecord:
+    """Compact, read-only test case with dict-style access for check fields"""
+
+    __slots__ = ("id", "language", "suite", "category", "priority", "prompt", "tags", "checks")
+
+    def __init__(self, id, language, suite, category, priority, prompt, tags, checks):
+        self.id = id
+        self.language = language
+        self.suite = suite
+        self.category = category
+        self.priority = priority
+        self.prompt = prompt
+        self.tags = tags
+        self.checks = checks
+
+    @classmethod
+    def from_case(cls, language: str, suite: str, case: dict) -> "CaseRecord":
+        intern = sys.intern
+        checks = {k: v for k, v in case.items() if k not in ("id", "category", "priority", "prompt", "tags")}
+        return cls(
+            case["id"],
+            intern(language),
+            intern(suite),
+            intern(case["category"]),
+            intern(case["priority"]),
+            case.get("prompt"),
+            tuple(intern(t) for t in case.get("tags", ())),
+            checks,
+        )
+
+    def to_row(self) -> tuple:
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __getitem__(self, key: str):
+        if key in ("id", "category", "priority"):
+            return getattr(self, key)
+        if key == "prompt" and self.prompt is not None:
+            return self.prompt
+        if key == "tags":
+            return list(self.tags)
+        return self.checks[key]
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def to_dict(self) -> dict:
+        case = {"id": self.id, "category": self.category, "priority": self.priority}
+        if self.prompt is not None:
+            case["prompt"] = self.prompt
+        case.update(self.checks)
+        case["tags"] = list(self.tags)
+        return case
+
+    def __repr__(self) -> str:
+        return f"CaseRecord({self.id!r}, {self.language}/{self.suite}/{self.category})"
+
+
+class TestCatalog:
+    """Indexed, validated view of the test data"""
+
+    __test__ = False  # Not a pytest test class
+
+    def __init__(self, records):
+        self.records = list(records)
+        self.by_id = {}
+        self.indexes = {name: {} for name in INDEXED_FIELDS}
+        for position, record in enumerate(self.records):
+            self.by_id[record.id] = record
+            for name, value in (("language", record.language), ("suite", record.suite),
+                                ("category", record.category), ("priority", record.priority)):
+                self.indexes[name].setdefault(value, []).append(position)
+            for tag in record.tags:
+                self.indexes["tag"].setdefault(tag, []).append(position)
+
+    @classmethod
+    def from_data(cls, data: dict) -> "TestCatalog":
+        problems = validate(data)
+        if problems:
+            raise CatalogError("Invalid test data:\n  " + "\n  ".join(problems))
+        return cls(
+            CaseRecord.from_case(language, suite, case)
+            for language, suites in data.items()
+            for suite, cases in suites.items()
+            for case in cases
+        )
+
+    @classmethod
+    def load(cls, data_file=DEFAULT_DATA_FILE, cache_file=None) -> "TestCatalog":
+        """Load the catalog, reusing the pickled rows while the JSON is unchanged"""
+        data_file = Path(data_file)
+        cache_file = Path(cache_file) if cache_file else data_file.parent / ".cache" / f"{data_file.stem}.catalog.pkl"
+        raw = data_file.read_bytes()
+        digest = hashlib.sha256(raw).hexdigest()
+
+        if cache_file.exists():
+            try:
+                with cache_file.open("rb") as f:
+                    cached = pickle.load(f)
+                if cached.get("version") == CACHE_VERSION and cached.get("sha256") == digest:
+                    return cls(CaseRecord(*row) for row in cached["rows"])
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable catalog cache {cache_file}: {e}")
+
+        catalog = cls.from_data(json.loads(raw.decode("utf-8")))
+        # Every xdist worker may rebuild a cold cache at once: write through a
+        # per-process temp file, and keep going if the cache can't be written
+        tmp_file = temp_path(cache_file)
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            with tmp_file.open("wb") as f:
+                pickle.dump(
+                    {"version": CACHE_VERSION, "sha256": digest, "rows": [r.to_row() for r in catalog.records]},
+                    f, protocol=pickle.HIGHEST_PROTOCOL,
+                )
+            tmp_file.replace(cache_file)
+        except OSError as e:
+            logger.warning(f"Could not write catalog cache {cache_file}: {e}")
+            tmp_file.unlink(missing_ok=True)
+        else:
+            logger.info(f"Rebuilt test catalog cache ({len(catalog)} cases) at {cache_file}")
+        return catalog
+
+    def select(self, language: str = None, suite: str = None, category: str = None,
+               tag: str = None, priority: str = None) -> list:
+        """Return the cases matching every given filter, in data file order"""
+        positions = None
+        for name, value in (("language", language), ("suite", suite), ("category", category),
+                            ("tag", tag), ("priority", priority)):
+            if value is None:
+                continue
+            matches = set(self.indexes[name].get(value, ()))
+            positions = matches if positions is None else positions & matches
+            if not positions:
+                return []
+        if positions is None:
+            return list(self.records)
+        return [self.records[p] for p in sorted(positions)]
+
+    def get(self, case_id: str) -> CaseRecord:
+        return self.by_id[case_id]
+
+    def values(self, field: str) -> list:
+        """Distinct values of an indexed field"""
+        return sorted(self.indexes[field])
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+
+@lru_cache(maxsize=None)
+def load_catalog(data_file=DEFAULT_DATA_FILE) -> TestCatalog:
+    """Process-wide catalog, loaded once"""
+    return TestCatalog.load(data_file)
@@ -0,0 +1,91 @@
+"""
+Semantic consistency scoring for groups of responses to paraphrased prompts.
+
+All responses of a group are embedded in a single batch and compared through
+one cosine-similarity matrix, so the cost stays flat as groups grow.
+"""
+
+from dataclasses import dataclass, field
+from typing import List, Sequence
+
+import numpy as np
+
+
+@dataclass
+class ConsistencyResult:
+    """Pairwise similarity and length-ratio matrices for one response group"""
+    similarity: np.ndarray
+    length_ratios: np.ndarray
+    min_semantic_similarity: float
+    max_length_ratio_diff: float
+    violations: List[str] = field(default_factory=list)
+
+    @property
+    def passed(self) -> bool:
+        return not self.violations
+
+    @property
+    def lowest_similarity(self) -> float:
+        upper = self.similarity[np.triu_indices(len(self.similarity), k=1)]
+        return float(upper.min()) if upper.size else 1.0
+
+
+class ConsistencyChecker:
+    """Checks that responses to the same intent agree in meaning and length"""
+
+    def __init__(self, embeddings, min_semantic_similarity: float = 0.7, max_length_ratio_diff: float = 0.4):
+        self.embeddings = embeddings
+        self.min_semantic_similarity = min_semantic_similarity
+        self.max_length_ratio_diff = max_length_ratio_diff
+
+    def similarity_matrix(self, responses: Sequence[str]) -> np.ndarray:
+        """Embed all responses in one batch and return the cosine-similarity matrix"""
+        vectors = np.asarray(self.embeddings.embed_documents(list(responses)), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.maximum(norms, 1e-12)
+        return vectors @ vectors.T
+
+    @staticmethod
+    def length_ratio_matrix(responses: Sequence[str]) -> np.ndarray:
+        lengths = np.array([len(r) for r in responses], dtype=np.float64)
+        return lengths[:, None] / np.maximum(1.0, lengths)[None, :]
+
+    def check(self, responses: Sequence[str], min_semantic_similarity: float = None,
+              max_length_ratio_diff: float = None) -> ConsistencyResult:
+        """Compare every response pair of the group against both thresholds"""
+        min_sim = self.min_semantic_similarity if min_semantic_similarity is None else min_semantic_similarity
+        max_diff = self.max_length_ratio_diff if max_length_ratio_diff is None else max_length_ratio_diff
+
+        similarity = self.similarity_matrix(responses)
+        ratios = self.length_ratio_matrix(responses)
+        rows, cols = np.triu_indices(len(responses), k=1)
+
+        violations = []
+        low_sim = similarity[rows, cols] < min_sim
+        bad_ratio = (ratios[rows, cols] < 1 - max_diff) | (ratios[rows, cols] > 1 + max_diff)
+
+        for i, j in zip(rows[low_sim], cols[low_sim]):
+            violations.append(
+                f"responses {i + 1} and {j + 1}: semantic similarity {similarity[i, j]:.2f} below {min_sim}"
+            )
+        for i, j in zip(rows[bad_ratio], cols[bad_ratio]):
+            violations.append(
+                f"responses {i + 1} and {j + 1}: length ratio {ratios[i, j]:.2f} exceeds threshold {max_diff}"
+            )
+
+        return ConsistencyResult(
+            similarity=similarity,
+            length_ratios=ratios,
+            min_semantic_similarity=min_sim,
+            max_length_ratio_diff=max_diff,
+            violations=violations,
+        )
+
+    def check_pair(self, pair: dict, responses: Sequence[str]) -> ConsistencyResult:
+        """Check a `consistency_pairs` entry, honouring its per-pair thresholds"""
+        min_sim = pair.get("min_semantic_similarity", pair.get("semantic_similarity_min"))
+        return self.check(
+            responses,
+            min_semantic_similarity=min_sim,
+            max_length_ratio_diff=pair.get("max_length_ratio_diff"),
+        )
@@ -0,0 +1,226 @@
+"""
+Streaming JSONL prompt corpora.
+
+Large load/regression prompt sets are stored one case per line, with the
+case's `language` and `suite` alongside the usual test_data.json fields.
+Files may be plain, .gz, .bz2 or .xz. Cases are read lazily, so memory stays
+flat however big the corpus is, and come back as the same CaseRecord objects
+the TestCatalog returns.
+
+A sidecar offset index (`<corpus>.idx.json`) stores each line's byte offset
+and its (language, suite, category), so filtering and sharding only decode
+the lines they need. Uncompressed corpora are read by seeking straight to
+those offsets; compressed ones are streamed and skipped.
+
+    corpus = Corpus("data/corpus/regression.jsonl.gz")
+    for case in corpus.iter_cases(language="ar", category="visa"):
+        ...
+    for case in corpus.shard(*worker_shard()):   # this xdist worker's slice
+        ...
+
+    python -m utils.corpus export data/test_data.json data/corpus/base.jsonl.gz
+    python -m utils.corpus index data/corpus/base.jsonl.gz
+    python -m utils.corpus stats data/corpus/base.jsonl.gz
+"""
+
+import argparse
+import bz2
+import gzip
+import json
+import lzma
+import os
+from collections import Counter
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from utils.artifact_paths import temp_path
+from utils.catalog import DEFAULT_DATA_FILE, CaseRecord
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+INDEX_VERSION = 1
+OPENERS = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open}
+
+
+def open_corpus(path: Path, mode: str = "rb"):
+    """Open a corpus file, decompressing by extension"""
+    return OPENERS.get(Path(path).suffix, open)(path, mode)
+
+
+def worker_shard() -> Tuple[int, int]:
+    """(index, count) of the current pytest-xdist worker, (0, 1) outside xdist"""
+    worker = os.environ.get("PYTEST_XDIST_WORKER", "")
+    count = int(os.environ.get("PYTEST_XDIST_WORKER_COUNT", "1") or 1)
+    index = int(worker[2:]) if worker.startswith("gw") and worker[2:].isdigit() else 0
+    return index, count
+
+
+def _record(row: dict) -> CaseRecord:
+    case = dict(row)
+    return CaseRecord.from_case(case.pop("language"), case.pop("suite"), case)
+
+
+class CorpusIndex:
+    """Byte offset and (language, suite, category) of every line of a corpus"""
+
+    def __init__(self, offsets: List[int], keys: List[Tuple[str, str, str]]):
+        self.offsets = offsets
+        self.keys = keys
+
+    @classmethod
+    def build(cls, path: Path) -> "CorpusIndex":
+        offsets, keys = [], []
+        position = 0
+        with open_corpus(path) as f:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    offsets.append(position)
+                    keys.append((row["language"], row["suite"], row.get("category", "")))
+                position += len(line)
+        return cls(offsets, keys)
+
+    def positions(self, language: str = None, suite: str = None, category: str = None) -> List[int]:
+        return [
+            i for i, (lang, sui, cat) in enumerate(self.keys)
+            if (language is None or lang == language)
+            and (suite is None or sui == suite)
+            and (category is None or cat == category)
+        ]
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+
+class Corpus:
+    """Lazily read, indexed JSONL corpus of test cases"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.index_path = self.path.with_name(self.path.name + ".idx.json")
+        self.compressed = self.path.suffix in OPENERS
+        self._index: Optional[CorpusIndex] = None
+
+    @property
+    def index(self) -> CorpusIndex:
+        """Offset index, rebuilt when the corpus file changed since it was written"""
+        if self._index is None:
+            stat = self.path.stat()
+            stamp = [INDEX_VERSION, stat.st_size, stat.st_mtime_ns]
+            try:
+                cached = json.loads(self.index_path.read_text(encoding="utf-8"))
+                if cached["stamp"] == stamp:
+                    self._index = CorpusIndex(cached["offsets"], [tuple(k) for k in cached["keys"]])
+            except (OSError, ValueError, KeyError):
+                pass
+            if self._index is None:
+                self._index = CorpusIndex.build(self.path)
+                # Workers sharding the same corpus may build the index at once
+                tmp_path = temp_path(self.index_path)
+                try:
+                    tmp_path.write_text(json.dumps({
+                        "stamp": stamp, "offsets": self._index.offsets, "keys": self._index.keys,
+                    }, separators=(",", ":")), encoding="utf-8")
+                    tmp_path.replace(self.index_path)
+                except OSError as e:
+                    logger.warning(f"Could not write corpus index {self.index_path}: {e}")
+                    tmp_path.unlink(missing_ok=True)
+        return self._index
+
+    def __iter__(self) -> Iterator[CaseRecord]:
+        return self.iter_cases()
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def iter_cases(self, language: str = None, suite: str = None, category: str = None) -> Iterator[CaseRecord]:
+        """Stream the cases matching every given filter, in file order"""
+        if language is None and suite is None and category is None:
+            with open_corpus(self.path) as f:
+                for line in f:
+                    if line.strip():
+                        yield _record(json.loads(line))
+            return
+        yield from self._read(self.index.positions(language, suite, category))
+
+    def shard(self, index: int, count: int, language: str = None, suite: str = None,
+              category: str = None) -> Iterator[CaseRecord]:
+        """Stream every count-th matching case starting at index (one worker's share)"""
+        positions = self.index.positions(language, suite, category)
+        yield from self._read(positions[index::count])
+
+    def _read(self, positions: List[int]) -> Iterator[CaseRecord]:
+        if not positions:
+            return
+        offsets = self.index.offsets
+        if not self.compressed:
+            with open(self.path, "rb") as f:
+                for position in positions:
+                    f.seek(offsets[position])
+                    yield _record(json.loads(f.readline()))
+            return
+
+        # Compressed streams can't seek cheaply; decode only the wanted lines
+        wanted = {offsets[p] for p in positions}
+        remaining = len(wanted)
+        offset = 0
+        with open_corpus(self.path) as f:
+            for line in f:
+                if offset in wanted:
+                    yield _record(json.loads(line))
+                    remaining -= 1
+                    if not remaining:
+                        return
+                offset += len(line)
+
+    def stats(self) -> dict:
+        index = self.index
+        return {
+            "cases": len(index),
+            "languages": dict(Counter(k[0] for k in index.keys)),
+            "suites": dict(Counter(k[1] for k in index.keys)),
+            "categories": len({k[2] for k in index.keys}),
+        }
+
+
+def export_test_data(out_path, data_file=DEFAULT_DATA_FILE) -> int:
+    """Write test_data.json as a JSONL corpus; returns the number of cases written"""
+    data = json.loads(Path(data_file).read_text(encoding="utf-8"))
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    written = 0
+    with open_corpus(out_path, "wt") as f:
+        for language, suites in data.items():
+            for suite, cases in suites.items():
+                for case in cases:
+                    f.write(json.dumps({"language": language, "suite": suite, **case}, ensure_ascii=False))
+                    f.write("\n")
+                    written += 1
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage JSONL prompt corpora")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="Convert test_data.json to a JSONL corpus")
+    export.add_argument("data_file", nargs="?", default=str(DEFAULT_DATA_FILE))
+    export.add_argument("out_path")
+    for name, help_text in (("index", "(Re)build the offset index"), ("stats", "Summarise a corpus")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("corpus")
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        written = export_test_data(args.out_path, args.data_file)
+        print(f"Wrote {written} cases to {args.out_path}")
+    elif args.command == "index":
+        corpus = Corpus(args.corpus)
+        corpus.index_path.unlink(missing_ok=True)
+        print(f"Indexed {len(corpus)} cases -> {corpus.index_path}")
+    else:
+        print(json.dumps(Corpus(args.corpus).stats(), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
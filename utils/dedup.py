@@ -0,0 +1,240 @@
+"""
+Near-duplicate prompt detection.
+
+Prompts are normalised with the same Unicode/Arabic folding as the keyword
+matcher, Arabic clitics are stripped (و / ف / ب / ل / ال prefixes), and each
+prompt becomes a set of character 4-gram shingles. MinHash signatures of
+those sets go into an LSH index, candidate pairs above the Jaccard threshold
+are merged with union-find, and each cluster keeps one representative: the
+highest-priority case, then the first in file order.
+
+Cases are only compared within the same language and suite, since the same
+prompt under a different suite exercises different checks.
+
+    python -m utils.dedup                          # report clusters in test_data.json
+    python -m utils.dedup --threshold 0.7
+    python -m utils.dedup --tag                    # write redundant_of into test_data.json
+    python -m utils.dedup data/corpus/big.jsonl.gz --tag   # tag a JSONL corpus in place
+
+Tagged cases are skipped by the `cases` marker unless pytest runs with
+--include-redundant.
+"""
+
+import argparse
+import hashlib
+import json
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from utils.catalog import DEFAULT_DATA_FILE, PRIORITIES, CatalogError, validate
+from utils.text_matching import normalize_text
+
+NUM_PERM = 128
+SHINGLE_SIZE = 4
+DEFAULT_THRESHOLD = 0.6
+MERSENNE_PRIME = (1 << 31) - 1  # a * x stays below 2^62, no uint64 overflow
+ARABIC_PREFIXES = ("وال", "فال", "بال", "كال", "لل", "ال")
+ARABIC_CLITICS = ("و", "ف")
+
+_rng = np.random.RandomState(42)
+_PERM_A = _rng.randint(1, MERSENNE_PRIME, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, MERSENNE_PRIME, size=NUM_PERM, dtype=np.uint64)
+
+
+def _strip_arabic(token: str) -> str:
+    for prefix in ARABIC_PREFIXES:
+        if token.startswith(prefix) and len(token) - len(prefix) >= 3:
+            return token[len(prefix):]
+    if token[:1] in ARABIC_CLITICS and len(token) > 4:
+        return token[1:]
+    return token
+
+
+def shingles(text: str, language: str = "en") -> set:
+    """Character shingles of the normalised prompt"""
+    tokens = "".join(ch if ch.isalnum() else " " for ch in normalize_text(text)).split()
+    if language == "ar":
+        tokens = [_strip_arabic(t) for t in tokens]
+    # Punctuation-only prompts ("!@#$%") are compared on their raw characters
+    joined = " ".join(tokens) or normalize_text(text).strip()
+    if len(joined) <= SHINGLE_SIZE:
+        return {joined} if joined else set()
+    return {joined[i:i + SHINGLE_SIZE] for i in range(len(joined) - SHINGLE_SIZE + 1)}
+
+
+def minhash(features: Iterable[str]) -> np.ndarray:
+    """NUM_PERM-value MinHash signature of a feature set"""
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(f.encode("utf-8"), digest_size=8).digest(), "little") % MERSENNE_PRIME
+         for f in features],
+        dtype=np.uint64,
+    )
+    if hashes.size == 0:
+        return np.full(NUM_PERM, MERSENNE_PRIME, dtype=np.uint64)
+    return ((_PERM_A * hashes[:, None] + _PERM_B) % np.uint64(MERSENNE_PRIME)).min(axis=0)
+
+
+def lsh_params(threshold: float, num_perm: int = NUM_PERM) -> Tuple[int, int]:
+    """Bands and rows whose S-curve threshold (1/b)^(1/r) is closest to `threshold`"""
+    best = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        error = abs((1 / bands) ** (1 / rows) - threshold)
+        if best is None or error < best[0]:
+            best = (error, bands, rows)
+    return best[1], best[2]
+
+
+class UnionFind:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i: int, j: int):
+        root_i, root_j = self.find(i), self.find(j)
+        if root_i != root_j:
+            self.parent[max(root_i, root_j)] = min(root_i, root_j)
+
+
+def case_text(case) -> str:
+    """The prompt text a case sends (joined for multi-prompt cases)"""
+    if case.get("prompt"):
+        return case["prompt"]
+    if case.get("prompts"):
+        return " ".join(case["prompts"])
+    return " ".join(case.get(key) or "" for key in ("en_prompt", "ar_prompt")).strip()
+
+
+def find_clusters(cases: List[dict], threshold: float = DEFAULT_THRESHOLD) -> List[List[int]]:
+    """Clusters (lists of indexes into cases, representative first) of near-duplicate cases"""
+    bands, rows = lsh_params(threshold)
+    features = [shingles(case_text(c), c.get("language", "en")) for c in cases]
+    signatures = [minhash(f) for f in features]
+
+    buckets = defaultdict(list)
+    for index, (case, signature) in enumerate(zip(cases, signatures)):
+        if not features[index]:
+            continue  # Empty prompts have nothing to compare
+        scope = (case.get("language"), case.get("suite"))
+        for band in range(bands):
+            buckets[(scope, band, signature[band * rows:(band + 1) * rows].tobytes())].append(index)
+
+    union_find = UnionFind(len(cases))
+    checked = set()
+    for members in buckets.values():
+        for i_pos, i in enumerate(members):
+            for j in members[i_pos + 1:]:
+                if (i, j) in checked:
+                    continue
+                checked.add((i, j))
+                if np.mean(signatures[i] == signatures[j]) >= threshold:
+                    union_find.union(i, j)
+
+    groups = defaultdict(list)
+    for index in range(len(cases)):
+        groups[union_find.find(index)].append(index)
+
+    rank = {p: r for r, p in enumerate(PRIORITIES)}
+    clusters = []
+    for members in groups.values():
+        if len(members) > 1:
+            members.sort(key=lambda i: (rank.get(cases[i].get("priority"), len(rank)), i))
+            clusters.append(members)
+    return sorted(clusters, key=lambda m: m[0])
+
+
+def redundant_map(cases: List[dict], threshold: float = DEFAULT_THRESHOLD) -> Dict[str, str]:
+    """{redundant case id: representative case id}"""
+    return {
+        cases[i]["id"]: cases[members[0]]["id"]
+        for members in find_clusters(cases, threshold)
+        for i in members[1:]
+    }
+
+
+# ---------------------------------------------------------------------------
+# Sources: test_data.json and JSONL corpora
+# ---------------------------------------------------------------------------
+
+def load_cases(path: Path) -> List[dict]:
+    if path.suffix == ".json":
+        data = json.loads(path.read_text(encoding="utf-8"))
+        return [
+            {**case, "language": language, "suite": suite}
+            for language, suites in data.items()
+            for suite, suite_cases in suites.items()
+            for case in suite_cases
+        ]
+    from utils.corpus import Corpus
+    return [{**record.to_dict(), "language": record.language, "suite": record.suite} for record in Corpus(path)]
+
+
+def _apply(case: dict, representative: str):
+    if representative:
+        case["redundant_of"] = representative
+    else:
+        case.pop("redundant_of", None)
+
+
+def tag_cases(path: Path, redundant: Dict[str, str]):
+    """Set redundant_of on redundant cases (and clear stale tags) in place"""
+    if path.suffix == ".json":
+        data = json.loads(path.read_text(encoding="utf-8"))
+        for suites in data.values():
+            for suite_cases in suites.values():
+                for case in suite_cases:
+                    _apply(case, redundant.get(case["id"]))
+        problems = validate(data)
+        if problems:
+            raise CatalogError("Tagged data does not match the test data schema:\n  " + "\n  ".join(problems))
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp_path.replace(path)
+        return
+
+    from utils.corpus import open_corpus
+    tmp_path = path.with_name(f"{path.stem}.tmp{path.suffix}")  # Keep the compression suffix
+    with open_corpus(path) as source, open_corpus(tmp_path, "wt") as target:
+        for line in source:
+            if line.strip():
+                row = json.loads(line)
+                _apply(row, redundant.get(row["id"]))
+                target.write(json.dumps(row, ensure_ascii=False) + "\n")
+    tmp_path.replace(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find near-duplicate prompts")
+    parser.add_argument("path", nargs="?", default=str(DEFAULT_DATA_FILE), help="test_data.json or a JSONL corpus")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Estimated Jaccard similarity")
+    parser.add_argument("--tag", action="store_true", help="Write redundant_of into the source file")
+    args = parser.parse_args(argv)
+
+    path = Path(args.path)
+    cases = load_cases(path)
+    clusters = find_clusters(cases, args.threshold)
+    for members in clusters:
+        representative = cases[members[0]]
+        print(f"{representative['language']}/{representative['suite']}: keep {representative['id']}")
+        for i in members:
+            print(f"  {'*' if i == members[0] else '-'} {cases[i]['id']:<14} {case_text(cases[i])[:80]}")
+    redundant = sum(len(m) - 1 for m in clusters)
+    print(f"{len(clusters)} clusters, {redundant} redundant of {len(cases)} cases")
+
+    if args.tag:
+        tag_cases(path, redundant_map(cases, args.threshold))
+        print(f"Tagged {redundant} cases in {path}")
+
+
+if __name__ == "__main__":
+    main()
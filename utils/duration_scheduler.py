@@ -0,0 +1,226 @@
+"""
+Duration-aware test scheduling for pytest-xdist.
+
+Every run records how long each test took (setup + call + teardown) in a
+local history file. With `-n N` the next run hands tests to workers
+longest-processing-time first: the longest predicted tests start
+immediately and each worker pulls the next-longest test as it frees up, so
+the minutes-long RAGAS reports no longer start last and leave the other
+workers idle at the tail.
+
+Tests without history are predicted from the mean duration of the same test
+function, scaled by the case `priority` in test_data.json; if the function
+has no history either, the priority alone decides. The terminal summary
+compares the predicted makespan with the actual one.
+
+Registered from conftest.py via `pytest_plugins`; disable with
+--no-duration-scheduling (durations are still recorded).
+"""
+
+import heapq
+import json
+import re
+import time
+from pathlib import Path
+from typing import Dict, Iterable
+
+import pytest
+
+from utils.catalog import load_catalog
+
+try:
+    from xdist.scheduler import LoadScheduling
+except ImportError:  # pytest-xdist not installed: durations are still recorded
+    LoadScheduling = object
+
+DEFAULT_HISTORY_FILE = ".test_durations.json"
+HISTORY_WEIGHT = 0.5            # Weight of the newest run in the moving average
+PRIORITY_SECONDS = {"critical": 120.0, "high": 90.0, "medium": 60.0, "low": 30.0}
+PRIORITY_WEIGHT = {"critical": 1.5, "high": 1.25, "medium": 1.0, "low": 0.75}
+DEFAULT_SECONDS = 60.0
+CASE_ID = re.compile(r"\[([^\]]+)\]$")
+
+
+class DurationHistory:
+    """Moving-average test durations, keyed by node id"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.durations: Dict[str, float] = {}
+        if self.path.exists():
+            try:
+                self.durations = json.loads(self.path.read_text(encoding="utf-8"))
+            except ValueError:
+                self.durations = {}
+        self._function_means = self._means(self.durations)
+        self._priorities = None
+
+    @staticmethod
+    def _function_id(nodeid: str) -> str:
+        return nodeid.split("[", 1)[0]
+
+    @classmethod
+    def _means(cls, durations: Dict[str, float]) -> Dict[str, float]:
+        totals = {}
+        for nodeid, seconds in durations.items():
+            total, count = totals.get(cls._function_id(nodeid), (0.0, 0))
+            totals[cls._function_id(nodeid)] = (total + seconds, count + 1)
+        return {name: total / count for name, (total, count) in totals.items()}
+
+    def _priority(self, nodeid: str):
+        if self._priorities is None:
+            try:
+                self._priorities = {case.id: case.priority for case in load_catalog()}
+            except Exception:
+                self._priorities = {}
+        match = CASE_ID.search(nodeid)
+        return self._priorities.get(match.group(1)) if match else None
+
+    def predict(self, nodeid: str) -> float:
+        if nodeid in self.durations:
+            return self.durations[nodeid]
+        priority = self._priority(nodeid)
+        function_mean = self._function_means.get(self._function_id(nodeid))
+        if function_mean is not None:
+            return function_mean * PRIORITY_WEIGHT.get(priority, 1.0)
+        return PRIORITY_SECONDS.get(priority, DEFAULT_SECONDS)
+
+    def update(self, measured: Dict[str, float]):
+        for nodeid, seconds in measured.items():
+            previous = self.durations.get(nodeid)
+            self.durations[nodeid] = seconds if previous is None else (
+                HISTORY_WEIGHT * seconds + (1 - HISTORY_WEIGHT) * previous
+            )
+        self._function_means = self._means(self.durations)
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self.durations, indent=1, sort_keys=True), encoding="utf-8")
+        tmp_path.replace(self.path)
+
+
+def simulate_makespan(durations: Iterable[float], workers: int) -> float:
+    """Makespan of greedy list scheduling of durations (in the given order) on `workers` workers"""
+    loads = [0.0] * max(workers, 1)
+    for seconds in durations:
+        heapq.heappush(loads, heapq.heappop(loads) + seconds)
+    return max(loads)
+
+
+class LongestFirstScheduling(LoadScheduling):
+    """xdist load scheduling that always hands out the longest predicted test next"""
+
+    def __init__(self, config, log, plugin: "DurationSchedulerPlugin"):
+        super().__init__(config, log)
+        self.plugin = plugin
+
+    def schedule(self):
+        assert self.collection_is_completed
+
+        if self.collection is not None:
+            for node in self.nodes:
+                self.check_schedule(node)
+            return
+
+        if not self._check_nodes_have_same_collection():
+            self.log("**Different tests collected, aborting run**")
+            return
+
+        self.collection = next(iter(self.node2collection.values()))
+        predicted = [self.plugin.history.predict(nodeid) for nodeid in self.collection]
+        self.pending[:] = sorted(range(len(self.collection)), key=lambda i: -predicted[i])
+        if not self.collection:
+            return
+        if self.maxschedchunk is None:
+            self.maxschedchunk = len(self.collection)
+
+        self.plugin.predicted_makespan = simulate_makespan(
+            (predicted[i] for i in self.pending), len(self.nodes)
+        )
+
+        # Two tests per worker: one running, one queued so the worker never
+        # waits on the controller. The rest stay here, longest first.
+        for _ in range(2):
+            for node in self.nodes:
+                self._send_tests(node, 1)
+
+        if not self.pending:
+            for node in self.nodes:
+                node.shutdown()
+
+    def check_schedule(self, node, duration: float = 0):
+        if node.shutting_down:
+            return
+        if self.pending:
+            missing = 2 - len(self.node2pending[node])
+            if missing > 0:
+                self._send_tests(node, missing)
+        else:
+            node.shutdown()
+        self.log("num items waiting for node:", len(self.pending))
+
+
+class DurationSchedulerPlugin:
+    """Records durations and, under xdist, schedules tests longest-first"""
+
+    def __init__(self, config):
+        self.config = config
+        path = Path(config.getoption("durations_file") or DEFAULT_HISTORY_FILE)
+        self.history = DurationHistory(path if path.is_absolute() else Path(config.rootpath) / path)
+        self.enabled = not config.getoption("no_duration_scheduling")
+        self.measured: Dict[str, float] = {}
+        self.worker_busy: Dict[str, float] = {}
+        self.predicted_makespan = None
+        self.started = time.perf_counter()
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_xdist_make_scheduler(self, config, log):
+        if not self.enabled or config.getoption("dist") != "load":
+            return None
+        return LongestFirstScheduling(config, log, self)
+
+    def pytest_runtest_logreport(self, report):
+        self.measured[report.nodeid] = self.measured.get(report.nodeid, 0.0) + report.duration
+        node = getattr(report, "node", None)
+        worker = node.gateway.id if node is not None else "main"
+        self.worker_busy[worker] = self.worker_busy.get(worker, 0.0) + report.duration
+
+    def pytest_sessionfinish(self, session):
+        if self.measured:
+            self.history.update(self.measured)
+            self.history.save()
+
+    def pytest_terminal_summary(self, terminalreporter):
+        if self.predicted_makespan is None or not self.worker_busy:
+            return
+        actual = max(self.worker_busy.values())
+        busy = ", ".join(f"{w}={s:.1f}s" for w, s in sorted(self.worker_busy.items()))
+        terminalreporter.write_sep("-", "duration-aware scheduling")
+        terminalreporter.write_line(
+            f"Predicted makespan {self.predicted_makespan:.1f}s, actual {actual:.1f}s "
+            f"(busiest worker), wall {time.perf_counter() - self.started:.1f}s"
+        )
+        terminalreporter.write_line(f"Worker busy time: {busy}")
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("duration scheduling")
+    group.addoption(
+        "--no-duration-scheduling",
+        action="store_true",
+        default=False,
+        help="Use xdist's default load scheduling instead of longest-first",
+    )
+    group.addoption(
+        "--durations-file",
+        default=None,
+        help=f"Test duration history file (default: {DEFAULT_HISTORY_FILE} in the rootdir)",
+    )
+
+
+def pytest_configure(config):
+    # Workers report durations to the controller; only the controller schedules and records
+    if hasattr(config, "workerinput"):
+        return
+    config.pluginmanager.register(DurationSchedulerPlugin(config), "duration_scheduler_plugin")
@@ -0,0 +1,136 @@
+"""
+Incremental evaluation store for RAGAS scores.
+
+Scores are keyed by (metric, question, response hash, contexts hash); when a
+nightly run produces the same answer again the stored score is returned and
+the judge is not called. Responses are whitespace-normalised before hashing
+so re-rendered but otherwise identical answers still hit.
+
+The metric part of the key is scoped to the judge that produced the score
+(store_key): model, endpoint host and, for embedding-based metrics, the
+embedding model. Scores from the local stand-in judge (127.0.0.1) are never
+served to a run against the real judge.
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+WHITESPACE = re.compile(r"\s+")
+ZERO_WIDTH = re.compile("[​‌‍⁠﻿]")
+
+
+def _normalize(text: str) -> str:
+    return WHITESPACE.sub(" ", ZERO_WIDTH.sub("", text or "")).strip()
+
+
+def _digest(value) -> str:
+    if not isinstance(value, str):
+        value = json.dumps(value, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(_normalize(value).encode("utf-8")).hexdigest()
+
+
+def store_key(metric: str, judge_model: str = "", judge_host: str = "", embedding_model: str = "") -> str:
+    """Metric name scoped to the judge, e.g. relevancy@sonar-pro@api.perplexity.ai+all-MiniLM-L6-v2"""
+    key = "@".join([metric] + [part for part in (judge_model, judge_host) if part])
+    return f"{key}+{embedding_model}" if embedding_model else key
+
+
+def sample_key(metric: str, sample) -> tuple:
+    """Build the (metric, question, response hash, contexts hash) key for a sample"""
+    user_input = getattr(sample, "user_input", "")
+    if isinstance(user_input, str):
+        question = _normalize(user_input)
+        response = getattr(sample, "response", None) or ""
+    else:
+        # Multi-turn samples: the whole conversation is the "response"
+        question = ""
+        response = [getattr(m, "content", str(m)) for m in user_input]
+
+    contexts = sorted(_normalize(c) for c in (getattr(sample, "retrieved_contexts", None) or []))
+    reference = getattr(sample, "reference", None) or getattr(sample, "reference_topics", None) or ""
+    return metric, question, _digest(response), _digest([contexts, reference])
+
+
+class EvaluationStore:
+    """SQLite-backed score cache shared by all workers of a run"""
+
+    def __init__(self, path: str = ".eval_cache/scores.sqlite", force_rescore: bool = False):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.force_rescore = force_rescore
+        self.hits = 0
+        self.misses = 0
+        self.judge_calls_avoided = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS scores (
+                   metric TEXT NOT NULL,
+                   question TEXT NOT NULL,
+                   response_hash TEXT NOT NULL,
+                   contexts_hash TEXT NOT NULL,
+                   score REAL NOT NULL,
+                   judge_calls INTEGER NOT NULL DEFAULT 0,
+                   updated_at REAL NOT NULL,
+                   PRIMARY KEY (metric, question, response_hash, contexts_hash)
+               )"""
+        )
+        self._conn.commit()
+
+    def lookup(self, metric: str, sample):
+        """Return the stored score for an unchanged sample, or None"""
+        if self.force_rescore:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT score, judge_calls FROM scores WHERE metric=? AND question=? "
+                "AND response_hash=? AND contexts_hash=?",
+                sample_key(metric, sample),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.judge_calls_avoided += row[1]
+            return row[0]
+
+    def save(self, metric: str, sample, score: float, judge_calls: int = 0):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (*sample_key(metric, sample), float(score), int(judge_calls), time.time()),
+            )
+            self._conn.commit()
+
+    def summary(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "judge_calls_avoided": self.judge_calls_avoided,
+            "force_rescore": self.force_rescore,
+        }
+
+    def log_summary(self):
+        if not (self.hits or self.misses):
+            return
+        logger.info(
+            f"Evaluation store: {self.hits} cached scores reused, {self.misses} scored by the judge, "
+            f"~{self.judge_calls_avoided} judge calls avoided"
+            + (" (--force-rescore)" if self.force_rescore else "")
+        )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
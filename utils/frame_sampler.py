@@ -0,0 +1,131 @@
+"""
+requestAnimationFrame frame-time sampling for rendering benchmarks.
+
+    sampler = FrameSampler(page)
+    sampler.start()
+    ...                       # stream a response, scroll, ...
+    stats = sampler.stop()    # FrameStats(frames, p95_ms, dropped_pct, ...)
+
+Every animation frame's timestamp is recorded in the page; the deltas are
+the frame times. A frame slower than 1.5 refresh intervals counts its
+missed intervals as dropped frames, so dropped_pct is dropped / (rendered +
+dropped). The refresh interval is estimated from the median frame time
+(60 Hz unless the display is faster).
+
+seed_history() grows the conversation to N messages by cloning a rendered
+message in place, so long histories can be benchmarked without waiting on
+the backend for every turn.
+"""
+
+from dataclasses import asdict, dataclass
+from statistics import median
+from typing import List
+
+from utils.perf_summary import percentile
+
+DEFAULT_INTERVAL_MS = 1000 / 60
+
+START_SCRIPT = """
+() => {
+  const state = window.__uaskFrames = {times: [], running: true};
+  const tick = t => { state.times.push(t); if (state.running) requestAnimationFrame(tick); };
+  requestAnimationFrame(tick);
+}
+"""
+
+STOP_SCRIPT = """
+() => {
+  const state = window.__uaskFrames || {times: []};
+  state.running = false;
+  return state.times;
+}
+"""
+
+SCROLL_SCRIPT = """
+async ([selector, durationMs]) => {
+  const el = document.querySelector(selector);
+  if (!el) return 0;
+  el.scrollTop = 0;
+  const distance = el.scrollHeight - el.clientHeight;
+  const start = performance.now();
+  await new Promise(resolve => {
+    const step = now => {
+      const progress = Math.min(1, (now - start) / durationMs);
+      el.scrollTop = distance * progress;
+      progress < 1 ? requestAnimationFrame(step) : resolve();
+    };
+    requestAnimationFrame(step);
+  });
+  return distance;
+}
+"""
+
+SEED_SCRIPT = """
+([messageSelector, total]) => {
+  const messages = document.querySelectorAll(messageSelector);
+  if (!messages.length) return 0;
+  // Walk up from the last message to the element that is repeated once per turn
+  let node = messages[messages.length - 1];
+  while (node.parentElement && node.parentElement.children.length < 2) node = node.parentElement;
+  const list = node.parentElement;
+  if (!list) return messages.length;
+  while (document.querySelectorAll(messageSelector).length < total) {
+    list.insertBefore(node.cloneNode(true), list.firstChild);
+  }
+  return document.querySelectorAll(messageSelector).length;
+}
+"""
+
+
+@dataclass
+class FrameStats:
+    frames: int
+    duration_ms: float
+    mean_ms: float
+    p95_ms: float
+    max_ms: float
+    dropped_frames: int
+    dropped_pct: float
+
+    def to_dict(self) -> dict:
+        return {k: round(v, 2) if isinstance(v, float) else v for k, v in asdict(self).items()}
+
+
+def frame_stats(timestamps: List[float]) -> FrameStats:
+    deltas = [b - a for a, b in zip(timestamps, timestamps[1:])]
+    if not deltas:
+        return FrameStats(0, 0.0, 0.0, 0.0, 0.0, 0, 0.0)
+    interval = min(DEFAULT_INTERVAL_MS, median(deltas))
+    dropped = sum(max(0, round(d / interval) - 1) for d in deltas if d > 1.5 * interval)
+    return FrameStats(
+        frames=len(deltas),
+        duration_ms=timestamps[-1] - timestamps[0],
+        mean_ms=sum(deltas) / len(deltas),
+        p95_ms=percentile(deltas, 95),
+        max_ms=max(deltas),
+        dropped_frames=dropped,
+        dropped_pct=100 * dropped / (len(deltas) + dropped),
+    )
+
+
+class FrameSampler:
+    """Records animation frame timestamps in the page between start() and stop()"""
+
+    def __init__(self, page):
+        self.page = page
+
+    def start(self):
+        self.page.evaluate(START_SCRIPT)
+
+    def stop(self) -> FrameStats:
+        return frame_stats(self.page.evaluate(STOP_SCRIPT))
+
+
+def scroll_through(page, selector: str, duration_ms: int = 2000) -> float:
+    """Scroll an element from top to bottom over duration_ms, one step per frame; returns the distance"""
+    return page.evaluate(SCROLL_SCRIPT, [selector, duration_ms])
+
+
+def seed_history(page, message_selector: str, total: int) -> int:
+    """Clone rendered messages until the page shows `total`; returns the resulting count"""
+    return page.evaluate(SEED_SCRIPT, [message_selector, total])
@@ -0,0 +1,138 @@
+"""
+HAR record / replay for front-end-only UI tests.
+
+Tests marked @pytest.mark.har only check front-end behaviour, so their
+network traffic can be recorded once and served back from disk:
+
+- "record": the context saves every response of the test into
+  data/har/<test>.har.zip (git-ignored). When the context closes the
+  archive is redacted: requests to auth endpoints (`har_exclude_urls`, by
+  default login / auth / token URLs, i.e. the credential POST) are dropped
+  together with their bodies, and cookies plus Authorization / Cookie /
+  Set-Cookie / token headers are removed from the remaining entries; on
+  replay those auth requests go to the live network
+- "replay": the context answers requests from that archive via Playwright's
+  HAR routing, so the test no longer waits on the live backend; requests the
+  archive doesn't contain are aborted (or sent to the network with
+  `har_not_found: fallback`)
+- "off": the live site, as usual
+
+Set `har_mode` in config.yaml or pass --har-mode; unmarked tests always run
+live. A replay without a recorded archive is skipped.
+"""
+
+import json
+import re
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+
+import pytest
+
+from utils.artifact_paths import temp_path
+
+MODES = ("off", "record", "replay")
+UNSAFE_CHARS = re.compile(r"[^\w.\-]+")
+DEFAULT_EXCLUDE_URLS = r"(login|logout|sign-?in|oauth|openid|auth|token|session)"
+SENSITIVE_HEADERS = re.compile(r"(?i)^(authorization|proxy-authorization|cookie|set-cookie|x-.*(token|auth|key).*)$")
+REDACTED = "[redacted]"
+
+
+@dataclass
+class HarSettings:
+    mode: str = "off"
+    directory: Path = Path("data/har")
+    not_found: str = "abort"
+    url_filter: str = None
+    exclude_urls: str = DEFAULT_EXCLUDE_URLS
+
+    @classmethod
+    def from_config(cls, config: dict, mode: str = None) -> "HarSettings":
+        mode = mode or config.get("har_mode", cls.mode)
+        if mode not in MODES:
+            raise ValueError(f"har_mode must be one of {MODES}, got {mode!r}")
+        not_found = config.get("har_not_found", cls.not_found)
+        if not_found not in ("abort", "fallback"):
+            raise ValueError(f"har_not_found must be 'abort' or 'fallback', got {not_found!r}")
+        return cls(
+            mode=mode,
+            directory=Path(config.get("har_dir", cls.directory)),
+            not_found=not_found,
+            url_filter=config.get("har_url_filter") or None,
+            exclude_urls=config.get("har_exclude_urls", cls.exclude_urls) or None,
+        )
+
+    def archive(self, nodeid: str) -> Path:
+        return self.directory / f"{UNSAFE_CHARS.sub('_', nodeid)}.har.zip"
+
+    def applies_to(self, node) -> bool:
+        return self.mode != "off" and node.get_closest_marker("har") is not None
+
+    def context_options(self, node) -> dict:
+        """browser.new_context() options for recording this test's traffic"""
+        if self.mode != "record" or not self.applies_to(node):
+            return {}
+        path = self.archive(node.nodeid)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # "minimal" keeps what routing needs and leaves out cookies, timings and page info
+        options = {"record_har_path": str(path), "record_har_content": "attach", "record_har_mode": "minimal"}
+        if self.url_filter:
+            options["record_har_url_filter"] = self.url_filter
+        return options
+
+    def require_archive(self, node):
+        """Skip a replayed test that has nothing recorded (call before opening the context)"""
+        if self.mode == "replay" and self.applies_to(node) and not self.archive(node.nodeid).exists():
+            pytest.skip(f"No HAR archive at {self.archive(node.nodeid)}; record one with --har-mode record")
+
+    def route(self, context, node):
+        """Serve this test's requests from its archive when replaying"""
+        if self.mode == "replay" and self.applies_to(node):
+            context.route_from_har(str(self.archive(node.nodeid)), not_found=self.not_found, url=self.url_filter)
+            if self.exclude_urls:
+                # Registered last, so it wins: auth requests were redacted from the archive
+                context.route(re.compile(self.exclude_urls, re.IGNORECASE), lambda route: route.continue_())
+
+    def redact(self, node):
+        """Strip credentials from this test's freshly recorded archive (call after the context closed)"""
+        if self.mode != "record" or not self.applies_to(node):
+            return
+        path = self.archive(node.nodeid)
+        if path.exists():
+            redact_archive(path, self.exclude_urls)
+
+
+def _scrub_headers(message: dict):
+    message["headers"] = [
+        {**h, "value": REDACTED} if SENSITIVE_HEADERS.match(h.get("name", "")) else h
+        for h in message.get("headers", [])
+    ]
+    message.pop("cookies", None)
+
+
+def redact_archive(path: Path, exclude_urls: str = DEFAULT_EXCLUDE_URLS) -> int:
+    """Drop auth requests and credential headers from a .har.zip in place; returns the entries dropped"""
+    excluded = re.compile(exclude_urls, re.IGNORECASE) if exclude_urls else None
+    with zipfile.ZipFile(path) as archive:
+        files = {name: archive.read(name) for name in archive.namelist()}
+    har_name = next(name for name in files if name.endswith(".har"))
+    har = json.loads(files[har_name])
+
+    kept, dropped = [], []
+    for entry in har["log"]["entries"]:
+        (dropped if excluded and excluded.search(entry["request"]["url"]) else kept).append(entry)
+    for entry in kept:
+        _scrub_headers(entry["request"])
+        _scrub_headers(entry["response"])
+    for entry in dropped:
+        for body in (entry["response"].get("content", {}), entry["request"].get("postData", {})):
+            files.pop(body.get("_file"), None)
+    har["log"]["entries"] = kept
+    files[har_name] = json.dumps(har, ensure_ascii=False).encode("utf-8")
+
+    tmp_path = temp_path(path)
+    with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in files.items():
+            archive.writestr(name, data)
+    tmp_path.replace(path)
+    return len(dropped)
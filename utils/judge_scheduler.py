@@ -0,0 +1,386 @@
+"""
+Rate-limit-aware scheduler for judge LLM requests.
+
+Every request made by the RAGAS judge passes through one JudgeScheduler:
+
+- a token bucket caps the request rate (`requests_per_second`, `burst`)
+- an AIMD limiter adapts the number of in-flight requests, growing it by one
+  per window of successes, halving it on 429s and trimming it by 10% on
+  responses slower than `latency_target_s`; the bucket's refill rate backs
+  off and recovers the same way
+- retryable failures (429, timeouts, connection errors, 5xx) are retried with
+  full-jitter exponential backoff, honouring Retry-After when present
+- one pooled httpx client is shared by every sync request; async requests
+  share one pooled client per event loop (LoopBoundAsyncClient), since
+  httpx connections can't outlive the loop they were opened on
+
+The primitives are thread-based so they work across the event loops RAGAS
+creates for each `single_turn_score` call; async waiters park on a future of
+their own loop, which release() resolves thread-safely.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+
+import httpx
+import openai
+
+from utils.logger import get_logger
+from utils.perf_summary import record_count
+from utils.tracing import span
+
+logger = get_logger(__name__)
+
+# One burst of 429s should shrink the limits once, not once per rejected request
+DECREASE_COOLDOWN_S = 1.0
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+
+class TokenBucket:
+    """Thread-safe token bucket; reserve() returns how long the caller must wait"""
+
+    def __init__(self, rate: float, burst: float):
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = max(1.0, burst)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def throttle(self):
+        """Halve the refill rate after the provider pushed back"""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_decrease >= DECREASE_COOLDOWN_S:
+                self.rate = max(self.max_rate / 16, self.rate / 2)
+                self._last_decrease = now
+
+    def recover(self):
+        """Grow the refill rate back towards its configured maximum"""
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+class AIMDLimiter:
+    """Concurrency limit with additive increase and multiplicative decrease"""
+
+    def __init__(self, initial: int, minimum: int, maximum: int, latency_target_s: float):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.latency_target_s = latency_target_s
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+        self._async_waiters = []  # (loop, asyncio.Future) of coroutines blocked in acquire_async
+
+    def try_acquire(self) -> bool:
+        with self._cond:
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return True
+            return False
+
+    def acquire(self):
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    async def acquire_async(self):
+        """acquire() for coroutines: waits on the running loop instead of blocking it"""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            try:
+                await waiter
+            finally:
+                with self._cond:
+                    if (loop, waiter) in self._async_waiters:
+                        self._async_waiters.remove((loop, waiter))
+
+    def _notify(self):
+        """Wake every waiter, sync and async; call with self._cond held"""
+        self._cond.notify_all()
+        for loop, waiter in self._async_waiters:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(_resolve, waiter)
+        self._async_waiters.clear()
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._notify()
+
+    def on_success(self, latency_s: float):
+        with self._cond:
+            if self.latency_target_s and latency_s > self.latency_target_s:
+                self.limit = max(self.minimum, self.limit * 0.9)
+            else:
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self._notify()
+
+    def on_throttled(self):
+        with self._cond:
+            now = time.monotonic()
+            if now - self._last_decrease >= DECREASE_COOLDOWN_S:
+                self.limit = max(self.minimum, self.limit / 2)
+                self._last_decrease = now
+
+
+def _resolve(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class LoopBoundAsyncClient(httpx.AsyncClient):
+    """
+    AsyncClient that sends through one pooled client per running event loop.
+
+    ChatOpenAI takes a single `http_async_client` for its lifetime, but a
+    pooled connection is bound to the loop that opened it; reusing it from
+    another loop fails with "Event loop is closed". Clients of loops that
+    have since closed are dropped.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._client_kwargs = kwargs
+        self._clients = {}  # id(loop) -> (loop, httpx.AsyncClient)
+        self._clients_lock = threading.Lock()
+
+    def _client_for(self, loop: asyncio.AbstractEventLoop) -> httpx.AsyncClient:
+        with self._clients_lock:
+            for key, (other, _) in list(self._clients.items()):
+                if other.is_closed():
+                    # Its connections died with the loop; nothing left to close
+                    del self._clients[key]
+            entry = self._clients.get(id(loop))
+            if entry is None:
+                entry = self._clients[id(loop)] = (loop, httpx.AsyncClient(**self._client_kwargs))
+            return entry[1]
+
+    async def send(self, request, **kwargs):
+        return await self._client_for(asyncio.get_running_loop()).send(request, **kwargs)
+
+    async def aclose(self):
+        loop = asyncio.get_running_loop()
+        with self._clients_lock:
+            entry = self._clients.pop(id(loop), None)
+        if entry is not None:
+            await entry[1].aclose()
+
+    def close_all(self):
+        """Close every per-loop client from sync code, each on its own loop"""
+        with self._clients_lock:
+            entries = list(self._clients.values())
+            self._clients.clear()
+        for loop, client in entries:
+            try:
+                if loop.is_closed():
+                    continue
+                if loop.is_running():
+                    asyncio.run_coroutine_threadsafe(client.aclose(), loop).result(timeout=10)
+                else:
+                    loop.run_until_complete(client.aclose())
+            except Exception as e:
+                logger.warning(f"Could not close async judge client: {e}")
+
+
+@dataclass
+class SchedulerStats:
+    requests: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    retries: int = 0
+    throttled: int = 0
+    throttle_wait_s: float = 0.0
+    backoff_wait_s: float = 0.0
+    first_start: float = None
+    last_end: float = None
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add(self, **deltas):
+        with self._lock:
+            for name, value in deltas.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def mark(self, start: float = None, end: float = None):
+        with self._lock:
+            if start is not None and (self.first_start is None or start < self.first_start):
+                self.first_start = start
+            if end is not None and (self.last_end is None or end > self.last_end):
+                self.last_end = end
+
+
+class JudgeScheduler:
+    """Wraps judge LLM calls with rate limiting, adaptive concurrency and retries"""
+
+    def __init__(self, requests_per_second: float = 2.0, burst: float = 4, initial_concurrency: int = 4,
+                 min_concurrency: int = 1, max_concurrency: int = 8, latency_target_s: float = 20.0,
+                 max_retries: int = 5, backoff_base_s: float = 1.0, backoff_max_s: float = 30.0,
+                 pool_connections: int = 10):
+        self.bucket = TokenBucket(requests_per_second, burst)
+        self.limiter = AIMDLimiter(initial_concurrency, min_concurrency, max_concurrency, latency_target_s)
+        self.max_retries = max_retries
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self.stats = SchedulerStats()
+
+        limits = httpx.Limits(max_connections=pool_connections, max_keepalive_connections=pool_connections)
+        self.http_client = httpx.Client(limits=limits)
+        self.http_async_client = LoopBoundAsyncClient(limits=limits)
+
+    @classmethod
+    def from_config(cls, settings: dict = None) -> "JudgeScheduler":
+        """Build a scheduler from the `judge.scheduler` config section"""
+        return cls(**(settings or {}))
+
+    # ------------------------------------------------------------------
+    # Retry policy
+    # ------------------------------------------------------------------
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        retry_after = None
+        response = getattr(error, "response", None)
+        if response is not None:
+            try:
+                retry_after = float(response.headers.get("retry-after"))
+            except (TypeError, ValueError):
+                retry_after = None
+        ceiling = min(self.backoff_max_s, self.backoff_base_s * (2 ** attempt))
+        delay = random.uniform(0, ceiling)
+        return max(delay, retry_after) if retry_after is not None else delay
+
+    def _on_error(self, attempt: int, error: Exception) -> float:
+        """Record a failed attempt; return the backoff delay or re-raise when exhausted"""
+        if isinstance(error, openai.RateLimitError):
+            self.limiter.on_throttled()
+            self.bucket.throttle()
+            self.stats.add(throttled=1)
+        if not isinstance(error, RETRYABLE_ERRORS) or attempt >= self.max_retries:
+            self.stats.add(failed=1)
+            raise error
+        delay = self._backoff(attempt, error)
+        self.stats.add(retries=1, backoff_wait_s=delay)
+        logger.warning(f"Judge request failed ({type(error).__name__}), retry {attempt + 1} "
+                       f"in {delay:.1f}s (concurrency limit {self.limiter.limit:.1f})")
+        return delay
+
+    # ------------------------------------------------------------------
+    # Execution
+    # ------------------------------------------------------------------
+
+    def run(self, call):
+        """Run a synchronous judge call under the scheduler"""
+        self.stats.add(requests=1)
+        record_count("judge_calls")
+        for attempt in range(self.max_retries + 1):
+            wait_start = time.monotonic()
+            time.sleep(self.bucket.reserve())
+            self.limiter.acquire()
+            start = time.monotonic()
+            self.stats.add(throttle_wait_s=start - wait_start)
+            self.stats.mark(start=start)
+            try:
+                with span("judge.request", "judge", track="judge", attempt=attempt,
+                          throttle_wait_s=round(start - wait_start, 3)):
+                    result = call()
+            except Exception as error:
+                self.limiter.release()
+                delay = self._on_error(attempt, error)
+                time.sleep(delay)
+                continue
+            end = time.monotonic()
+            self.limiter.release()
+            self.limiter.on_success(end - start)
+            self.bucket.recover()
+            self.stats.add(succeeded=1)
+            self.stats.mark(end=end)
+            return result
+
+    async def arun(self, call):
+        """Run an async judge call (a coroutine factory) under the scheduler"""
+        self.stats.add(requests=1)
+        record_count("judge_calls")
+        for attempt in range(self.max_retries + 1):
+            wait_start = time.monotonic()
+            await asyncio.sleep(self.bucket.reserve())
+            await self.limiter.acquire_async()
+            start = time.monotonic()
+            self.stats.add(throttle_wait_s=start - wait_start)
+            self.stats.mark(start=start)
+            try:
+                with span("judge.request", "judge", track="judge", attempt=attempt,
+                          throttle_wait_s=round(start - wait_start, 3)):
+                    result = await call()
+            except Exception as error:
+                self.limiter.release()
+                delay = self._on_error(attempt, error)
+                await asyncio.sleep(delay)
+                continue
+            end = time.monotonic()
+            self.limiter.release()
+            self.limiter.on_success(end - start)
+            self.bucket.recover()
+            self.stats.add(succeeded=1)
+            self.stats.mark(end=end)
+            return result
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+
+    def summary(self) -> dict:
+        s = self.stats
+        elapsed = (s.last_end - s.first_start) if s.first_start is not None and s.last_end is not None else 0.0
+        return {
+            "requests": s.requests,
+            "succeeded": s.succeeded,
+            "failed": s.failed,
+            "retries": s.retries,
+            "throttled_429": s.throttled,
+            "requests_per_second": s.succeeded / elapsed if elapsed > 0 else 0.0,
+            "time_lost_to_throttling_s": s.throttle_wait_s + s.backoff_wait_s,
+            "concurrency_limit": self.limiter.limit,
+            "rate_limit_rps": self.bucket.rate,
+        }
+
+    def log_summary(self):
+        summary = self.summary()
+        logger.info(
+            f"Judge scheduler: {summary['succeeded']}/{summary['requests']} requests succeeded, "
+            f"{summary['retries']} retries ({summary['throttled_429']} x 429), "
+            f"{summary['requests_per_second']:.2f} req/s, "
+            f"{summary['time_lost_to_throttling_s']:.1f}s cumulative wait lost to throttling, "
+            f"final concurrency limit {summary['concurrency_limit']:.1f}"
+        )
+
+    def close(self):
+        self.http_client.close()
+        self.http_async_client.close_all()
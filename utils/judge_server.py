@@ -0,0 +1,335 @@
+"""
+Local OpenAI-compatible judge stand-in for offline RAGAS runs.
+
+RAGAS metrics send their prompts as a single chat message that embeds the
+JSON Schema of the expected output and the JSON input of the sample. The
+stand-in parses both and builds a deterministic answer that satisfies the
+schema, so Faithfulness, ResponseRelevancy, LLMContextRecall and
+TopicAdherenceScore can run without network access or API keys.
+
+Responses can be pinned per output schema with a fixtures file:
+
+    {"ResponseRelevanceOutput": {"question": "How do I renew my Emirates ID?", "noncommittal": 0}}
+
+Run standalone (optionally answering 429 above a request rate):
+
+    python -m utils.judge_server --port 8765 --latency-ms 200 --rate-limit-rps 5
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+SCHEMA_MARKER = "JSON Schema:"
+INPUT_MARKER = "Now perform the same with the following input"
+DEFAULT_REASON = "Deterministic verdict from the local judge."
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?؟])\s+|\n+")
+
+_decoder = json.JSONDecoder()
+
+
+def _decode_after(text: str, marker: str, last: bool = False):
+    """Decode the first JSON object that follows marker in text"""
+    pos = text.rfind(marker) if last else text.find(marker)
+    if pos < 0:
+        return None
+    start = text.find("{", pos + len(marker))
+    if start < 0:
+        return None
+    try:
+        obj, _ = _decoder.raw_decode(text, start)
+    except ValueError:
+        return None
+    return obj
+
+
+def _sentences(text: str) -> list:
+    """Split free text into non-empty sentences"""
+    if not text:
+        return []
+    return [s.strip() for s in SENTENCE_SPLIT.split(text) if s.strip()]
+
+
+def _first_text(data: dict, *keys) -> str:
+    for key in keys:
+        value = data.get(key)
+        if isinstance(value, str) and value.strip():
+            return value
+    return ""
+
+
+class SchemaResponder:
+    """Builds deterministic outputs that satisfy a RAGAS output schema"""
+
+    def __init__(self, fixtures: dict = None):
+        self.fixtures = fixtures or {}
+
+    def respond(self, prompt: str) -> str:
+        schema = _decode_after(prompt, SCHEMA_MARKER)
+        if not schema:
+            return "OK"
+
+        title = schema.get("title", "")
+        if title in self.fixtures:
+            return json.dumps(self.fixtures[title], ensure_ascii=False)
+
+        data = _decode_after(prompt, INPUT_MARKER, last=True) or {}
+        output = self._build(schema, schema.get("$defs", {}), "", data, None)
+        return json.dumps(output, ensure_ascii=False)
+
+    def _resolve(self, schema: dict, defs: dict) -> dict:
+        ref = schema.get("$ref")
+        if ref:
+            return defs.get(ref.rsplit("/", 1)[-1], {})
+        for key in ("anyOf", "oneOf", "allOf"):
+            if key in schema:
+                options = [s for s in schema[key] if s.get("type") != "null"]
+                if options:
+                    return self._resolve(options[0], defs)
+        return schema
+
+    def _build(self, schema: dict, defs: dict, name: str, data: dict, item):
+        schema = self._resolve(schema, defs)
+        if "enum" in schema:
+            return schema["enum"][0]
+
+        kind = schema.get("type", "object")
+        if kind == "object":
+            return {
+                prop: self._build(sub, defs, prop, data, item)
+                for prop, sub in schema.get("properties", {}).items()
+            }
+        if kind == "array":
+            sources = self._array_sources(name, data)
+            return [self._build(schema.get("items", {}), defs, name, data, src) for src in sources]
+        if kind == "string":
+            return self._string(name, data, item)
+        if kind == "integer":
+            return 0 if name == "noncommittal" else 1
+        if kind == "number":
+            return 1.0
+        if kind == "boolean":
+            return name != "refused_to_answer"
+        return None
+
+    def _array_sources(self, name: str, data: dict) -> list:
+        """Pick the input values an output list should be built from"""
+        if name == "statements":
+            given = data.get("statements")
+            if isinstance(given, list) and given:
+                return given
+            return _sentences(_first_text(data, "answer", "response", "text")) or [""]
+        if name == "classifications":
+            topics = data.get("topics")
+            if isinstance(topics, list) and topics:
+                return topics
+            return _sentences(_first_text(data, "answer", "reference")) or [""]
+        if name == "topics":
+            text = _first_text(data, "user_input", "question")
+            return [text.strip().splitlines()[0][:80]] if text.strip() else ["general"]
+        return [""]
+
+    def _string(self, name: str, data: dict, item) -> str:
+        if name in ("statement", "topic") and isinstance(item, str):
+            return item
+        if name == "reason":
+            return DEFAULT_REASON
+        if name == "question":
+            sentences = _sentences(_first_text(data, "response", "answer"))
+            return sentences[0] if sentences else _first_text(data, "user_input")
+        if isinstance(item, str):
+            return item
+        return ""
+
+
+class LocalJudgeServer:
+    """Threaded HTTP server exposing /v1/chat/completions backed by SchemaResponder"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: int = 0,
+                 fixtures: str = "", model: str = "local-judge", rate_limit_rps: float = 0):
+        self.model = model
+        self.latency_s = max(0, latency_ms) / 1000.0
+        self.rate_limit_rps = rate_limit_rps
+        self._recent = deque()
+        self.responder = SchemaResponder(self._load_fixtures(fixtures))
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "rejected_429": 0, "in_flight": 0, "peak_in_flight": 0, "by_schema": {}}
+        self._thread = None
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+
+    @staticmethod
+    def _load_fixtures(path: str) -> dict:
+        if not path:
+            return {}
+        with Path(path).open(encoding="utf-8") as f:
+            return json.load(f)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="local-judge", daemon=True)
+        self._thread.start()
+        logger.info(f"✓ Local judge listening on {self.url}")
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread:
+            self._thread.join(timeout=5)
+        logger.info(f"Local judge stopped after {self._stats['requests']} requests "
+                    f"(peak concurrency {self._stats['peak_in_flight']})")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "by_schema": dict(self._stats["by_schema"])}
+
+    def admit(self) -> bool:
+        """Sliding one-second window used to simulate provider 429 responses"""
+        if not self.rate_limit_rps:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            while self._recent and now - self._recent[0] > 1.0:
+                self._recent.popleft()
+            if len(self._recent) >= self.rate_limit_rps:
+                self._stats["rejected_429"] += 1
+                return False
+            self._recent.append(now)
+            return True
+
+    def complete(self, body: dict) -> dict:
+        """Produce an OpenAI chat.completion payload for a request body"""
+        messages = body.get("messages", [])
+        prompt = "\n".join(
+            m["content"] if isinstance(m.get("content"), str)
+            else "".join(part.get("text", "") for part in m.get("content", []))
+            for m in messages
+        )
+        schema = _decode_after(prompt, SCHEMA_MARKER) or {}
+        title = schema.get("title", "text")
+
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["in_flight"] += 1
+            self._stats["peak_in_flight"] = max(self._stats["peak_in_flight"], self._stats["in_flight"])
+            self._stats["by_schema"][title] = self._stats["by_schema"].get(title, 0) + 1
+        try:
+            if self.latency_s:
+                time.sleep(self.latency_s)
+            content = self.responder.respond(prompt)
+        finally:
+            with self._lock:
+                self._stats["in_flight"] -= 1
+
+        prompt_tokens = len(prompt.split())
+        completion_tokens = len(content.split())
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", self.model),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _send_json(self, status: int, payload: dict, headers: dict = None):
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/models"):
+                    self._send_json(200, {"object": "list", "data": [{"id": server.model, "object": "model"}]})
+                elif self.path.rstrip("/").endswith("/stats"):
+                    self._send_json(200, server.stats())
+                else:
+                    self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+                    return
+                length = int(self.headers.get("Content-Length", 0))
+                try:
+                    body = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError:
+                    self._send_json(400, {"error": {"message": "Request body is not valid JSON"}})
+                    return
+                if not server.admit():
+                    self._send_json(429, {"error": {"message": "Rate limit exceeded", "type": "rate_limit"}},
+                                    headers={"Retry-After": "1"})
+                    return
+                self._send_json(200, server.complete(body))
+
+            def log_message(self, format, *args):
+                # Keep the default per-request stderr logging out of test output
+                return
+
+        return Handler
+
+
+def start_local_judge(settings: dict = None) -> LocalJudgeServer:
+    """Start a LocalJudgeServer from the `judge.local` config section"""
+    settings = settings or {}
+    return LocalJudgeServer(
+        host=settings.get("host", "127.0.0.1"),
+        port=settings.get("port", 0),
+        latency_ms=settings.get("latency_ms", 0),
+        fixtures=settings.get("fixtures", ""),
+        rate_limit_rps=settings.get("rate_limit_rps", 0),
+    ).start()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the local OpenAI-compatible judge stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=int, default=0)
+    parser.add_argument("--fixtures", default="")
+    parser.add_argument("--rate-limit-rps", type=float, default=0)
+    args = parser.parse_args()
+
+    judge = start_local_judge({
+        "host": args.host, "port": args.port,
+        "latency_ms": args.latency_ms, "fixtures": args.fixtures,
+        "rate_limit_rps": args.rate_limit_rps,
+    })
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        judge.stop()
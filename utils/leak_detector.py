@@ -0,0 +1,121 @@
+"""
+Memory and DOM growth sampling for long conversations.
+
+LeakSampler takes a sample of the chat page after every turn through a CDP
+session (Chromium only):
+
+- js_heap_mb: used JS heap after a forced garbage collection
+- dom_nodes: elements attached to the document
+- detached_nodes: nodes alive in the renderer but not in the document
+  (Memory.getDOMCounters nodes minus every attached node: elements, text,
+  comments and documents, including same-origin iframes)
+- listeners: JS event listeners (Memory.getDOMCounters)
+
+fit_growth() fits a least-squares slope per metric over the turns after a
+warm-up, and LeakReport.violations() lists the metrics growing faster per
+message than their threshold. Some growth is expected (each turn renders a
+message); the thresholds bound what a conversation may cost per turn.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Sequence
+
+METRICS = ("js_heap_mb", "dom_nodes", "detached_nodes", "listeners")
+
+DEFAULT_THRESHOLDS = {
+    "js_heap_mb": 0.5,          # MB per message
+    "dom_nodes": 400,           # Attached elements per message (a rendered answer adds some)
+    "detached_nodes": 50,
+    "listeners": 20,
+}
+
+COUNT_NODES = """
+() => {
+  // getDOMCounters counts every Node, so count every attached Node (not just elements) to compare
+  const count = doc => {
+    const walker = doc.createTreeWalker(doc, NodeFilter.SHOW_ALL);
+    let nodes = 1;  // the document itself
+    while (walker.nextNode()) {
+      nodes++;
+      const frame = walker.currentNode;
+      if (frame.tagName === 'IFRAME' || frame.tagName === 'FRAME') {
+        try { if (frame.contentDocument) nodes += count(frame.contentDocument); } catch (e) { /* cross-origin */ }
+      }
+    }
+    return nodes;
+  };
+  return {elements: document.getElementsByTagName('*').length, nodes: count(document)};
+}
+"""
+
+
+def slope(xs: Sequence[float], ys: Sequence[float]) -> float:
+    """Least-squares slope of ys over xs (0 for fewer than two points)"""
+    n = len(xs)
+    if n < 2:
+        return 0.0
+    mean_x, mean_y = sum(xs) / n, sum(ys) / n
+    variance = sum((x - mean_x) ** 2 for x in xs)
+    if variance == 0:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / variance
+
+
+class LeakSampler:
+    """Samples heap, DOM, detached-node and listener counts of a page"""
+
+    def __init__(self, page):
+        self.page = page
+        self.cdp = page.context.new_cdp_session(page)
+        self.cdp.send("HeapProfiler.enable")
+        self.samples: List[Dict[str, float]] = []
+
+    def sample(self, turn: int) -> Dict[str, float]:
+        self.cdp.send("HeapProfiler.collectGarbage")
+        heap = self.cdp.send("Runtime.getHeapUsage")
+        counters = self.cdp.send("Memory.getDOMCounters")
+        attached = self.page.evaluate(COUNT_NODES)
+        sample = {
+            "turn": turn,
+            "js_heap_mb": round(heap["usedSize"] / 1_048_576, 3),
+            "dom_nodes": attached["elements"],
+            "detached_nodes": max(0, counters["nodes"] - attached["nodes"]),
+            "listeners": counters["jsEventListeners"],
+        }
+        self.samples.append(sample)
+        return sample
+
+    def close(self):
+        try:
+            self.cdp.detach()
+        except Exception:
+            pass
+
+
+@dataclass
+class LeakReport:
+    slopes: Dict[str, float]
+    thresholds: Dict[str, float]
+    samples: List[Dict[str, float]] = field(default_factory=list)
+
+    def violations(self) -> Dict[str, tuple]:
+        """{metric: (growth per message, threshold)} above threshold"""
+        return {
+            name: (self.slopes[name], limit)
+            for name, limit in self.thresholds.items()
+            if name in self.slopes and self.slopes[name] > limit
+        }
+
+    def summary(self) -> str:
+        return ", ".join(f"{name} {value:+.3f}/msg" for name, value in self.slopes.items())
+
+
+def fit_growth(samples: List[Dict[str, float]], warmup: int = 5, thresholds: Dict[str, float] = None) -> LeakReport:
+    """Per-message growth of every metric, ignoring the first `warmup` turns"""
+    steady = [s for s in samples if s["turn"] > warmup] or samples
+    turns = [s["turn"] for s in steady]
+    return LeakReport(
+        slopes={name: slope(turns, [s[name] for s in steady]) for name in METRICS},
+        thresholds={**DEFAULT_THRESHOLDS, **(thresholds or {})},
+        samples=samples,
+    )
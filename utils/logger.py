@@ -1,24 +1,154 @@
+"""
+Run-wide logging backbone.
+
+Every logger from get_logger() shares one QueueHandler: the calling thread
+only enqueues the record, and a QueueListener thread does the console and
+file I/O, so tests never block on disk.
+
+- console: the usual "time - name - level - message" text
+- file: JSON lines with run id, xdist worker id and the current test id, in
+  logs/run_<run id>.<worker>.jsonl, rotated by size
+- run id: UASK_RUN_ID, set once by the first process and inherited by
+  xdist workers so they all log under the same run
+- at exit the process that started the run (the xdist controller, or the only
+  process) merges every worker's file, rotated parts included, into a single
+  time-ordered logs/run_<run id>.jsonl
+
+Set UASK_LOG_LEVEL=DEBUG to include debug records (e.g. full responses).
+"""
+
+import atexit
+import heapq
+import json
 import logging
-from pathlib import Path
+import logging.handlers
+import os
+import queue
+import threading
 from datetime import datetime
+from pathlib import Path
+
+LOGS_DIR = Path("logs")
+MAX_BYTES = 20 * 1024 * 1024
+BACKUP_COUNT = 5
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+RUN_ID = os.environ.setdefault("UASK_RUN_ID", datetime.now().strftime("%Y%m%d_%H%M%S"))
+WORKER_ID = os.environ.get("PYTEST_XDIST_WORKER", "main")
+
+_queue_handler = None
+_listener = None
+_lock = threading.Lock()
+
+
+class ContextFilter(logging.Filter):
+    """Stamps records with the run, worker and current test in the emitting thread"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.run_id = RUN_ID
+        record.worker = WORKER_ID
+        current = os.environ.get("PYTEST_CURRENT_TEST", "")
+        record.test_id, _, phase = current.rpartition(" (")
+        record.test_phase = phase.rstrip(")") if record.test_id else None
+        record.test_id = record.test_id or None
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="microseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "run_id": getattr(record, "run_id", RUN_ID),
+            "worker": getattr(record, "worker", WORKER_ID),
+            "test": getattr(record, "test_id", None),
+            "phase": getattr(record, "test_phase", None),
+            "thread": record.threadName,
+        }
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def _part_file(worker: str = WORKER_ID) -> Path:
+    return LOGS_DIR / f"run_{RUN_ID}.{worker}.jsonl"
+
+
+def _start():
+    global _queue_handler, _listener
+    LOGS_DIR.mkdir(exist_ok=True)
+
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter(TEXT_FORMAT))
+    file_handler = logging.handlers.RotatingFileHandler(
+        _part_file(), maxBytes=MAX_BYTES, backupCount=BACKUP_COUNT, encoding="utf-8"
+    )
+    file_handler.setFormatter(JsonFormatter())
+
+    log_queue = queue.Queue(-1)
+    _queue_handler = logging.handlers.QueueHandler(log_queue)
+    _queue_handler.addFilter(ContextFilter())
+    _listener = logging.handlers.QueueListener(log_queue, console, file_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown)
+
 
 def get_logger(name: str) -> logging.Logger:
-    logs_dir = Path("logs")
-    logs_dir.mkdir(exist_ok=True)
-    log_file = logs_dir / f"run_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
+    with _lock:
+        if _queue_handler is None:
+            _start()
 
     logger = logging.getLogger(name)
-    if logger.handlers:
+    if _queue_handler in logger.handlers:
         return logger
 
-    logger.setLevel(logging.INFO)
-    fh = logging.FileHandler(log_file, encoding="utf-8")
-    ch = logging.StreamHandler()
-    fmt = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    )
-    fh.setFormatter(fmt)
-    ch.setFormatter(fmt)
-    logger.addHandler(fh)
-    logger.addHandler(ch)
+    logger.setLevel(os.environ.get("UASK_LOG_LEVEL", "INFO").upper())
+    logger.addHandler(_queue_handler)
     return logger
+
+
+def flush():
+    """Block until every queued record has been written"""
+    if _listener is not None and _listener._thread is not None:
+        _listener.queue.join()
+        for handler in _listener.handlers:
+            handler.flush()
+
+
+def _read_part(worker: str):
+    """Lines of one worker's log, oldest rotated file first"""
+    current = _part_file(worker)
+    for path in [current.with_name(f"{current.name}.{i}") for i in range(BACKUP_COUNT, 0, -1)] + [current]:
+        if path.exists():
+            with path.open(encoding="utf-8") as f:
+                yield from f
+
+
+def merge_run_logs() -> Path:
+    """Merge every worker's JSON-lines log of this run into logs/run_<run id>.jsonl"""
+    prefix = f"run_{RUN_ID}."
+    workers = sorted({
+        p.name[len(prefix):].split(".jsonl")[0]
+        for p in LOGS_DIR.glob(f"{prefix}*.jsonl*")
+    })
+    merged = LOGS_DIR / f"run_{RUN_ID}.jsonl"
+    with merged.open("a", encoding="utf-8") as out:
+        # Lines start with {"ts": "<ISO timestamp>", so the prefix sorts by time
+        out.writelines(heapq.merge(*(_read_part(w) for w in workers), key=lambda line: line[:40]))
+    for path in LOGS_DIR.glob(f"{prefix}*.jsonl*"):
+        path.unlink()
+    return merged
+
+
+def shutdown():
+    """Stop the listener; the run's first process then merges the worker logs"""
+    global _listener
+    if _listener is None:
+        return
+    if _listener._thread is not None:
+        _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+    if WORKER_ID == "main":
+        merge_run_logs()
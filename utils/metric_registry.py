@@ -0,0 +1,187 @@
+"""
+Session-scoped registry of RAGAS metrics.
+
+Each metric is constructed and initialised once per session and shared by
+every test. `score_all` runs all requested metrics for a sample concurrently,
+so a sample costs as long as its slowest metric rather than the sum. With an
+EvaluationStore attached, unchanged samples reuse their stored scores and only
+changed ones are sent to the judge.
+"""
+
+import asyncio
+import concurrent.futures
+import contextvars
+import math
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Union
+from urllib.parse import urlparse
+
+from ragas import MultiTurnSample, SingleTurnSample
+from ragas.metrics import Faithfulness, LLMContextRecall, ResponseRelevancy, TopicAdherenceScore
+from ragas.run_config import RunConfig
+
+from utils.eval_store import store_key
+from utils.logger import get_logger
+from utils.tracing import span
+
+logger = get_logger(__name__)
+
+METRIC_FACTORIES = {
+    "faithfulness": lambda llm: Faithfulness(llm=llm),
+    "relevancy": lambda llm: ResponseRelevancy(llm=llm, embeddings=llm.embeddings),
+    "context_recall": lambda llm: LLMContextRecall(llm=llm),
+    "topic_adherence": lambda llm: TopicAdherenceScore(llm=llm),
+}
+
+# Metrics whose score also depends on the embedding model
+EMBEDDING_METRICS = {"relevancy"}
+
+
+@dataclass
+class MetricScores:
+    """Scores of one sample, keyed by registry metric name"""
+    scores: Dict[str, float] = field(default_factory=dict)
+    latency_s: Dict[str, float] = field(default_factory=dict)
+    cached: List[str] = field(default_factory=list)
+    elapsed_s: float = 0.0
+
+    def __getitem__(self, name: str) -> float:
+        return self.scores[name]
+
+    def get(self, name: str, default: float = None) -> float:
+        return self.scores.get(name, default)
+
+    def passed(self, thresholds: Dict[str, float]) -> bool:
+        """True when every thresholded metric scored strictly above its threshold"""
+        return all(self.scores.get(name, 0.0) > minimum for name, minimum in thresholds.items())
+
+
+_loop: asyncio.AbstractEventLoop = None
+_loop_lock = threading.Lock()
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    """The session's scoring loop, running forever on a daemon thread"""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="ragas-loop", daemon=True).start()
+        return _loop
+
+
+def run_sync(coro):
+    """
+    Run a coroutine from sync test code, even when Playwright owns the event loop.
+
+    Every call runs on the same long-lived loop, so the judge's pooled
+    connections are reused across samples instead of dying with a
+    per-call loop. The caller's context (the current trace span) is kept.
+    """
+    result = concurrent.futures.Future()
+
+    def done(task: asyncio.Task):
+        if task.cancelled():
+            result.cancel()
+        elif task.exception() is not None:
+            result.set_exception(task.exception())
+        else:
+            result.set_result(task.result())
+
+    def start():
+        asyncio.ensure_future(coro).add_done_callback(done)
+
+    _background_loop().call_soon_threadsafe(start, context=contextvars.copy_context())
+    return result.result()
+
+
+class MetricRegistry:
+    """Builds each metric once and scores samples against several metrics at a time"""
+
+    def __init__(self, llm_wrapper, run_config: RunConfig = None, store=None, scheduler=None):
+        self.llm_wrapper = llm_wrapper
+        self.run_config = run_config or RunConfig()
+        self.store = store
+        self.scheduler = scheduler
+        llm = getattr(llm_wrapper, "langchain_llm", None)
+        self.judge_model = getattr(llm, "model_name", "") or ""
+        # The local stand-in and the real judge share judge.model; the host tells them apart
+        self.judge_host = urlparse(getattr(llm, "openai_api_base", None) or "").hostname or ""
+        embeddings = getattr(getattr(llm_wrapper, "embeddings", None), "embeddings", None)
+        self.embedding_model = getattr(embeddings, "model_name", "") or ""
+        self._metrics = {}
+
+    def get(self, name: str):
+        """Return the shared, initialised metric instance for name"""
+        if name not in self._metrics:
+            if name not in METRIC_FACTORIES:
+                raise KeyError(f"Unknown metric '{name}', expected one of {sorted(METRIC_FACTORIES)}")
+            metric = METRIC_FACTORIES[name](self.llm_wrapper)
+            metric.init(self.run_config)
+            self._metrics[name] = metric
+            logger.info(f"✓ Metric '{name}' initialized")
+        return self._metrics[name]
+
+    async def _score_one(self, name: str, sample: Union[SingleTurnSample, MultiTurnSample], scores: MetricScores):
+        metric = self.get(name)
+        start = time.perf_counter()
+        with span(f"ragas.{name}", "ragas", track="ragas", metric=name):
+            if isinstance(sample, MultiTurnSample):
+                score = await metric.multi_turn_ascore(sample)
+            else:
+                score = await metric.single_turn_ascore(sample)
+        scores.latency_s[name] = time.perf_counter() - start
+        scores.scores[name] = float(score)
+
+    def _store_key(self, name: str) -> str:
+        embedding_model = self.embedding_model if name in EMBEDDING_METRICS else ""
+        return store_key(name, self.judge_model, self.judge_host, embedding_model)
+
+    def _judge_requests(self) -> int:
+        return self.scheduler.stats.requests if self.scheduler else 0
+
+    async def ascore_all(self, sample, metrics: Iterable[str]) -> MetricScores:
+        names = list(dict.fromkeys(metrics))
+        scores = MetricScores()
+        start = time.perf_counter()
+
+        pending = []
+        for name in names:
+            cached = self.store.lookup(self._store_key(name), sample) if self.store else None
+            if cached is None:
+                pending.append(name)
+            else:
+                scores.scores[name] = cached
+                scores.cached.append(name)
+
+        requests_before = self._judge_requests()
+        await asyncio.gather(*(self._score_one(name, sample, scores) for name in pending))
+        scores.elapsed_s = time.perf_counter() - start
+
+        if self.store and pending:
+            # Judge calls can't be attributed per metric when they run concurrently
+            calls_each = round((self._judge_requests() - requests_before) / len(pending))
+            for name in pending:
+                if math.isnan(scores.scores[name]):
+                    continue  # Failed judge parses are retried next run, not cached
+                self.store.save(self._store_key(name), sample, scores.scores[name], judge_calls=calls_each)
+        return scores
+
+    def score_all(self, sample, metrics: Iterable[str] = ("faithfulness", "relevancy")) -> MetricScores:
+        """Score a sample with every requested metric concurrently"""
+        metrics = list(metrics)
+        with span("ragas.score_all", "ragas", metrics=",".join(metrics)) as attributes:
+            scores = run_sync(self.ascore_all(sample, metrics))
+            attributes["cached"] = ",".join(scores.cached)
+        logger.info(
+            f"Scored {', '.join(f'{k}={v:.3f}' for k, v in scores.scores.items())} "
+            f"in {scores.elapsed_s:.1f}s (sum of metrics {sum(scores.latency_s.values()):.1f}s"
+            + (f", cached: {', '.join(scores.cached)})" if scores.cached else ")")
+        )
+        return scores
+
+    def score(self, sample, metric: str) -> float:
+        """Score a sample with a single metric"""
+        return self.score_all(sample, metrics=[metric])[metric]
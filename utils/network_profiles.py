@@ -0,0 +1,118 @@
+"""
+Request-blocking profiles for browser contexts.
+
+Functional AI tests don't need the site's images, fonts, media or analytics,
+so their contexts abort those requests before they leave the browser:
+
+- "minimal": blocks the resource types and URL patterns of the profile
+- "full": blocks nothing (what a user's browser loads)
+
+Tests marked `ui` or `accessibility` always use "full", since layout and
+contrast depend on the real assets; any test can pick a profile with
+@pytest.mark.network_profile("full"). Other tests use `network_profile` from
+config.yaml.
+
+Each page reports its initial load time and the bytes it transferred to the
+run performance summary (utils.perf_summary), keyed by profile, e.g.
+`page.load.minimal` latency and `bytes.minimal` / `blocked.minimal` counts.
+"""
+
+import fnmatch
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Tuple
+
+from utils.logger import get_logger
+from utils.perf_summary import record_count, record_latency
+
+logger = get_logger(__name__)
+
+FULL_PROFILE_MARKERS = ("ui", "accessibility")
+
+DEFAULT_PROFILES = {
+    "minimal": {
+        "resource_types": ["image", "font", "media"],
+        "url_patterns": [
+            "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+            "*hotjar.com*", "*clarity.ms*", "*facebook.net*", "*segment.io*",
+        ],
+    },
+    "full": {},
+}
+
+
+@dataclass
+class NetworkProfile:
+    name: str
+    resource_types: Tuple[str, ...] = ()
+    url_patterns: Tuple[str, ...] = ()
+    stats: Dict[str, int] = field(default_factory=lambda: {"bytes": 0, "requests": 0, "blocked": 0})
+
+    @classmethod
+    def from_config(cls, config: dict, name: str) -> "NetworkProfile":
+        profiles = {**DEFAULT_PROFILES, **(config.get("network_profiles") or {})}
+        if name not in profiles:
+            raise ValueError(f"Unknown network profile {name!r}, expected one of {sorted(profiles)}")
+        profile = profiles[name] or {}
+        return cls(
+            name=name,
+            resource_types=tuple(profile.get("resource_types", ())),
+            url_patterns=tuple(profile.get("url_patterns", ())),
+        )
+
+    @classmethod
+    def for_node(cls, config: dict, node) -> "NetworkProfile":
+        marker = node.get_closest_marker("network_profile")
+        if marker is not None:
+            name = marker.args[0]
+        elif any(node.get_closest_marker(m) is not None for m in FULL_PROFILE_MARKERS):
+            name = "full"
+        else:
+            name = config.get("network_profile", "minimal")
+        return cls.from_config(config, name)
+
+    @property
+    def blocks_anything(self) -> bool:
+        return bool(self.resource_types or self.url_patterns)
+
+    def blocks(self, resource_type: str, url: str) -> bool:
+        return resource_type in self.resource_types or any(fnmatch.fnmatch(url, p) for p in self.url_patterns)
+
+    def _route(self, route):
+        request = route.request
+        if self.blocks(request.resource_type, request.url):
+            self.stats["blocked"] += 1
+            route.abort("blockedbyclient")
+        else:
+            route.fallback()  # Let later handlers (e.g. HAR replay) or the network answer
+
+    def apply(self, context):
+        """Install the blocking route on a new context"""
+        if self.blocks_anything:
+            context.route("**/*", self._route)
+
+    def _on_finished(self, request):
+        self.stats["requests"] += 1
+        try:
+            sizes = request.sizes()
+            self.stats["bytes"] += sizes["responseBodySize"] + sizes["responseHeadersSize"]
+        except Exception:
+            pass  # Sizes are unavailable for some cached/served-from-memory responses
+
+    def track(self, page):
+        page.on("requestfinished", self._on_finished)
+
+    def goto(self, page, url: str):
+        """Navigate and record the load time under this profile"""
+        start = time.perf_counter()
+        page.goto(url)
+        record_latency(f"page.load.{self.name}", time.perf_counter() - start)
+
+    def report(self):
+        """Record this test's transferred bytes and blocked requests"""
+        record_count(f"bytes.{self.name}", self.stats["bytes"])
+        record_count(f"blocked.{self.name}", self.stats["blocked"])
+        logger.info(
+            f"Network profile '{self.name}': {self.stats['requests']} requests, "
+            f"{self.stats['bytes'] / 1024:.0f} KB, {self.stats['blocked']} blocked"
+        )
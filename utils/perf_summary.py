@@ -0,0 +1,301 @@
+"""
+Run-level performance summary and baseline comparison.
+
+Each run writes reports/perf/summary_<run id>.json (and latest.json) with:
+
+- suite wall time and per-test durations (setup + call + teardown)
+- per-message latency samples and percentiles, recorded with
+  record_latency() (ChatPage.send_message records "chat.response")
+- counters such as judge calls, recorded with record_count()
+
+Samples recorded inside a test are attached to its report as
+user_properties, so they reach the controller under xdist too.
+
+The summary is compared with reports/perf/baseline.json: latency samples with
+a one-sided Mann–Whitney U test, the suite duration by ratio. A slowdown is a
+regression when it is significant (p < alpha) and exceeds the configured
+budget; with `perf.fail_on_regression` the run then fails. Update the
+baseline with --perf-update-baseline.
+
+Registered from conftest.py via `pytest_plugins`; configured by the `perf`
+section of config.yaml.
+"""
+
+import json
+import math
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from statistics import median
+from typing import Dict, List, Optional, Sequence
+
+import pytest
+import yaml
+
+from utils.logger import RUN_ID, get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_PERF_DIR = "reports/perf"
+PROPERTY_PREFIX = "perf."
+PERCENTILES = (50, 90, 95, 99)
+MIN_SAMPLES = 5                 # Fewer samples on either side: no significance test
+
+_samples: Dict[str, list] = {}
+_counts: Dict[str, int] = {}
+_lock = threading.Lock()
+
+
+def record_latency(name: str, seconds: float):
+    """Record one latency sample for the running test"""
+    with _lock:
+        _samples.setdefault(name, []).append(round(seconds, 4))
+
+
+def record_count(name: str, amount: int = 1):
+    """Add to a per-test counter (e.g. judge calls)"""
+    with _lock:
+        _counts[name] = _counts.get(name, 0) + amount
+
+
+def _drain() -> list:
+    with _lock:
+        properties = [(f"{PROPERTY_PREFIX}latency.{k}", v) for k, v in _samples.items()]
+        properties += [(f"{PROPERTY_PREFIX}count.{k}", v) for k, v in _counts.items()]
+        _samples.clear()
+        _counts.clear()
+    return properties
+
+
+# ---------------------------------------------------------------------------
+# Statistics
+# ---------------------------------------------------------------------------
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Linear-interpolated percentile of values"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * pct / 100
+    low = math.floor(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def mann_whitney_greater(current: Sequence[float], baseline: Sequence[float]) -> float:
+    """
+    One-sided Mann–Whitney U p-value for "current tends to be larger than baseline".
+
+    Normal approximation with tie correction and continuity correction.
+    """
+    n1, n2 = len(current), len(baseline)
+    combined = sorted([(v, 0) for v in current] + [(v, 1) for v in baseline])
+    n = n1 + n2
+    rank_sum, tie_term, i = 0.0, 0.0, 0
+    while i < n:
+        j = i
+        while j + 1 < n and combined[j + 1][0] == combined[i][0]:
+            j += 1
+        average_rank = (i + j + 2) / 2
+        rank_sum += average_rank * sum(1 for k in range(i, j + 1) if combined[k][1] == 0)
+        ties = j - i + 1
+        tie_term += ties ** 3 - ties
+        i = j + 1
+
+    u = rank_sum - n1 * (n1 + 1) / 2
+    mean = n1 * n2 / 2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (u - mean - 0.5) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+@dataclass
+class PerfBudget:
+    alpha: float = 0.05
+    max_latency_regression_pct: float = 20.0
+    max_suite_regression_pct: float = 25.0
+    fail_on_regression: bool = False
+
+    @classmethod
+    def from_config(cls, section: dict) -> "PerfBudget":
+        section = section or {}
+        return cls(**{k: type(getattr(cls, k))(section[k]) for k in cls.__dataclass_fields__ if k in section})
+
+
+def compare(summary: dict, baseline: dict, budget: PerfBudget) -> List[dict]:
+    """Findings of summary against baseline; `regression` marks those over budget"""
+    findings = []
+    for name, current in summary["latency"].items():
+        previous = baseline.get("latency", {}).get(name)
+        if not previous:
+            continue
+        x, y = current["samples"], previous["samples"]
+        if len(x) < MIN_SAMPLES or len(y) < MIN_SAMPLES:
+            continue
+        p_value = mann_whitney_greater(x, y)
+        change = (median(x) / median(y) - 1) * 100 if median(y) else 0.0
+        findings.append({
+            "metric": f"latency.{name}", "baseline": median(y), "current": median(x),
+            "change_pct": change, "p_value": p_value,
+            "regression": p_value < budget.alpha and change > budget.max_latency_regression_pct,
+        })
+
+    previous_suite = baseline.get("suite_duration_s")
+    if previous_suite:
+        change = (summary["suite_duration_s"] / previous_suite - 1) * 100
+        findings.append({
+            "metric": "suite_duration_s", "baseline": previous_suite, "current": summary["suite_duration_s"],
+            "change_pct": change, "p_value": None,
+            "regression": change > budget.max_suite_regression_pct,
+        })
+    return findings
+
+
+# ---------------------------------------------------------------------------
+# pytest plugin
+# ---------------------------------------------------------------------------
+
+class PerfSummaryPlugin:
+    """Collects test reports on the controller and writes the run summary"""
+
+    def __init__(self, config, settings: dict):
+        self.config = config
+        self.directory = Path(settings.get("dir") or DEFAULT_PERF_DIR)
+        self.baseline_file = Path(settings.get("baseline") or self.directory / "baseline.json")
+        self.budget = PerfBudget.from_config(settings)
+        self.tests: Dict[str, dict] = {}
+        self.latency: Dict[str, list] = {}
+        self.counts: Dict[str, int] = {}
+        self.findings: List[dict] = []
+        self.started = time.time()
+        self.result: Optional[dict] = None
+
+    def pytest_runtest_logreport(self, report):
+        test = self.tests.setdefault(report.nodeid, {"duration_s": 0.0, "outcome": "passed", "counts": {}})
+        test["duration_s"] += report.duration
+        if report.failed or (report.skipped and report.when == "setup"):
+            test["outcome"] = report.outcome
+        if report.when != "teardown":
+            return  # user_properties accumulate; the teardown report carries them all
+        for name, value in report.user_properties:
+            if name.startswith(f"{PROPERTY_PREFIX}latency."):
+                self.latency.setdefault(name[len(PROPERTY_PREFIX) + 8:], []).extend(value)
+            elif name.startswith(f"{PROPERTY_PREFIX}count."):
+                key = name[len(PROPERTY_PREFIX) + 6:]
+                test["counts"][key] = test["counts"].get(key, 0) + value
+                self.counts[key] = self.counts.get(key, 0) + value
+
+    def summary(self) -> dict:
+        return {
+            "run_id": RUN_ID,
+            "started": self.started,
+            "suite_duration_s": time.time() - self.started,
+            "tests": self.tests,
+            "counts": self.counts,
+            "latency": {
+                name: {
+                    "count": len(samples),
+                    **{f"p{p}": percentile(samples, p) for p in PERCENTILES},
+                    "max": max(samples),
+                    "samples": samples,
+                }
+                for name, samples in sorted(self.latency.items()) if samples
+            },
+        }
+
+    @staticmethod
+    def _write(path: Path, data: dict):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(data, indent=1), encoding="utf-8")
+        tmp_path.replace(path)
+
+    def _load_baseline(self) -> Optional[dict]:
+        try:
+            return json.loads(self.baseline_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_sessionfinish(self, session):
+        if not self.tests:
+            return
+        summary = self.result = self.summary()
+        self._write(self.directory / f"summary_{RUN_ID}.json", summary)
+        self._write(self.directory / "latest.json", summary)
+
+        baseline = self._load_baseline()
+        if baseline:
+            self.findings = compare(summary, baseline, self.budget)
+        if self.config.getoption("perf_update_baseline"):
+            self._write(self.baseline_file, summary)
+            logger.info(f"Performance baseline updated: {self.baseline_file}")
+        elif self.budget.fail_on_regression and any(f["regression"] for f in self.findings):
+            session.exitstatus = pytest.ExitCode.TESTS_FAILED
+        self._add_allure_environment(summary)
+
+    def _add_allure_environment(self, summary: dict):
+        allure_results_dir = self.config.getoption("--alluredir", default=None)
+        if not allure_results_dir:
+            return
+        lines = [f"Perf_Suite_Duration_s={summary['suite_duration_s']:.1f}"]
+        lines += [f"Perf_{name}_p95_s={stats['p95']:.2f}" for name, stats in summary["latency"].items()]
+        lines += [f"Perf_{name}={value}" for name, value in sorted(summary["counts"].items())]
+        lines.append(f"Perf_Regressions={sum(f['regression'] for f in self.findings)}")
+        env_file = Path(allure_results_dir) / "environment.properties"
+        env_file.parent.mkdir(parents=True, exist_ok=True)
+        with env_file.open("a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def pytest_terminal_summary(self, terminalreporter):
+        if not self.tests:
+            return
+        summary = self.result or self.summary()
+        terminalreporter.write_sep("-", "performance summary")
+        terminalreporter.write_line(
+            f"Suite {summary['suite_duration_s']:.1f}s, {len(self.tests)} tests, "
+            + ", ".join(f"{k}={v}" for k, v in sorted(self.counts.items()))
+        )
+        for name, stats in summary["latency"].items():
+            terminalreporter.write_line(
+                f"{name}: n={stats['count']} p50={stats['p50']:.2f}s p95={stats['p95']:.2f}s max={stats['max']:.2f}s"
+            )
+        for finding in self.findings:
+            p_value = f", p={finding['p_value']:.3f}" if finding["p_value"] is not None else ""
+            terminalreporter.write_line(
+                f"{'REGRESSION ' if finding['regression'] else ''}{finding['metric']}: "
+                f"{finding['baseline']:.2f} -> {finding['current']:.2f} ({finding['change_pct']:+.0f}%{p_value})",
+                red=finding["regression"],
+            )
+
+
+@pytest.hookimpl(tryfirst=True, hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    # Attach this phase's samples before the report copies item.user_properties
+    item.user_properties.extend(_drain())
+    yield
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("performance summary")
+    group.addoption(
+        "--perf-update-baseline",
+        action="store_true",
+        default=False,
+        help="Store this run's performance summary as the new baseline",
+    )
+
+
+def pytest_configure(config):
+    # Workers forward their reports; the controller summarises the whole run
+    if hasattr(config, "workerinput"):
+        return
+    try:
+        with open(Path(config.rootpath) / "config" / "config.yaml", encoding="utf-8") as f:
+            settings = (yaml.safe_load(f) or {}).get("perf") or {}
+    except OSError:
+        settings = {}
+    config.pluginmanager.register(PerfSummaryPlugin(config, settings), "perf_summary_plugin")
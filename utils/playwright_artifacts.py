@@ -0,0 +1,174 @@
+"""
+Playwright video and trace capture with a retain-on-failure mode.
+
+Modes (config.yaml `video_mode` / `trace_mode`):
+
+- "off": nothing is captured
+- "on": every test keeps its video / trace
+- "retain-on-failure": every test records, but the artifacts are only kept
+  when the test failed; passing tests' recordings are discarded as soon as
+  their context closes
+
+Videos are recorded into a scratch directory at `video_size` and moved to
+`video_dir` when kept. Traces stay in the browser's memory until the context
+ends and are written only when kept. Kept artifacts, in either mode, count
+against `max_retained_mb` per run; beyond it they are discarded with a warning. Kept
+traces and videos are attached to the Allure report.
+
+The old `enable_video_recording: true` still works and means
+video_mode "on".
+"""
+
+import re
+import shutil
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional
+
+import allure
+from allure_commons.types import AttachmentType
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+MODES = ("off", "on", "retain-on-failure")
+UNSAFE_CHARS = re.compile(r"[^\w.\-]+")
+
+
+@dataclass
+class CaptureSettings:
+    video_mode: str = "off"
+    trace_mode: str = "off"
+    video_dir: Path = Path("videos")
+    trace_dir: Path = Path("reports/traces/playwright")
+    video_size: Optional[dict] = None
+    max_retained_mb: float = 500.0
+
+    @classmethod
+    def from_config(cls, config: dict) -> "CaptureSettings":
+        video_mode = config.get("video_mode") or ("on" if config.get("enable_video_recording") else "off")
+        trace_mode = config.get("trace_mode", "off")
+        for key, mode in (("video_mode", video_mode), ("trace_mode", trace_mode)):
+            if mode not in MODES:
+                raise ValueError(f"{key} must be one of {MODES}, got {mode!r}")
+        return cls(
+            video_mode=video_mode,
+            trace_mode=trace_mode,
+            video_dir=Path(config.get("video_dir", cls.video_dir)),
+            trace_dir=Path(config.get("playwright_trace_dir", cls.trace_dir)),
+            video_size=config.get("video_size"),
+            max_retained_mb=float(config.get("max_retained_mb", cls.max_retained_mb)),
+        )
+
+
+class RetainedArtifacts:
+    """Starts video/trace capture per context and keeps what the test outcome calls for"""
+
+    def __init__(self, settings: CaptureSettings):
+        self.settings = settings
+        self.max_retained_bytes = int(settings.max_retained_mb * 1024 * 1024)
+        self.retained_bytes = 0
+        self.kept = 0
+        self.discarded = 0
+        # Per process, so xdist workers never clean up each other's recordings
+        self.scratch_dir = settings.video_dir / ".recording" / uuid.uuid4().hex[:8]
+
+    def context_options(self) -> dict:
+        """Extra browser.new_context() options for video capture"""
+        if self.settings.video_mode == "off":
+            return {}
+        options = {"record_video_dir": str(self.scratch_dir if self._retain_only(self.settings.video_mode)
+                                           else self.settings.video_dir)}
+        if self.settings.video_size:
+            options["record_video_size"] = self.settings.video_size
+        return options
+
+    @staticmethod
+    def _retain_only(mode: str) -> bool:
+        return mode == "retain-on-failure"
+
+    def start(self, context):
+        if self.settings.trace_mode != "off":
+            context.tracing.start(screenshots=True, snapshots=True, sources=False)
+
+    def _keep(self, mode: str, failed: bool) -> bool:
+        return mode == "on" or (self._retain_only(mode) and failed)
+
+    def _within_budget(self, path: Path) -> bool:
+        size = path.stat().st_size
+        if self.retained_bytes + size > self.max_retained_bytes:
+            logger.warning(f"Discarding {path.name}: {self.settings.max_retained_mb:g} MB retained-artifact limit reached")
+            return False
+        self.retained_bytes += size
+        return True
+
+    def finish(self, context, name: str, failed: bool):
+        """Stop capture, close the context and keep or discard its artifacts"""
+        name = UNSAFE_CHARS.sub("_", name)
+        videos = [page.video for page in context.pages if page.video]
+
+        trace_path = None
+        if self.settings.trace_mode != "off":
+            try:
+                if self._keep(self.settings.trace_mode, failed):
+                    trace_path = self.settings.trace_dir / f"{name}.zip"
+                    trace_path.parent.mkdir(parents=True, exist_ok=True)
+                    context.tracing.stop(path=str(trace_path))
+                else:
+                    context.tracing.stop()
+            except Exception as e:
+                logger.warning(f"Could not stop Playwright tracing: {e}")
+                trace_path = None
+
+        context.close()
+
+        if trace_path is not None and trace_path.exists():
+            if self._within_budget(trace_path):
+                self.kept += 1
+                allure.attach.file(str(trace_path), name=f"trace_{name}", extension="zip")
+            else:
+                trace_path.unlink()
+                self.discarded += 1
+
+        if videos:
+            self._finish_videos(videos, name, failed)
+
+    def _finish_videos(self, videos: List, name: str, failed: bool):
+        mode = self.settings.video_mode
+        for index, video in enumerate(videos):
+            try:
+                source = Path(video.path())
+            except Exception as e:
+                logger.warning(f"Video for {name} unavailable: {e}")
+                continue
+            if not source.exists():
+                continue
+            if not self._keep(mode, failed) or not self._within_budget(source):
+                source.unlink()
+                self.discarded += 1
+                continue
+            if mode == "on":
+                # Already recorded into video_dir
+                self.kept += 1
+                allure.attach.file(str(source), name=f"video_{name}", attachment_type=AttachmentType.WEBM)
+                continue
+            suffix = f"_{index}" if index else ""
+            target = self.settings.video_dir / f"{name}{suffix}.webm"
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.move(str(source), target)
+            self.kept += 1
+            allure.attach.file(str(target), name=f"video_{name}{suffix}", attachment_type=AttachmentType.WEBM)
+
+    def close(self):
+        shutil.rmtree(self.scratch_dir, ignore_errors=True)
+        try:
+            self.scratch_dir.parent.rmdir()  # Only succeeds once every worker has finished
+        except OSError:
+            pass
+        if self.kept or self.discarded:
+            logger.info(
+                f"Playwright artifacts: {self.kept} kept ({self.retained_bytes / 1_048_576:.1f} MB), "
+                f"{self.discarded} discarded"
+            )
@@ -0,0 +1,181 @@
+"""
+Single-pass structural analysis of AI responses.
+
+`analyze(text)` walks the response once and records everything the
+formatting, helpfulness and multilingual checks need: token and sentence
+counts, list structure, URLs, per-script letter counts and the trailing
+character. The result is cached per response text, so every assertion on
+the same answer reuses one analysis.
+
+Tokens are script-aware: a token is a run of letters/digits, Arabic
+diacritics and tatweel stay inside their word, and a switch between Arabic
+and Latin script starts a new token ("الـICP" is two tokens). Punctuation
+never counts as a token, so list bullets and "1." markers don't inflate the
+count the way `text.split()` did.
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Tuple
+
+SENTENCE_TERMINATORS = frozenset(".?!؟。")
+TERMINAL_PUNCTUATION = frozenset(".?!:؟。")
+BULLETS = frozenset("-•*–")
+URL_PREFIXES = ("http://", "https://")
+URL_TRAILING = ".,;:!?)]}>'\"،؛؟"
+
+
+def _script(ch: str) -> str:
+    """Classify a character as arabic, latin, other (letters), digit, mark or '' (not a word char)"""
+    code = ord(ch)
+    if 0x0660 <= code <= 0x0669 or 0x06F0 <= code <= 0x06F9 or ch.isdigit():
+        return "digit"
+    if (0x0600 <= code <= 0x06FF or 0x0750 <= code <= 0x077F or 0x08A0 <= code <= 0x08FF
+            or 0xFB50 <= code <= 0xFDFF or 0xFE70 <= code <= 0xFEFF):
+        if code == 0x0640 or 0x064B <= code <= 0x065F or code == 0x0670:
+            return "mark"  # tatweel and diacritics
+        return "arabic" if ch.isalpha() else ""
+    if ch.isalpha():
+        return "latin" if code < 0x0250 or 0x1E00 <= code <= 0x1EFF else "other"
+    return ""
+
+
+def _list_marker(line: str) -> str:
+    """Return 'bullet', 'numbered', 'lettered' or '' for the start of a line"""
+    if not line:
+        return ""
+    if line[0] in BULLETS and (len(line) == 1 or line[1] == " "):
+        return "bullet"
+    end = 0
+    while end < len(line) and _script(line[end]) == "digit":
+        end += 1
+    if 0 < end < len(line) and line[end] in ".)":
+        return "numbered"
+    if len(line) > 2 and line[0].isalpha() and line[1] == ")" and line[2] == " ":
+        return "lettered"
+    return ""
+
+
+@dataclass(frozen=True)
+class ResponseAnalysis:
+    """Structure of one response; build it with analyze()"""
+    token_count: int
+    sentence_count: int
+    line_count: int
+    list_items: int
+    numbered_items: int
+    unterminated_lines: int
+    urls: Tuple[str, ...]
+    arabic_letters: int
+    latin_letters: int
+    other_letters: int
+    digits: int
+    last_char: str
+
+    @property
+    def letters(self) -> int:
+        return self.arabic_letters + self.latin_letters + self.other_letters
+
+    @property
+    def arabic_ratio(self) -> float:
+        return self.arabic_letters / self.letters if self.letters else 0.0
+
+    @property
+    def latin_ratio(self) -> float:
+        return self.latin_letters / self.letters if self.letters else 0.0
+
+    @property
+    def has_arabic(self) -> bool:
+        return self.arabic_letters > 0
+
+    @property
+    def has_list(self) -> bool:
+        return self.list_items > 0
+
+    @property
+    def ends_with_punctuation(self) -> bool:
+        return self.last_char in TERMINAL_PUNCTUATION
+
+    def summary(self) -> str:
+        return (f"{self.token_count} tokens, {self.sentence_count} sentences, "
+                f"{self.list_items} list items, {len(self.urls)} URLs, "
+                f"{self.arabic_ratio:.0%} Arabic / {self.latin_ratio:.0%} Latin letters")
+
+
+@lru_cache(maxsize=256)
+def analyze(text: str) -> ResponseAnalysis:
+    """Analyse a response in one pass over its characters"""
+    text = text or ""
+    counts = {"arabic": 0, "latin": 0, "other": 0, "digit": 0}
+    tokens = 0
+    sentences = 0
+    urls = []
+    lines = list_items = numbered_items = unterminated = 0
+
+    word_script = ""        # script of the token being read, "" between tokens
+    sentence_has_word = False
+    chunk_start = 0         # start of the current whitespace-delimited chunk
+    line_start = 0
+    last_char = ""
+
+    for index, ch in enumerate(text + "\n"):
+        script = _script(ch)
+        if script == "mark":
+            pass  # stays inside the current word, not counted as a letter
+        elif script:
+            counts[script] += 1
+            group = "arabic" if script == "arabic" else "latin"
+            if word_script != group:
+                if not (script == "digit" and word_script):  # digits continue any word
+                    tokens += 1
+                    word_script = group
+            sentence_has_word = sentence_has_word or script != "digit"
+        elif ch in "'’" and word_script and index + 1 < len(text) and _script(text[index + 1]):
+            pass  # apostrophe inside a word ("don't")
+        else:
+            word_script = ""
+
+        if ch in SENTENCE_TERMINATORS:
+            # A "." between digits is a decimal or list number, not a sentence end
+            decimal = ch == "." and index + 1 < len(text) and text[index + 1].isdigit()
+            if sentence_has_word and not decimal:
+                sentences += 1
+                sentence_has_word = False
+
+        if ch.isspace():
+            chunk = text[chunk_start:index].lstrip("(<[\"'")
+            if chunk.startswith(URL_PREFIXES):
+                urls.append(chunk.rstrip(URL_TRAILING))
+            chunk_start = index + 1
+
+            if ch == "\n":
+                line = text[line_start:index].strip()
+                if line:
+                    lines += 1
+                    marker = _list_marker(line)
+                    if marker:
+                        list_items += 1
+                        numbered_items += marker == "numbered"
+                    elif len(line) > 10 and last_char not in TERMINAL_PUNCTUATION:
+                        unterminated += 1
+                line_start = index + 1
+        else:
+            last_char = ch
+
+    if sentence_has_word:
+        sentences += 1  # trailing sentence without a terminator
+
+    return ResponseAnalysis(
+        token_count=tokens,
+        sentence_count=sentences,
+        line_count=lines,
+        list_items=list_items,
+        numbered_items=numbered_items,
+        unterminated_lines=unterminated,
+        urls=tuple(urls),
+        arabic_letters=counts["arabic"],
+        latin_letters=counts["latin"],
+        other_letters=counts["other"],
+        digits=counts["digit"],
+        last_char=last_char,
+    )
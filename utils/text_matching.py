@@ -0,0 +1,201 @@
+"""
+Compiled multi-pattern matching for keyword checks on AI responses.
+
+All keyword lists of a test case (must_include, must_include_any,
+must_not_include_any, step/list markers, ...) are compiled once into a single
+Aho-Corasick automaton. A response is scanned in one pass and every group is
+answered from the same match set, with positions reported in the original
+text.
+
+Matching is Unicode-aware: text and patterns are NFKC-normalised and
+case-folded, and Arabic is normalised (diacritics and tatweel removed, alef /
+alef maqsura / taa marbuta variants unified, Arabic-Indic digits mapped to
+ASCII) so spelling variants of the same word still match. NFKC is applied to
+whole composing sequences (a base letter and the marks that attach to it),
+so decomposed input such as alef + combining hamza is recomposed exactly as
+normalising the whole string would, while match positions still point into
+the original text.
+"""
+
+import unicodedata
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+# Arabic letter variants folded onto one canonical form
+ARABIC_FOLD = {
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",
+    "ى": "ي",
+    "ة": "ه",
+}
+ARABIC_FOLD.update({chr(0x0660 + d): str(d) for d in range(10)})  # ٠-٩
+ARABIC_FOLD.update({chr(0x06F0 + d): str(d) for d in range(10)})  # ۰-۹ (Persian)
+
+TATWEEL = "ـ"
+
+
+def _is_arabic_mark(ch: str) -> bool:
+    code = ord(ch)
+    return 0x064B <= code <= 0x065F or code == 0x0670 or 0x06D6 <= code <= 0x06ED
+
+
+def _composes(previous: str, ch: str) -> bool:
+    """True when NFKC may combine ch with the character before it"""
+    if ch.isascii():
+        return False
+    if unicodedata.combining(ch):
+        return True
+    # Starters that compose too (Hangul vowel/final jamo, some Indic vowel signs)
+    return unicodedata.normalize("NFKC", previous + ch) != (
+        unicodedata.normalize("NFKC", previous) + unicodedata.normalize("NFKC", ch)
+    )
+
+
+def _segments(text: str) -> Iterator[Tuple[int, int]]:
+    """Split text into spans that NFKC never composes across"""
+    if unicodedata.is_normalized("NFKC", text):
+        # Already normalised: nothing left to compose, every character stands alone
+        yield from ((index, index + 1) for index in range(len(text)))
+        return
+    start = 0
+    for index in range(1, len(text)):
+        if not _composes(text[index - 1], text[index]):
+            yield start, index
+            start = index
+    if text:
+        yield start, len(text)
+
+
+def normalize(text: str) -> Tuple[str, List[Tuple[int, int]]]:
+    """Normalise text for matching; returns the text and each char's (start, end) span in the original"""
+    out = []
+    spans = []
+    for start, end in _segments(text):
+        segment = text[start:end]
+        if segment.isascii():
+            folded = segment.lower()
+        else:
+            folded = unicodedata.normalize("NFKC", segment).casefold()
+        for c in folded:
+            if c == TATWEEL or _is_arabic_mark(c):
+                continue
+            out.append(ARABIC_FOLD.get(c, c))
+            spans.append((start, end))
+    return "".join(out), spans
+
+
+def normalize_text(text: str) -> str:
+    return normalize(text)[0]
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over a fixed set of patterns"""
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns = list(dict.fromkeys(p for p in patterns if p))
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        self._lengths = []
+
+        for index, pattern in enumerate(self.patterns):
+            key = normalize_text(pattern)
+            self._lengths.append(len(key))
+            if not key:
+                continue
+            state = 0
+            for ch in key:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append(index)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def scan(self, text: str) -> Dict[str, List[Tuple[int, int]]]:
+        """Return {pattern: [(start, end), ...]} for every pattern found in text"""
+        normalized, spans = normalize(text or "")
+        goto, fail, out, lengths = self._goto, self._fail, self._out, self._lengths
+        found = {}
+        state = 0
+        for position, ch in enumerate(normalized):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for index in out[state]:
+                start = position - lengths[index] + 1
+                found.setdefault(self.patterns[index], []).append((spans[start][0], spans[position][1]))
+        return found
+
+
+# Structure markers per response language
+STEP_MARKERS = {
+    "en": ["1.", "2.", "first", "then", "next", "step", "finally"],
+    "ar": ["1.", "2.", "أولاً", "ثانياً", "أولا", "ثانيا", "الخطوة"],
+}
+LIST_MARKERS = {
+    "en": ["1.", "2.", "-", "•", "*", "a)", "b)"],
+    "ar": ["1.", "2.", "-", "•", "*", "أ)", "ب)", "١.", "٢."],
+}
+
+CASE_GROUPS = (
+    "must_include",
+    "must_include_any",
+    "must_not_include_any",
+    "must_contain_any",
+    "banned_html_fragments",
+)
+
+
+class CaseMatch:
+    """Result of scanning one response with a CaseMatcher"""
+
+    def __init__(self, groups: Dict[str, List[str]], positions: Dict[str, List[Tuple[int, int]]]):
+        self.groups = groups
+        self.positions = positions
+
+    def found(self, group: str) -> List[str]:
+        return [p for p in self.groups.get(group, []) if p in self.positions]
+
+    def missing(self, group: str) -> List[str]:
+        return [p for p in self.groups.get(group, []) if p not in self.positions]
+
+    def any(self, group: str) -> bool:
+        return any(p in self.positions for p in self.groups.get(group, []))
+
+
+class CaseMatcher:
+    """All keyword groups of one test case compiled into a single automaton"""
+
+    def __init__(self, case, language: str):
+        self.groups = {group: list(case.get(group) or []) for group in CASE_GROUPS}
+        self.groups["step_markers"] = STEP_MARKERS.get(language, STEP_MARKERS["en"])
+        self.groups["list_markers"] = LIST_MARKERS.get(language, LIST_MARKERS["en"])
+        self.matcher = KeywordMatcher(p for patterns in self.groups.values() for p in patterns)
+
+    def scan(self, text: str) -> CaseMatch:
+        return CaseMatch(self.groups, self.matcher.scan(text))
+
+
+_compiled = {}
+
+
+def match_case(case, language: str) -> CaseMatcher:
+    """Return the compiled matcher for a case, building it on first use"""
+    key = (case["id"], language)
+    if key not in _compiled:
+        _compiled[key] = CaseMatcher(case, language)
+    return _compiled[key]
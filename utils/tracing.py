@@ -0,0 +1,279 @@
+"""
+Span tracing for test runs.
+
+Fixtures, ChatPage methods, RAGAS scoring and judge requests open named
+spans; every test gets a root span with setup / call / teardown phases
+beneath it, so a test's wall clock can be attributed to browser launch,
+login, typing, waiting for the backend, citations or the judge.
+
+    with span("chat.open_citations", count=3):
+        ...
+
+    @traced("chat.send_message")
+    def send_message(self, text): ...
+
+At session end the spans are written as Chrome trace-event JSON to
+reports/traces/trace_<run id>.json (open it in chrome://tracing or
+https://ui.perfetto.dev). With `tracing.otlp_endpoint` set and the
+opentelemetry SDK + OTLP exporter installed, the same spans are also sent to
+an OpenTelemetry collector.
+
+Spans that run concurrently on one thread (RAGAS metrics under
+asyncio.gather, judge requests) are recorded as async events on their own
+track so they don't overlap in the viewer.
+
+Registered from conftest.py via `pytest_plugins`; configured by the
+`tracing` section of config.yaml, disabled with --no-trace.
+"""
+
+import contextvars
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pytest
+import yaml
+
+from utils.artifact_paths import artifact_path, is_controller, worker_parts
+from utils.logger import RUN_ID, get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_TRACE_DIR = "reports/traces"
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """Collects spans as Chrome trace events"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.pid = os.getpid()
+        self.process_name = os.environ.get("PYTEST_XDIST_WORKER", "main")
+        self.events: List[dict] = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._origin_ns = time.perf_counter_ns()
+        self._epoch_ns = time.time_ns()
+
+    def _us(self, perf_ns: int) -> float:
+        # Wall-clock based, so traces of different xdist workers line up when merged
+        return (self._epoch_ns + perf_ns - self._origin_ns) / 1000
+
+    @staticmethod
+    def epoch_ns(ts_us: float) -> int:
+        """Wall-clock nanoseconds of a trace timestamp (for OTLP export)"""
+        return int(ts_us * 1000)
+
+    @contextmanager
+    def span(self, name: str, category: str = "test", track: Optional[str] = None, **attributes):
+        """
+        Time the enclosed block as a span named `name`.
+
+        `track` puts the span on a named async track, for work that overlaps
+        other spans on the same thread.
+        """
+        if not self.enabled:
+            yield attributes
+            return
+        span_id = next(self._ids)
+        parent = _current_span.get()
+        token = _current_span.set(span_id)
+        start = time.perf_counter_ns()
+        try:
+            yield attributes
+        except BaseException as error:
+            attributes["error"] = type(error).__name__
+            raise
+        finally:
+            end = time.perf_counter_ns()
+            _current_span.reset(token)
+            args = {"span_id": span_id, "parent_id": parent, **attributes}
+            self._record(name, category, track, start, end, args)
+
+    def _record(self, name: str, category: str, track: Optional[str], start: int, end: int, args: dict):
+        ts, dur = self._us(start), (end - start) / 1000
+        base = {"name": name, "cat": category, "pid": self.pid, "tid": threading.get_ident()}
+        if track is None:
+            events = [{**base, "ph": "X", "ts": ts, "dur": dur, "args": args}]
+        else:
+            async_id = f"{track}-{args['span_id']}"
+            events = [
+                {**base, "cat": track, "ph": "b", "id": async_id, "ts": ts, "args": args},
+                {**base, "cat": track, "ph": "e", "id": async_id, "ts": ts + dur},
+            ]
+        with self._lock:
+            self.events.extend(events)
+
+    def trace_events(self) -> List[dict]:
+        with self._lock:
+            events = list(self.events)
+        threads = {e["tid"] for e in events}
+        metadata = [{"name": "process_name", "ph": "M", "pid": self.pid, "args": {"name": self.process_name}}]
+        metadata += [
+            {"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid,
+             "args": {"name": "main" if tid == threading.main_thread().ident else f"thread-{tid}"}}
+            for tid in sorted(threads)
+        ]
+        return metadata + sorted(events, key=lambda e: e["ts"])
+
+    def write_chrome_trace(self, path: Path) -> Path:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(
+            json.dumps({"traceEvents": self.trace_events(), "displayTimeUnit": "ms"}, ensure_ascii=False),
+            encoding="utf-8",
+        )
+        tmp_path.replace(path)
+        return path
+
+    def export_otlp(self, endpoint: str, service_name: str = "uask-tests"):
+        """Replay the recorded spans to an OTLP/HTTP collector"""
+        try:
+            from opentelemetry import trace
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+            from opentelemetry.sdk.resources import Resource
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        except ImportError:
+            logger.warning("tracing.otlp_endpoint is set but opentelemetry-sdk/exporter is not installed")
+            return
+
+        provider = TracerProvider(resource=Resource.create({
+            "service.name": service_name, "process.pid": self.pid, "pytest.worker": self.process_name,
+        }))
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=endpoint)))
+        otel_tracer = provider.get_tracer(__name__)
+
+        ends = {e["id"]: e["ts"] for e in self.events if e["ph"] == "e"}
+        spans: Dict[int, object] = {}
+        for event in sorted((e for e in self.events if e["ph"] in ("X", "b")), key=lambda e: e["ts"]):
+            args = dict(event["args"])
+            span_id, parent_id = args.pop("span_id"), args.pop("parent_id")
+            end_ts = event["ts"] + event["dur"] if event["ph"] == "X" else ends.get(event["id"], event["ts"])
+            parent = spans.get(parent_id)
+            otel_span = otel_tracer.start_span(
+                event["name"],
+                context=trace.set_span_in_context(parent) if parent is not None else None,
+                start_time=self.epoch_ns(event["ts"]),
+                attributes={k: v if isinstance(v, (str, bool, int, float)) else str(v)
+                            for k, v in args.items() if v is not None},
+            )
+            otel_span.end(end_time=self.epoch_ns(end_ts))
+            spans[span_id] = otel_span
+        provider.shutdown()
+        logger.info(f"Exported {len(spans)} spans to {endpoint}")
+
+
+_tracer = Tracer(enabled=False)
+
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+
+def span(name: str, category: str = "test", track: Optional[str] = None, **attributes):
+    """Span on the session tracer (a no-op while tracing is disabled)"""
+    return _tracer.span(name, category, track, **attributes)
+
+
+def traced(name: str = None, category: str = "page"):
+    """Decorator: run the function inside a span (default name: Class.method)"""
+
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _tracer.span(span_name, category):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+# ---------------------------------------------------------------------------
+# pytest plugin
+# ---------------------------------------------------------------------------
+
+def pytest_addoption(parser):
+    group = parser.getgroup("tracing")
+    group.addoption(
+        "--no-trace",
+        action="store_true",
+        default=False,
+        help="Disable span tracing (overrides tracing.enabled in config.yaml)",
+    )
+
+
+def pytest_configure(config):
+    global _tracer
+    try:
+        with open(Path(config.rootpath) / "config" / "config.yaml", encoding="utf-8") as f:
+            settings = (yaml.safe_load(f) or {}).get("tracing") or {}
+    except OSError:
+        settings = {}
+    enabled = settings.get("enabled", True) and not config.getoption("no_trace")
+    _tracer = Tracer(enabled=enabled)
+    config._tracing_settings = settings
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_protocol(item, nextitem):
+    with _tracer.span(item.nodeid, "test", test=item.nodeid):
+        yield
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_setup(item):
+    with _tracer.span("setup", "phase"):
+        yield
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    with _tracer.span("call", "phase"):
+        yield
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_teardown(item, nextitem):
+    with _tracer.span("teardown", "phase"):
+        yield
+
+
+def merge_traces(path: Path) -> bool:
+    """Fold the xdist workers' traces (trace_<run>.gw*.json) into path"""
+    parts = worker_parts(path)
+    if not parts:
+        return False
+    events = []
+    for part in parts:
+        events.extend(json.loads(part.read_text(encoding="utf-8"))["traceEvents"])
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}, ensure_ascii=False),
+                        encoding="utf-8")
+    tmp_path.replace(path)
+    for part in parts:
+        part.unlink()
+    return True
+
+
+def pytest_sessionfinish(session):
+    settings = getattr(session.config, "_tracing_settings", {})
+    path = Path(settings.get("dir") or DEFAULT_TRACE_DIR) / f"trace_{RUN_ID}.json"
+    if _tracer.enabled and _tracer.events:
+        logger.info(f"Trace written to {_tracer.write_chrome_trace(artifact_path(path))}")
+        if settings.get("otlp_endpoint"):
+            _tracer.export_otlp(settings["otlp_endpoint"], settings.get("service_name", "uask-tests"))
+    # Workers have finished writing by the time the controller's session ends
+    if is_controller(session.config) and merge_traces(path):
+        logger.info(f"Merged worker traces into {path}")
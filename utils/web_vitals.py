@@ -0,0 +1,138 @@
+"""
+Browser-side performance metrics and budgets.
+
+The page fixture installs INIT_SCRIPT before navigation: buffered
+PerformanceObservers record paint, largest-contentful-paint and longtask
+entries. After login the chat_page fixture calls collect(), which returns:
+
+- Navigation Timing: ttfb_ms, dom_content_loaded_ms, load_ms
+- fcp_ms, lcp_ms (LCP stops updating at the first user input, i.e. the
+  login clicks, so it measures the initial render)
+- long_tasks, tbt_ms (total blocking time: the part of each long task after
+  FCP beyond 50 ms)
+- js_heap_mb (Chromium's performance.memory)
+
+The values are stored on the test (user_properties "web_vitals") and
+recorded in the run performance summary as web.<metric>.<network profile>
+samples: pages loaded under the `minimal` profile (images and fonts
+blocked) aren't comparable with `full` ones. Budgets are asserted after the
+test body:
+
+    @pytest.mark.perf_budget(lcp_ms=2500, tbt_ms=300)
+    def test_chat_widget_loads_desktop(chat_page): ...
+
+Registered from conftest.py via `pytest_plugins`.
+"""
+
+from typing import Dict, Optional
+
+import pytest
+
+from utils.logger import get_logger
+from utils.perf_summary import record_latency
+
+logger = get_logger(__name__)
+
+BUDGET_KEYS = (
+    "ttfb_ms", "dom_content_loaded_ms", "load_ms", "fcp_ms", "lcp_ms", "long_tasks", "tbt_ms", "js_heap_mb",
+)
+
+INIT_SCRIPT = """
+(() => {
+  if (window.__uaskVitals) return;
+  const vitals = window.__uaskVitals = {fcp: null, lcp: null, longTasks: []};
+  const observe = (type, callback) => {
+    try {
+      new PerformanceObserver(list => list.getEntries().forEach(callback)).observe({type, buffered: true});
+    } catch (e) { /* entry type not supported */ }
+  };
+  observe('paint', e => { if (e.name === 'first-contentful-paint') vitals.fcp = e.startTime; });
+  observe('largest-contentful-paint', e => { vitals.lcp = e.renderTime || e.loadTime || e.startTime; });
+  observe('longtask', e => vitals.longTasks.push([e.startTime, e.duration]));
+})();
+"""
+
+COLLECT_SCRIPT = """
+() => {
+  const vitals = window.__uaskVitals || {fcp: null, lcp: null, longTasks: []};
+  const nav = performance.getEntriesByType('navigation')[0];
+  const fcp = vitals.fcp;
+  let tbt = 0;
+  for (const [start, duration] of vitals.longTasks) {
+    if (fcp === null) continue;
+    const end = start + duration;
+    const blocking = end - Math.max(start, fcp) - 50;
+    if (end > fcp && blocking > 0) tbt += blocking;
+  }
+  return {
+    ttfb_ms: nav ? nav.responseStart - nav.startTime : null,
+    dom_content_loaded_ms: nav ? nav.domContentLoadedEventEnd - nav.startTime : null,
+    load_ms: nav && nav.loadEventEnd ? nav.loadEventEnd - nav.startTime : null,
+    fcp_ms: fcp,
+    lcp_ms: vitals.lcp,
+    long_tasks: vitals.longTasks.length,
+    tbt_ms: tbt,
+    js_heap_mb: performance.memory ? performance.memory.usedJSHeapSize / 1048576 : null,
+  };
+}
+"""
+
+
+def install(page):
+    """Register the observers; call before the first navigation"""
+    page.add_init_script(INIT_SCRIPT)
+
+
+def collect(page, profile: str = None) -> Dict[str, Optional[float]]:
+    """Current metrics of the page (None where the browser has no value), recorded per network profile"""
+    vitals = {k: (round(v, 1) if isinstance(v, float) else v) for k, v in page.evaluate(COLLECT_SCRIPT).items()}
+    suffix = f".{profile}" if profile else ""
+    for name in ("fcp_ms", "lcp_ms", "tbt_ms"):
+        if vitals.get(name) is not None:
+            record_latency(f"web.{name[:-3]}{suffix}", vitals[name] / 1000)
+    return vitals
+
+
+def store(item, vitals: Dict[str, Optional[float]]):
+    """Keep the metrics on the test item and its reports"""
+    item.web_vitals = vitals
+    item.user_properties.append(("web_vitals", vitals))
+    logger.info("Web vitals: " + ", ".join(f"{k}={v}" for k, v in vitals.items() if v is not None))
+
+
+def over_budget(vitals: Dict[str, Optional[float]], budget: Dict[str, float]) -> Dict[str, tuple]:
+    """{metric: (measured, limit)} for every budgeted metric above its limit"""
+    unknown = set(budget) - set(BUDGET_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown perf_budget keys {sorted(unknown)}, expected some of {BUDGET_KEYS}")
+    return {
+        name: (vitals[name], limit)
+        for name, limit in budget.items()
+        if vitals.get(name) is not None and vitals[name] > limit
+    }
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    outcome = yield
+    marker = item.get_closest_marker("perf_budget")
+    if marker is None or outcome.excinfo is not None:
+        return
+
+    vitals = getattr(item, "web_vitals", None)
+    if vitals is None:
+        page = item.funcargs.get("page")
+        if page is None:
+            outcome.force_exception(pytest.fail.Exception(
+                "@pytest.mark.perf_budget needs the page or chat_page fixture", pytrace=False))
+            return
+        vitals = collect(page, getattr(item.funcargs.get("network_profile"), "name", None))
+        store(item, vitals)
+
+    exceeded = over_budget(vitals, marker.kwargs)
+    if exceeded:
+        outcome.force_exception(pytest.fail.Exception(
+            "Performance budget exceeded: "
+            + ", ".join(f"{name}={value} (budget {limit})" for name, (value, limit) in exceeded.items()),
+            pytrace=False,
+        ))